@@ -1,17 +1,29 @@
-"""Agent模块"""
-
-from .paper_parser import PaperParserAgent
-from .math_model_agent import MathModelAgent
-from .domain_analyzer import DomainAnalyzerAgent
-from .scholar_analyzer import ScholarAnalyzerAgent
-from .tech_roadmap import TechRoadmapAgent
-from .orchestrator import AcademicAnalysisOrchestrator
-
-__all__ = [
-    "PaperParserAgent",
-    "MathModelAgent",
-    "DomainAnalyzerAgent",
-    "ScholarAnalyzerAgent",
-    "TechRoadmapAgent",
-    "AcademicAnalysisOrchestrator",
-]
+"""Agent模块
+
+按需导入：访问 app.agents.XxxAgent 时才加载对应子模块（及其 langchain / PyMuPDF 依赖）。
+"""
+
+import importlib
+
+_EXPORTS = {
+    "PaperParserAgent": "paper_parser",
+    "MathModelAgent": "math_model_agent",
+    "DomainAnalyzerAgent": "domain_analyzer",
+    "ScholarAnalyzerAgent": "scholar_analyzer",
+    "TechRoadmapAgent": "tech_roadmap",
+    "AcademicAnalysisOrchestrator": "orchestrator",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
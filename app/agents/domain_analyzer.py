@@ -5,13 +5,11 @@ Domain Analyzer Agent
 
 import logging
 from typing import List, Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
 import json
 import re
 
 from app.models.schemas import DomainInfo
-from app.config import settings
+from app.services.llm import create_llm
 
 logger = logging.getLogger(__name__)
 
@@ -21,14 +19,11 @@ class DomainAnalyzerAgent:
     
     def __init__(self):
         self.logger = logger
-        import os
-        os.environ['OPENAI_PROXY'] = ''
+        # langchain 导入耗时较长，推迟到首次构造Agent时
+        from langchain.prompts import ChatPromptTemplate
         
-        self.llm = ChatOpenAI(
-            model_name=settings.OPENAI_MODEL,
-            temperature=settings.OPENAI_TEMPERATURE,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
+        # LLM_BACKEND 可切换为录制/回放（见 app.services.llm）
+        self.llm = create_llm()
         
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """你是学科分类专家。根据论文的标题、摘要和内容,分析其研究领域。
@@ -41,13 +36,13 @@ class DomainAnalyzerAgent:
 5. 置信度评分 (0-1)
 
 返回JSON格式:
-{
+{{
   "primary_field": "Computer Vision",
   "sub_fields": ["Object Detection", "Deep Learning"],
   "keywords": ["YOLO", "CNN"],
   "related_fields": ["Machine Learning"],
   "confidence": 0.95
-}"""),
+}}"""),
             ("user", "请分析以下论文的研究领域:\n\n标题: {title}\n摘要: {abstract}\n内容: {content}")
         ])
     
@@ -70,7 +65,7 @@ class DomainAnalyzerAgent:
             # 截取内容前10000字符
             content_preview = content[:10000]
             
-            response = self.llm.invoke(
+            response = await self.llm.ainvoke(
                 self.prompt.format_messages(
                     title=title,
                     abstract=abstract,
@@ -6,13 +6,11 @@ Math Model Extraction Agent
 import logging
 import re
 import json
-from typing import List, Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from typing import List, Dict, Any, Optional
 from pydantic import ConfigDict
 
 from app.models.schemas import MathModel
-from app.config import settings
+from app.services.llm import create_llm
 
 logger = logging.getLogger(__name__)
 
@@ -22,15 +20,11 @@ class MathModelAgent:
     
     def __init__(self):
         self.logger = logger
-        # 禁用代理验证，防止 Pydantic 验证错误
-        import os
-        os.environ['OPENAI_PROXY'] = ''
+        # langchain 导入耗时较长，推迟到首次构造Agent时
+        from langchain.prompts import ChatPromptTemplate
         
-        self.llm = ChatOpenAI(
-            model_name=settings.OPENAI_MODEL,
-            temperature=settings.OPENAI_TEMPERATURE,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
+        # LLM_BACKEND 可切换为录制/回放（见 app.services.llm）
+        self.llm = create_llm()
         
         self.prompt = ChatPromptTemplate.from_messages([
             ("system", """你是数学公式提取专家。分析论文文本,提取所有重要的数学模型、公式和算法。
@@ -45,33 +39,43 @@ class MathModelAgent:
 
 返回JSON格式的列表,例如:
 [
-  {
+  {{
     "formula": "Loss Function",
-    "latex": "\\\\mathcal{L} = -\\\\sum y \\\\log(\\\\hat{y})",
+    "latex": "\\\\mathcal{{L}} = -\\\\sum y \\\\log(\\\\hat{{y}})",
     "description": "交叉熵损失函数",
     "formula_type": "equation",
     "importance": 0.9,
     "location": "Section 3.2"
-  }
+  }}
 ]"""),
             ("user", "请分析以下论文文本并提取数学模型:\n\n{input}")
         ])
     
-    async def extract_math_models(self, paper_text: str) -> List[MathModel]:
+    async def extract_math_models(self,
+                                  paper_text: str,
+                                  formula_regions: Optional[List[Dict[str, Any]]] = None) -> List[MathModel]:
         """
         提取论文中的数学模型
         
         Args:
             paper_text: 论文文本内容
+            formula_regions: 解析阶段从版面定位的候选公式区域；提供时LLM只分析这些区域，
+                为空列表时（PDF中未检测到行间公式）不调用LLM
             
         Returns:
             MathModel对象列表
         """
+        if formula_regions is not None and not formula_regions:
+            return []
+        
         try:
-            # 截取前20000字符避免token超限
-            text_to_analyze = paper_text[:20000]
+            if formula_regions:
+                text_to_analyze = self._format_regions(formula_regions)[:20000]
+            else:
+                # 截取前20000字符避免token超限
+                text_to_analyze = paper_text[:20000]
             
-            response = self.llm.invoke(
+            response = await self.llm.ainvoke(
                 self.prompt.format_messages(input=text_to_analyze)
             )
             
@@ -86,6 +90,10 @@ class MathModelAgent:
                     models = []
                     for item in models_data:
                         try:
+                            region = self._region_for(item.pop("region", None), formula_regions)
+                            if region:
+                                item.setdefault("page", region["page"])
+                                item.setdefault("bbox", region["bbox"])
                             model = MathModel(**item)
                             models.append(model)
                         except Exception as e:
@@ -94,13 +102,64 @@ class MathModelAgent:
                 except json.JSONDecodeError:
                     pass
             
-            # 降级方案：使用正则表达式提取
-            return self._extract_formulas_regex(paper_text)
+            # 降级方案：版面检测结果或正则表达式
+            return self.extract_formulas_heuristic(paper_text, formula_regions)
             
         except Exception as e:
             self.logger.error(f"数学模型提取错误: {str(e)}")
             return []
     
+    def extract_formulas_heuristic(self,
+                                   text: str,
+                                   formula_regions: Optional[List[Dict[str, Any]]] = None) -> List[MathModel]:
+        """无需LLM的提取：优先使用版面检测的公式区域，否则匹配文本中的LaTeX"""
+        if formula_regions:
+            return self._formulas_from_regions(formula_regions)
+        return self._extract_formulas_regex(text)
+    
+    @staticmethod
+    def _format_regions(formula_regions: List[Dict[str, Any]]) -> str:
+        """将候选区域整理为LLM输入，每个区域以 [R编号] 开头"""
+        parts = [
+            "以下是从PDF版面中检测到的候选公式区域（文本由PDF提取，可能缺失上下标）。"
+            "请为每个结果增加 region 字段，填写对应的区域编号（如 \"R3\"），"
+            "location 填写页码和公式编号。"
+        ]
+        for i, region in enumerate(formula_regions):
+            label = f"第{region['page']}页"
+            if region.get("equation_number"):
+                label += f", 公式({region['equation_number']})"
+            parts.append(f"[R{i}] ({label})\n{region['text']}")
+        return "\n\n".join(parts)
+    
+    @staticmethod
+    def _region_for(label: Any, formula_regions: Optional[List[Dict[str, Any]]]) -> Optional[Dict[str, Any]]:
+        if not formula_regions or label is None:
+            return None
+        match = re.search(r"\d+", str(label))
+        if match and int(match.group()) < len(formula_regions):
+            return formula_regions[int(match.group())]
+        return None
+    
+    def _formulas_from_regions(self, formula_regions: List[Dict[str, Any]], limit: int = 10) -> List[MathModel]:
+        """由版面检测结果直接构造公式（按检测得分取前 limit 个，保持原文顺序）"""
+        top = sorted(range(len(formula_regions)), key=lambda i: -formula_regions[i]["score"])[:limit]
+        models = []
+        for i in sorted(top):
+            region = formula_regions[i]
+            number = region.get("equation_number")
+            models.append(MathModel(
+                formula=f"Equation ({number})" if number else f"Formula_{len(models) + 1}",
+                latex=region["text"],
+                description="Display formula located from PDF layout",
+                formula_type="equation",
+                location=f"Page {region['page']}" + (f", Eq. ({number})" if number else ""),
+                importance=region["score"],
+                page=region["page"],
+                bbox=region["bbox"],
+            ))
+        return models
+    
     def _extract_formulas_regex(self, text: str) -> List[MathModel]:
         """使用正则表达式提取公式的降级方案"""
         models = []
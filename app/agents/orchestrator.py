@@ -5,20 +5,110 @@ Main Orchestrator
 
 import logging
 import asyncio
+import contextlib
+import importlib
+import inspect
+import re
 import uuid
+from collections import defaultdict, deque
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Callable, Awaitable, Tuple, List, Iterable
 
 from app.config import settings
-from app.models.schemas import PaperInput, PaperAnalysis, AnalysisStatus
-from app.agents.paper_parser import PaperParserAgent
-from app.agents.math_model_agent import MathModelAgent
-from app.agents.domain_analyzer import DomainAnalyzerAgent
-from app.agents.scholar_analyzer import ScholarAnalyzerAgent
-from app.agents.tech_roadmap import TechRoadmapAgent
+from app.models.schemas import (
+    PaperInput, PaperAnalysis, AnalysisStatus, ResearchGap, ScholarInfo, TechRoadmapNode,
+    AGENT_FIELDS, ANALYSIS_FIELDS
+)
+from app.services.citation_graph import CitationGraph, title_key
+from app.services.document_store import DocumentStore, DocumentText, sha256_file
+from app.utils.latency import LatencyTracker
+from app.utils.temporal import TemporalFeatures, extract_temporal_features
 
 logger = logging.getLogger(__name__)
 
+# 预热时导入的外部服务模块（httpx等），实例仍在首次使用时创建
+_WARM_UP_MODULES = ("app.services.paper_fetcher", "app.services.metadata_resolver", "app.services.scholar_enricher")
+
+# 多worker部署时由主进程在fork前导入的模块：Agent模块及其重量级依赖
+PRELOAD_MODULES = (
+    "app.agents.paper_parser", "app.agents.math_model_agent", "app.agents.domain_analyzer",
+    "app.agents.scholar_analyzer", "app.agents.tech_roadmap",
+    "fitz", "langchain_openai", "langchain.prompts",
+) + _WARM_UP_MODULES
+
+
+def preload_modules(modules: Iterable[str] = PRELOAD_MODULES) -> Dict[str, str]:
+    """
+    只导入模块，不创建Agent、连接池或线程，可在fork之前安全调用；
+    worker共享导入产生的只读内存页，各自构造实例时不再承担导入开销
+    
+    Returns:
+        导入失败的模块及错误信息
+    """
+    errors = {}
+    for module in modules:
+        try:
+            importlib.import_module(module)
+        except Exception as e:
+            logger.warning(f"模块预加载失败 {module}: {e}")
+            errors[module] = str(e)
+    return errors
+
+# 进度回调: (阶段名, 附加数据) -> None
+ProgressCallback = Callable[[str, Dict[str, Any]], Awaitable[None]]
+
+# 论文解析后即可用的基础输入
+BASE_INPUTS = ("paper_input", "metadata", "full_text", "sections", "references", "formula_regions", "content_hash")
+
+# 无论 include 如何都要执行的阶段（PaperAnalysis 基础信息）
+REQUIRED_STAGES = ("year", "external_metadata")
+
+_ARXIV_VERSION_RE = re.compile(r"v\d+$")
+
+# 领域分析与数学模型分析（无公式区域时）交给LLM的正文长度，与各Agent的截断一致
+DOMAIN_INPUT_CHARS = 10000
+MATH_INPUT_CHARS = 20000
+
+# 研究空白的线索短语
+GAP_CUE_PATTERN = re.compile(
+    r"[^.\n]*\b(?:future work|remains? (?:an )?open|open (?:problem|question)s?|"
+    r"we leave|not yet (?:been )?(?:explored|addressed)|left for future)\b[^.\n]*\.",
+    re.IGNORECASE
+)
+
+
+def _input_label(paper_input: Optional[PaperInput]) -> str:
+    """分析记录中标识论文：标题、arXiv ID、DOI 或文件路径"""
+    if paper_input is None:
+        return "Unknown"
+    return paper_input.title or paper_input.arxiv_id or paper_input.doi or paper_input.file_path or "Unknown"
+
+
+def _paper_identity(paper_input: Optional[PaperInput], content_hash: Optional[str]) -> Optional[str]:
+    """引文图谱中区分同名论文的身份：不含版本号的arXiv ID、DOI，其次PDF内容哈希"""
+    if paper_input is not None and paper_input.arxiv_id:
+        return f"arxiv:{_ARXIV_VERSION_RE.sub('', paper_input.arxiv_id.strip().lower())}"
+    if paper_input is not None and paper_input.doi:
+        return f"doi:{paper_input.doi.strip().lower()}"
+    return f"sha256:{content_hash}" if content_hash else None
+
+
+@dataclass
+class Stage:
+    """
+    分析阶段声明
+    
+    run 按 inputs 顺序接收输入（基础输入或其他阶段的输出），
+    可为同步函数或协程函数；结果以 name 为键写回上下文。
+    """
+    name: str
+    label: str
+    run: Callable[..., Any]
+    inputs: Tuple[str, ...]
+    default: Any = None
+    fallback: Optional[Callable[..., Any]] = None  # 超时降级，参数同 run
+
 
 class AcademicAnalysisOrchestrator:
     """学术论文分析编排器"""
@@ -32,203 +122,669 @@ class AcademicAnalysisOrchestrator:
         self._domain_agent = None
         self._scholar_agent = None
         self._tech_roadmap_agent = None
+        self._fetcher = None
+        self._resolver = None
+        self._scholar_enricher = None
+        self._citation_graph = None
+        self._document_store = None
+        
+        # 各阶段的延迟统计，用于计算对冲阈值
+        self._latency: Dict[str, LatencyTracker] = defaultdict(LatencyTracker)
+        # 配置了并发上限的阶段的信号量（跨论文共享），按需创建
+        self._stage_semaphores: Dict[str, asyncio.Semaphore] = {}
+        # 最近完成（含失败）的分析及各阶段耗时，供诊断接口找出最慢的任务
+        self._recent_analyses = deque(maxlen=settings.PROFILE_RECENT_ANALYSES)
+        
+        self.stages = self._build_stages()
+    
+    def _build_stages(self) -> Dict[str, Stage]:
+        """声明分析阶段及其输入依赖"""
+        stages = [
+            Stage("math_models", "数学模型分析", self._analyze_math_models, ("full_text", "formula_regions"),
+                  default=[], fallback=self._math_models_heuristic),
+            Stage("domain_info", "领域分析", self._analyze_domain, ("metadata", "full_text"),
+                  fallback=lambda metadata, text: self.domain_agent._extract_domain_heuristic(
+                      metadata.get("title", ""), metadata.get("abstract", ""))),
+            Stage("citation_graph", "引文图谱", self._register_citations,
+                  ("metadata", "references", "year", "paper_input", "content_hash")),
+            Stage("scholar_candidates", "学者识别", self._analyze_scholars,
+                  ("metadata", "full_text", "citation_graph"), default=[]),
+            Stage("key_scholars", "学者信息补全", self._enrich_scholars, ("scholar_candidates",),
+                  default=[], fallback=lambda scholars: scholars),
+            Stage("tech_roadmap", "技术路线分析", self._analyze_tech_roadmap,
+                  ("metadata", "full_text", "citation_graph", "temporal"), default=[]),
+            Stage("temporal", "年份特征提取", extract_temporal_features, ("full_text",),
+                  default=TemporalFeatures()),
+            Stage("year", "年份提取", self._extract_year, ("temporal",), default=datetime.now().year),
+            Stage("external_metadata", "元数据查询", self._resolve_metadata, ("paper_input",), default={}),
+            Stage("innovation_points", "创新点提取", self._extract_innovations, ("full_text",), default=[]),
+            Stage("limitations", "局限性提取", self._extract_limitations, ("full_text",), default=[]),
+            Stage("research_gaps", "研究空白识别", self._extract_research_gaps,
+                  ("limitations", "full_text"), default=[]),
+            Stage("reproducibility_score", "可复现性评分", self._calculate_reproducibility,
+                  ("full_text",), default=0.5),
+            Stage("summary", "摘要生成", self._generate_summary, ("metadata", "full_text")),
+        ]
+        return {stage.name: stage for stage in stages}
+    
+    @property
+    def fetcher(self):
+        if self._fetcher is None:
+            from app.services.paper_fetcher import PaperFetcher
+            self._fetcher = PaperFetcher()
+        return self._fetcher
+    
+    @property
+    def resolver(self):
+        if self._resolver is None:
+            from app.services.metadata_resolver import MetadataResolver
+            self._resolver = MetadataResolver(self.fetcher.get_client)
+        return self._resolver
+    
+    @property
+    def scholar_enricher(self):
+        if self._scholar_enricher is None:
+            from app.services.author_cache import AuthorCache
+            from app.services.scholar_enricher import ScholarEnricher
+            self._scholar_enricher = ScholarEnricher(self.resolver, AuthorCache(settings.AUTHOR_CACHE_PATH))
+        return self._scholar_enricher
+    
+    @property
+    def citation_graph(self):
+        """所有已分析论文共享的引文图谱"""
+        if self._citation_graph is None:
+            self._citation_graph = CitationGraph(
+                settings.GRAPH_DB_DIR if settings.ENABLE_GRAPH_DB else None,
+                compact_threshold=settings.GRAPH_COMPACT_THRESHOLD,
+            )
+        return self._citation_graph
+    
+    @property
+    def document_store(self) -> Optional[DocumentStore]:
+        """按PDF内容哈希存储的解析结果，未启用时为 None"""
+        if self._document_store is None and settings.ENABLE_DOCUMENT_STORE:
+            self._document_store = DocumentStore(settings.DOCUMENT_STORE_DIR)
+        return self._document_store
+    
+    def warm_up(self) -> Dict[str, str]:
+        """
+        导入并构造全部Agent（langchain、PyMuPDF等导入耗时较长），
+        由服务启动后在后台线程调用，首个分析请求不再承担这部分开销
+        
+        Returns:
+            构造失败的Agent及错误信息
+        """
+        errors = {}
+        for name in ("parser_agent", "math_agent", "domain_agent", "scholar_agent", "tech_roadmap_agent"):
+            try:
+                getattr(self, name)
+            except Exception as e:
+                self.logger.warning(f"Agent预热失败 {name}: {e}")
+                errors[name] = str(e)
+        errors.update(preload_modules(_WARM_UP_MODULES))
+        return errors
+    
+    def stage_latency(self, percentiles: Iterable[float] = (0.5, 0.99)) -> Dict[str, Dict[str, Any]]:
+        """各阶段最近调用（每阶段最多200次）的耗时分位数（秒）"""
+        return {
+            name: {"count": tracker.count(), **{f"p{round(p * 100)}": tracker.percentile(p) for p in percentiles}}
+            for name, tracker in sorted(self._latency.items())
+        }
+    
+    def slowest_analyses(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """最近的分析中耗时最长的若干个，附各阶段耗时（秒）"""
+        return sorted(self._recent_analyses, key=lambda record: record["seconds"], reverse=True)[:limit]
+    
+    def _record_analysis(self, title: str, start_time: datetime, stage_seconds: Dict[str, float],
+                         error: Optional[str] = None):
+        self._recent_analyses.append({
+            "title": title,
+            "started_at": start_time.isoformat(),
+            "seconds": round((datetime.now() - start_time).total_seconds(), 3),
+            "stages": {name: round(seconds, 3)
+                       for name, seconds in sorted(stage_seconds.items(), key=lambda item: -item[1])},
+            "error": error,
+        })
+    
+    async def close(self):
+        """取消批量元数据查询，释放下载连接池、学者缓存，将引文图谱写盘"""
+        # 批量查询使用下载器的连接池，先于下载器关闭
+        if self._scholar_enricher is not None:
+            await self._scholar_enricher.close()
+            self._scholar_enricher = None
+        if self._resolver is not None:
+            await self._resolver.close()
+            self._resolver = None
+        if self._fetcher is not None:
+            await self._fetcher.close()
+        if self._citation_graph is not None:
+            await asyncio.to_thread(self._citation_graph.close)
+            self._citation_graph = None
     
     @property
     def parser_agent(self):
         if self._parser_agent is None:
+            from app.agents.paper_parser import PaperParserAgent
             self._parser_agent = PaperParserAgent()
         return self._parser_agent
     
     @property
     def math_agent(self):
         if self._math_agent is None:
+            from app.agents.math_model_agent import MathModelAgent
             self._math_agent = MathModelAgent()
         return self._math_agent
     
     @property
     def domain_agent(self):
         if self._domain_agent is None:
+            from app.agents.domain_analyzer import DomainAnalyzerAgent
             self._domain_agent = DomainAnalyzerAgent()
         return self._domain_agent
     
     @property
     def scholar_agent(self):
         if self._scholar_agent is None:
+            from app.agents.scholar_analyzer import ScholarAnalyzerAgent
             self._scholar_agent = ScholarAnalyzerAgent()
         return self._scholar_agent
     
     @property
     def tech_roadmap_agent(self):
         if self._tech_roadmap_agent is None:
+            from app.agents.tech_roadmap import TechRoadmapAgent
             self._tech_roadmap_agent = TechRoadmapAgent()
         return self._tech_roadmap_agent
     
-    async def analyze_paper(self, paper_input: PaperInput) -> PaperAnalysis:
+    async def analyze_paper(self,
+                            paper_input: PaperInput,
+                            progress_callback: Optional[ProgressCallback] = None,
+                            include: Optional[Iterable[str]] = None) -> PaperAnalysis:
         """
         执行完整的论文分析流程
         
         Args:
             paper_input: 论文输入信息
+            progress_callback: 阶段完成时的回调（parsed / agent_done）
+            include: 需要计算的分析字段（ANALYSIS_FIELDS子集），默认全部
             
         Returns:
             完整的分析结果
         """
         start_time = datetime.now()
+        parsed_data = None
         
         try:
             # 1. 解析论文
             self.logger.info(f"开始解析论文: {paper_input.title or paper_input.file_path}")
             
             if paper_input.file_path:
-                parsed_data = self.parser_agent.parse_pdf(paper_input.file_path)
+                content_hash, parsed_data = await self._parse_file(paper_input.file_path)
             else:
-                parsed_data = self._get_paper_from_source(paper_input)
+                content_hash, parsed_data = await self._get_paper_from_source(paper_input)
+            
+            if parsed_data.get("success"):
+                revision = parsed_data.get("revision")
+                await self._emit(progress_callback, "parsed",
+                                 total_pages=parsed_data.get("total_pages", 0),
+                                 changed_pages=revision["changed_pages"] if revision else None,
+                                 changed_sections=revision["changed_sections"] if revision else None)
+            
+            return await self.analyze_parsed(parsed_data, start_time=start_time,
+                                             progress_callback=progress_callback,
+                                             include=include,
+                                             paper_input=paper_input,
+                                             content_hash=content_hash)
+            
+        except Exception as e:
+            self.logger.error(f"分析过程出错: {str(e)}")
+            if parsed_data is None:
+                # 获取或解析阶段失败；之后的失败由 analyze_parsed 记录
+                self._record_analysis(_input_label(paper_input), start_time, {}, error=str(e))
+            raise
+        finally:
+            # 文档存储命中时正文是内存映射上的视图，分析结束后释放
+            document = parsed_data.get("document") if parsed_data else None
+            if document is not None:
+                document.close()
+    
+    async def _parse_file(self,
+                          file_path: str,
+                          arxiv_id: Optional[str] = None,
+                          doi: Optional[str] = None,
+                          content_hash: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
+        """
+        解析PDF文件；文档存储中已有相同内容的解析结果时直接读取
+        
+        arxiv_id / doi 为论文来源，用于识别同一论文的修订版；
+        content_hash 为调用方已知的内容哈希（如下载时计算的），未提供时读取文件计算
+        
+        Returns:
+            (内容哈希, 解析结果)；哈希也是知识库中论文的身份，与是否启用文档存储无关
+        """
+        if content_hash is None:
+            content_hash = await asyncio.to_thread(sha256_file, file_path)
+        store = self.document_store
+        if store is None:
+            return content_hash, await asyncio.to_thread(self.parser_agent.parse_pdf, file_path, arxiv_id, doi)
+        
+        document = await asyncio.to_thread(store.get, content_hash)
+        if document is not None:
+            # 正文保持映射，各阶段只解码需要的片段；文档由 analyze_paper 结束时关闭
+            self.logger.info(f"复用已解析文档: {content_hash[:12]}")
+            return content_hash, document.to_parsed()
+        return content_hash, await asyncio.to_thread(self.parser_agent.parse_pdf, file_path, arxiv_id, doi)
+    
+    async def analyze_parsed(self,
+                             parsed_data: Dict[str, Any],
+                             start_time: Optional[datetime] = None,
+                             progress_callback: Optional[ProgressCallback] = None,
+                             include: Optional[Iterable[str]] = None,
+                             paper_input: Optional[PaperInput] = None,
+                             content_hash: Optional[str] = None) -> PaperAnalysis:
+        """
+        对已解析的论文执行分析（批量导入时解析在进程池中完成）
+        
+        Args:
+            parsed_data: parse_pdf 或 _get_paper_from_source 的返回值
+            start_time: 计时起点，默认为调用时刻
+            progress_callback: 每个Agent完成时的回调，携带该Agent的结果
+            include: 需要计算的分析字段，未选中的字段保持默认值
+            paper_input: 论文来源，提供arXiv ID或DOI时补全引用数、作者等元数据
+            content_hash: PDF内容哈希，提供时解析结果写入文档存储
             
+        Returns:
+            分析结果
+        """
+        start_time = start_time or datetime.now()
+        stages = self.select_stages(include)
+        stage_seconds: Dict[str, float] = {}
+        # 成功时替换为最终标题
+        title = _input_label(paper_input)
+        
+        try:
             if not parsed_data.get("success"):
                 raise Exception(f"论文解析失败: {parsed_data.get('error')}")
             
             metadata = parsed_data["metadata"]
             full_text = parsed_data["full_text"]
+            if not isinstance(full_text, DocumentText):
+                full_text = DocumentText(full_text)
             
-            # 2. 并行执行多个分析任务
-            self.logger.info("开始并行分析...")
+            if content_hash and self.document_store is not None:
+                await asyncio.to_thread(self.document_store.put, content_hash, parsed_data)
             
-            analysis_tasks = [
-                self._analyze_math_models(full_text),
-                self._analyze_domain(metadata, full_text),
-                self._analyze_scholars(metadata, full_text),
-                self._analyze_tech_roadmap(metadata, full_text),
-            ]
+            # 2. 按依赖关系调度各分析阶段，输入就绪即开始执行
+            self.logger.info("开始并行分析...")
             
-            math_models, domain_info, scholars, tech_roadmap = await asyncio.gather(
-                *analysis_tasks,
-                return_exceptions=True
-            )
+            context = {
+                "paper_input": paper_input,
+                "metadata": metadata,
+                "full_text": full_text,
+                "sections": parsed_data.get("sections") or {},
+                "references": parsed_data.get("references") or [],
+                # 非PDF来源没有版面信息，为 None 时数学模型Agent分析全文
+                "formula_regions": parsed_data.get("formula_regions"),
+                "content_hash": content_hash,
+                # 各阶段耗时，不是阶段输入
+                "stage_seconds": stage_seconds,
+            }
+            await self._run_stages(context, stages, progress_callback)
             
-            # 处理异常
-            if isinstance(math_models, Exception):
-                self.logger.warning(f"数学模型分析异常: {math_models}")
-                math_models = []
-            if isinstance(domain_info, Exception):
-                self.logger.warning(f"领域分析异常: {domain_info}")
-                domain_info = None
-            if isinstance(scholars, Exception):
-                self.logger.warning(f"学者分析异常: {scholars}")
-                scholars = []
-            if isinstance(tech_roadmap, Exception):
-                self.logger.warning(f"技术路线分析异常: {tech_roadmap}")
-                tech_roadmap = []
+            graph_node = context.get("citation_graph")
+            domain_info = context.get("domain_info")
+            if graph_node is not None and domain_info is not None:
+                await asyncio.to_thread(self.citation_graph.add_analysis,
+                                        graph_node, domain_info.primary_field, domain_info.keywords)
             
             # 3. 创建分析结果
             analysis_duration = (datetime.now() - start_time).total_seconds()
             
+            # 外部元数据比版面启发式可靠：作者、年份优先取外部结果，
+            # 用户显式提供的标题不被覆盖
+            external = context["external_metadata"]
+            title = metadata.get("title", "Unknown")
+            if not (paper_input and paper_input.title):
+                title = external.get("title") or title
+            abstract = metadata.get("abstract", "")
+            if external.get("abstract") and abstract in ("", "Abstract not found"):
+                abstract = external["abstract"]
+            
             paper_analysis = PaperAnalysis(
                 paper_id=str(uuid.uuid4()),
-                title=metadata.get("title", "Unknown"),
-                authors=metadata.get("authors", []),
-                abstract=metadata.get("abstract", ""),
-                year=self._extract_year(full_text),
-                math_models=math_models or [],
-                domain_info=domain_info,
-                key_scholars=scholars or [],
-                tech_roadmap=tech_roadmap or [],
-                innovation_points=self._extract_innovations(full_text),
-                limitations=self._extract_limitations(full_text),
-                citations_count=0,
-                references_count=0,
-                reproducibility_score=self._calculate_reproducibility(full_text),
+                title=title,
+                authors=external.get("authors") or metadata.get("authors", []),
+                abstract=abstract,
+                year=external.get("year") or context["year"],
+                url=external.get("url") or (paper_input.url if paper_input else None),
+                citations_count=external.get("citations_count") or 0,
+                references_count=external.get("references_count") or len(context["references"]),
                 status=AnalysisStatus.COMPLETED,
                 analysis_duration=analysis_duration,
-                summary=self._generate_summary(metadata, full_text)
+                content_hash=content_hash,
+                **{field: context[field] for field in ANALYSIS_FIELDS if field in context}
             )
             
             self.logger.info(f"论文分析完成，耗时: {analysis_duration:.2f}秒")
+            self._record_analysis(title, start_time, stage_seconds)
             
             return paper_analysis
             
         except Exception as e:
             self.logger.error(f"分析过程出错: {str(e)}")
+            self._record_analysis(title, start_time, stage_seconds, error=str(e))
             raise
     
-    async def _analyze_math_models(self, text: str):
-        """分析数学模型"""
-        return await self.math_agent.extract_math_models(text)
+    async def _emit(self, progress_callback: Optional[ProgressCallback], stage: str, **data):
+        """发送进度事件，回调异常不影响分析"""
+        if progress_callback is None:
+            return
+        try:
+            await progress_callback(stage, data)
+        except Exception as e:
+            self.logger.warning(f"进度回调异常 {stage}: {e}")
     
-    async def _analyze_domain(self, metadata: Dict, text: str):
+    def select_stages(self, include: Optional[Iterable[str]] = None) -> Dict[str, Stage]:
+        """
+        根据需要的字段选出阶段及其传递依赖，未选中的Agent和启发式不会执行
+        
+        Raises:
+            ValueError: include 中含有未知字段
+        """
+        if include is None:
+            return self.stages
+        
+        unknown = set(include) - set(ANALYSIS_FIELDS)
+        if unknown:
+            raise ValueError(f"未知的分析字段: {', '.join(sorted(unknown))}")
+        
+        selected: Dict[str, Stage] = {}
+        stack = list(include) + list(REQUIRED_STAGES)
+        while stack:
+            name = stack.pop()
+            if name in selected or name in BASE_INPUTS:
+                continue
+            selected[name] = self.stages[name]
+            stack.extend(selected[name].inputs)
+        return selected
+    
+    async def _run_stages(self,
+                          context: Dict[str, Any],
+                          stages: Dict[str, Stage],
+                          progress_callback: Optional[ProgressCallback]):
+        """
+        依赖驱动的调度：每当某阶段的全部输入出现在上下文中即启动它，
+        结果写回上下文。新增阶段只会等待自己的输入，不延后已有阶段。
+        """
+        pending = dict(stages)
+        running: Dict[asyncio.Task, str] = {}
+        
+        try:
+            while pending or running:
+                ready = [s for s in pending.values() if all(i in context for i in s.inputs)]
+                for stage in ready:
+                    del pending[stage.name]
+                    task = asyncio.ensure_future(self._run_stage(stage, context, progress_callback))
+                    running[task] = stage.name
+                
+                if not running:
+                    missing = {name: [i for i in s.inputs if i not in context] for name, s in pending.items()}
+                    raise RuntimeError(f"分析阶段依赖无法满足: {missing}")
+                
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    context[running.pop(task)] = task.result()
+        finally:
+            for task in running:
+                task.cancel()
+    
+    async def _run_stage(self,
+                         stage: Stage,
+                         context: Dict[str, Any],
+                         progress_callback: Optional[ProgressCallback]):
+        """
+        执行单个阶段：受阶段并发上限和截止时间约束，异常时返回默认值，
+        超时返回降级结果。Agent阶段完成（含失败）时发送携带结果的 agent_done 事件。
+        """
+        args = [context[name] for name in stage.inputs]
+        
+        async def call():
+            result = stage.run(*args)
+            if inspect.isawaitable(result):
+                result = await result
+            return result
+        
+        deadline = settings.AGENT_DEADLINES.get(stage.name, settings.AGENT_DEADLINE_SECONDS)
+        loop = asyncio.get_running_loop()
+        queued = loop.time()
+        
+        async with self._stage_semaphore(stage.name):
+            started = loop.time()
+            try:
+                result = await asyncio.wait_for(self._hedged(stage, call), timeout=deadline)
+                self._latency[stage.name].record(loop.time() - started)
+            except asyncio.TimeoutError:
+                self.logger.warning(f"{stage.label}超时（{deadline}秒），使用降级结果")
+                self._latency[stage.name].record(deadline)
+                try:
+                    result = stage.fallback(*args) if stage.fallback else stage.default
+                except Exception as e:
+                    self.logger.warning(f"{stage.label}降级失败: {e}")
+                    result = stage.default
+            except Exception as e:
+                self.logger.warning(f"{stage.label}异常: {e}")
+                result = stage.default
+        # 含等待阶段并发名额的时间
+        context.setdefault("stage_seconds", {})[stage.name] = loop.time() - queued
+        
+        if stage.name in AGENT_FIELDS:
+            await self._emit(progress_callback, "agent_done", agent=stage.name, result=self._dump(result))
+        return result
+    
+    def _stage_semaphore(self, name: str):
+        """阶段并发上限，未配置时不限制"""
+        limit = settings.STAGE_CONCURRENCY.get(name, 0)
+        if limit <= 0:
+            return contextlib.nullcontext()
+        if name not in self._stage_semaphores:
+            self._stage_semaphores[name] = asyncio.Semaphore(limit)
+        return self._stage_semaphores[name]
+    
+    async def _hedged(self, stage: Stage, factory: Callable[[], Awaitable]):
+        """
+        执行Agent调用；若耗时超过历史延迟分位数，再发起一次对冲调用，
+        取先完成者的结果
+        """
+        hedge_after = None
+        tracker = self._latency[stage.name]
+        if settings.AGENT_HEDGE_ENABLED and tracker.count() >= settings.AGENT_HEDGE_MIN_SAMPLES:
+            hedge_after = tracker.percentile(settings.AGENT_HEDGE_PERCENTILE)
+        
+        tasks = [asyncio.ensure_future(factory())]
+        try:
+            if hedge_after is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_after)
+                if not done:
+                    self.logger.info(f"{stage.label}超过 {hedge_after:.2f} 秒，发起对冲请求")
+                    tasks.append(asyncio.ensure_future(factory()))
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            return done.pop().result()
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    @staticmethod
+    def _dump(value: Any) -> Any:
+        """将Agent结果转换为可序列化的结构"""
+        if isinstance(value, list):
+            return [item.dict() if hasattr(item, "dict") else item for item in value]
+        if hasattr(value, "dict"):
+            return value.dict()
+        return value
+    
+    async def _analyze_math_models(self, text: DocumentText, formula_regions: Optional[List[Dict]]):
+        """分析数学模型（LLM只看版面检测出的候选公式区域，没有区域信息时只看正文开头）"""
+        paper_text = "" if formula_regions is not None else text.head(MATH_INPUT_CHARS)
+        return await self.math_agent.extract_math_models(paper_text, formula_regions)
+    
+    def _math_models_heuristic(self, text: DocumentText, formula_regions: Optional[List[Dict]]):
+        """数学模型分析超时的降级：有公式区域时不读正文，否则在全文中匹配LaTeX"""
+        return self.math_agent.extract_formulas_heuristic("" if formula_regions else str(text), formula_regions)
+    
+    async def _analyze_domain(self, metadata: Dict, text: DocumentText):
         """分析研究领域"""
         return await self.domain_agent.analyze_domain(
             title=metadata.get("title", ""),
             abstract=metadata.get("abstract", ""),
-            content=text
+            content=text.head(DOMAIN_INPUT_CHARS)
         )
     
-    async def _analyze_scholars(self, metadata: Dict, text: str):
-        """分析学者信息"""
+    async def _register_citations(self,
+                                  metadata: Dict,
+                                  references: List[Dict],
+                                  year: int,
+                                  paper_input: Optional[PaperInput],
+                                  content_hash: Optional[str]) -> Optional[int]:
+        """将论文及其参考文献登记到引文图谱，返回论文节点（标题无法识别时为 None）"""
+        title = metadata.get("title", "")
+        if not title_key(title) or title == "Unknown Title":
+            return None
+        # 日志追加、文件锁与压缩写盘都是阻塞操作，在线程中执行
+        return await asyncio.to_thread(self.citation_graph.add_paper, title, year, metadata.get("authors", []),
+                                       references, identity=_paper_identity(paper_input, content_hash))
+    
+    async def _analyze_scholars(self, metadata: Dict, text: DocumentText, graph_node: Optional[int]):
+        """分析学者信息：有引文图谱时按引用链计分排名，否则从正文提及中提取"""
+        if graph_node is not None:
+            ranked = await asyncio.to_thread(self.citation_graph.rank_authors, graph_node, limit=5)
+            if ranked:
+                return [ScholarInfo(name=name) for name, _ in ranked]
         return await self.scholar_agent.analyze_scholars(
             title=metadata.get("title", ""),
             abstract=metadata.get("abstract", ""),
             content=text
         )
     
-    async def _analyze_tech_roadmap(self, metadata: Dict, text: str):
-        """分析技术路线"""
+    async def _enrich_scholars(self, scholars: List):
+        """补全学者档案（超时降级为仅含姓名的结果）"""
+        if not settings.ENABLE_SCHOLAR_ENRICHMENT:
+            return scholars
+        return await self.scholar_enricher.enrich(scholars)
+    
+    async def _analyze_tech_roadmap(self,
+                                    metadata: Dict,
+                                    text: DocumentText,
+                                    graph_node: Optional[int],
+                                    temporal: TemporalFeatures):
+        """分析技术路线：有引文图谱时取引用链上的关键前作，否则回退到Agent"""
+        if graph_node is not None:
+            nodes = await asyncio.to_thread(self.citation_graph.roadmap, graph_node, limit=5)
+            if nodes:
+                return [
+                    TechRoadmapNode(
+                        method_name=node["title"],
+                        year=node["year"],
+                        key_papers=[node["title"]],
+                        improvement=(
+                            f"{'Direct reference' if node['hops'] == 1 else 'Indirect reference'}, "
+                            f"cited by {node['cited_by']} analyzed paper(s)"
+                        ),
+                        impact_score=node["score"],
+                    )
+                    for node in nodes
+                ]
         return await self.tech_roadmap_agent.generate_tech_roadmap(
             title=metadata.get("title", ""),
             abstract=metadata.get("abstract", ""),
-            content=text
+            content=text,
+            temporal=temporal
         )
     
-    def _get_paper_from_source(self, paper_input: PaperInput) -> Dict[str, Any]:
-        """从外部源获取论文（arXiv, DOI等）"""
-        # 简化实现，实际需要调用API
-        return {
-            "success": True,
-            "metadata": {
-                "title": paper_input.title or "Unknown",
-                "authors": [],
-                "abstract": ""
-            },
-            "full_text": "",
-            "total_pages": 0
-        }
+    async def _resolve_metadata(self, paper_input: Optional[PaperInput]) -> Dict[str, Any]:
+        """查询外部元数据（批量合并，见 MetadataResolver）"""
+        if paper_input is None or not (paper_input.arxiv_id or paper_input.doi):
+            return {}
+        return await self.resolver.resolve(arxiv_id=paper_input.arxiv_id, doi=paper_input.doi)
+    
+    async def _get_paper_from_source(self, paper_input: PaperInput) -> Tuple[Optional[str], Dict[str, Any]]:
+        """
+        从外部源获取论文（arXiv, DOI等）：下载PDF（带本地缓存）后解析
+        
+        Returns:
+            (内容哈希, 解析结果)，与上传的PDF一样按内容哈希复用解析结果
+        """
+        fetched = await self.fetcher.fetch_pdf(arxiv_id=paper_input.arxiv_id, doi=paper_input.doi)
+        if not fetched:
+            source = f"arXiv {paper_input.arxiv_id}" if paper_input.arxiv_id else f"DOI {paper_input.doi}"
+            return None, {
+                "success": False,
+                "error": f"无法获取论文PDF: {source}"
+            }
+        
+        pdf_path, digest = fetched
+        content_hash, parsed_data = await self._parse_file(pdf_path, paper_input.arxiv_id, paper_input.doi, digest)
+        if parsed_data.get("success") and paper_input.title:
+            parsed_data["metadata"]["title"] = paper_input.title
+        return content_hash, parsed_data
     
-    def _extract_year(self, text: str) -> int:
-        """从文本中提取发表年份"""
-        import re
-        year_match = re.search(r'(20|19)\d{2}', text)
-        if year_match:
-            return int(year_match.group(0))
-        return 2024
+    def _extract_year(self, temporal: TemporalFeatures) -> int:
+        """发表年份：全文中首个合理年份，未找到时取当前年份"""
+        return temporal.first_year or datetime.now().year
     
-    def _extract_innovations(self, text: str) -> list:
+    def _extract_innovations(self, text: DocumentText) -> list:
         """提取创新点"""
         keywords = ["novel", "new", "propose", "first", "innovative"]
+        found = text.contains(keywords)
         innovations = []
         
         for keyword in keywords:
-            if keyword.lower() in text.lower():
+            if keyword in found:
                 innovations.append(f"Mentioned {keyword} approach")
         
         return innovations[:5]
     
-    def _extract_limitations(self, text: str) -> list:
+    def _extract_limitations(self, text: DocumentText) -> list:
         """提取局限性"""
         keywords = ["limitation", "challenge", "future work", "limitation"]
+        found = text.contains(keywords)
         limitations = []
         
         for keyword in keywords:
-            if keyword.lower() in text.lower():
+            if keyword in found:
                 limitations.append(f"Addresses {keyword}")
         
         return limitations[:5]
     
-    def _calculate_reproducibility(self, text: str) -> float:
+    def _extract_research_gaps(self, limitations: List[str], text: DocumentText) -> List[ResearchGap]:
+        """从未来工作、开放问题等表述中提取研究空白（论文未涉及局限性时跳过）"""
+        if not limitations:
+            return []
+        
+        gaps = []
+        seen = set()
+        for chunk in text:
+            for match in GAP_CUE_PATTERN.finditer(chunk):
+                sentence = " ".join(match.group(0).split())
+                if sentence.lower() in seen:
+                    continue
+                seen.add(sentence.lower())
+                gaps.append(ResearchGap(
+                    gap_description=sentence[:300],
+                    importance=0.5,
+                    feasibility=0.5
+                ))
+                if len(gaps) >= 5:
+                    return gaps
+        
+        return gaps
+    
+    def _calculate_reproducibility(self, text: DocumentText) -> float:
         """计算可复现性评分"""
         keywords = ["code", "dataset", "github", "implementation", "reproducible"]
-        count = sum(1 for kw in keywords if kw.lower() in text.lower())
+        count = len(text.contains(keywords))
         return min(count / len(keywords), 1.0)
     
-    def _generate_summary(self, metadata: Dict, text: str) -> str:
+    def _generate_summary(self, metadata: Dict, text: DocumentText) -> str:
         """生成分析摘要"""
         title = metadata.get("title", "Unknown Paper")
         return f"Analysis of paper: {title[:50]}..."
@@ -3,55 +3,410 @@
 Paper Parser Agent
 """
 
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List
-import fitz  # PyMuPDF (imported as fitz)
+from typing import Dict, Any, Optional, List, Tuple
 import re
+import unicodedata
 from datetime import datetime
 
+from app.config import settings
+from app.services.citation_graph import title_key
+from app.services.page_cache import PageCache, page_fingerprint
+
 logger = logging.getLogger(__name__)
 
+# 参考文献章节标题（独占一行）
+REFERENCES_HEADING_RE = re.compile(
+    r"^[ \t]*(?:\d+\.?\s+)?(?:REFERENCES|References|Bibliography|BIBLIOGRAPHY|参考文献)[ \t]*$",
+    re.MULTILINE
+)
+# 条目起始: "[12] ..." 或 "12. ..."
+_NUMBERED_REF_RE = re.compile(r"^[ \t]*\[(\d{1,3})\][ \t]*", re.MULTILINE)
+_DOTTED_REF_RE = re.compile(r"^[ \t]*(\d{1,3})\.[ \t]+(?=[A-Z])", re.MULTILINE)
+# 作者-年份格式的条目以 "Surname, X." 开头，且上一条以句点结束
+_AUTHOR_YEAR_REF_RE = re.compile(r"(?<=\.)[ \t]*\n(?=[A-Z][A-Za-z'\-]+,[ \t]+[A-Z]\.)")
+_REF_YEAR_RE = re.compile(r"\(?\b((?:19|20)\d{2})[a-z]?\b\)?")
+# 句子边界：句点后接大写或引号，且句点前不是单字母缩写（作者名首字母）
+_REF_SENTENCE_RE = re.compile(r"(?<!\b[A-Z])\.\s+(?=[A-Z\"“])")
+_AUTHOR_SPLIT_RE = re.compile(r"\s*(?:;|&|,?\s+and\s+)\s*")
+_INITIALS_RE = re.compile(r"^(?:[A-Z]\.?\s*-?)+$")
+# Vancouver格式作者列表: "Kingma DP, Ba J. Title..."
+_VANCOUVER_AUTHORS_RE = re.compile(r"^((?:[A-Z][\w'\-]+ [A-Z]{1,3}, )*[A-Z][\w'\-]+ [A-Z]{1,3})(?:, et al)?\.\s+")
+_MAX_REFERENCES = 500
+
+# 修订版识别：arXiv PDF页边的编号标记 "arXiv:2301.01234v2 [cs.LG] ..."
+_ARXIV_STAMP_RE = re.compile(r"arXiv:\s*(\d{4}\.\d{4,5})(?:v\d+)?", re.IGNORECASE)
+_ARXIV_VERSION_RE = re.compile(r"v\d+$")
+# 只按标题识别时，标题至少需要的词数；更短的多为版面启发式误取的页眉
+_MIN_LINEAGE_TITLE_WORDS = 4
+# 常被误当作标题的页眉、栏目名与期刊横幅
+_GENERIC_TITLE_RE = re.compile(
+    r"^(?:unknown title|abstract|arxiv|preprint|under review|published as|accepted|"
+    r"journal of|proceedings of|transactions on|letters|research article|original article)\b"
+)
+
+# 数学字体: TeX Computer Modern / AMS / Symbol / STIX / Cambria Math 等
+_MATH_FONT_RE = re.compile(r"CMMI|CMSY|CMEX|CMBSY|MSBM|MSAM|Symbol|STIX|Math|Euler|EUFM|EUSM|rsfs|txsy|pxsy", re.IGNORECASE)
+_MATH_SYMBOLS = set("=+−×÷±∓∑∏∫∮∂∇√∞≤≥≈≠≡∝∈∉∋⊂⊃⊆⊇∪∩∧∨¬∀∃→←↔⇒⇐⇔↦⟨⟩‖^_|·⋅∘⊗⊕′")
+_EQUATION_NUMBER_RE = re.compile(r"\(\s*(\d{1,3}(?:\.\d{1,3})?[a-z]?)\s*\)\s*$")
+_PROSE_WORD_RE = re.compile(r"[A-Za-z]{4,}")
+FORMULA_SCORE_THRESHOLD = 0.45
+_MAX_FORMULA_REGIONS = 300
+
+
+def parse_references(text: str) -> List[Dict[str, Any]]:
+    """
+    解析参考文献章节
+    
+    支持 "[n]"、"n." 编号格式和按作者排序的作者-年份格式。
+    
+    Returns:
+        [{"authors": [...], "year": int | None, "title": str | None, "raw": str}]
+    """
+    if not text:
+        return []
+    
+    # 合并行尾连字符断词
+    text = re.sub(r"-\n(?=[a-z])", "", text)
+    
+    entries: List[str] = []
+    for marker in (_NUMBERED_REF_RE, _DOTTED_REF_RE):
+        starts = [m for m in marker.finditer(text)]
+        if len(starts) >= 2:
+            bounds = [m.end() for m in starts] + [len(text)]
+            entries = [text[bounds[i]:starts[i + 1].start() if i + 1 < len(starts) else len(text)]
+                       for i in range(len(starts))]
+            break
+    else:
+        entries = _AUTHOR_YEAR_REF_RE.split(text)
+    
+    references = []
+    for entry in entries[:_MAX_REFERENCES]:
+        entry = " ".join(entry.split())
+        if len(entry) < 15:
+            continue
+        references.append(_parse_reference_entry(entry))
+    return references
+
+
+def page_text_from_dict(page_dict: Dict[str, Any]) -> str:
+    """由 get_text("dict") 结果还原页面文本（与 get_text() 输出一致）"""
+    return "".join(
+        "".join(span["text"] for span in line["spans"]) + "\n"
+        for block in page_dict["blocks"] if block["type"] == 0
+        for line in block["lines"]
+    )
+
+
+def locate_formula_regions(page_dict: Dict[str, Any], page_number: int) -> List[Dict[str, Any]]:
+    """
+    根据版面信息定位页面中的行间公式
+    
+    对每一行综合以下特征打分：数学字体字符占比、数学符号密度、
+    是否居中缩进（相对所在栏）、是否带有公式编号（行末或同一高度右侧独立的 "(3)"），
+    并扣除普通单词；相邻的高分行合并为一个区域。
+    
+    Args:
+        page_dict: page.get_text("dict") 的结果
+        page_number: 页码（从1开始）
+        
+    Returns:
+        [{"page", "bbox": [x0, y0, x1, y1], "text", "equation_number", "score"}]
+    """
+    lines = []
+    for block in page_dict["blocks"]:
+        if block["type"] != 0:
+            continue
+        for line in block["lines"]:
+            spans = [span for span in line["spans"] if span["text"].strip()]
+            if spans:
+                lines.append((line["bbox"], spans))
+    if not lines:
+        return []
+    
+    columns = _text_columns([bbox for bbox, _ in lines], page_dict["width"])
+    
+    # 独立成行的编号 "(3)"，按垂直重叠归入同一高度的公式行
+    numbers: List[Tuple[Tuple[float, ...], str]] = []
+    body = []
+    for bbox, spans in lines:
+        text = "".join(span["text"] for span in spans).strip()
+        number_match = _EQUATION_NUMBER_RE.search(text)
+        if number_match and number_match.start() == 0:
+            numbers.append((bbox, number_match.group(1)))
+        else:
+            body.append((bbox, spans, text, number_match.group(1) if number_match else None))
+    
+    candidates = []
+    for bbox, spans, text, number in body:
+        if number is None:
+            number = next((n for nb, n in numbers
+                           if nb[0] >= bbox[2] and nb[1] < bbox[3] and nb[3] > bbox[1]), None)
+        score = _formula_line_score(bbox, spans, text, columns, number is not None)
+        if score >= FORMULA_SCORE_THRESHOLD:
+            candidates.append({"bbox": list(bbox), "text": text, "equation_number": number, "score": score})
+    
+    # 合并垂直相邻的候选行
+    regions: List[Dict[str, Any]] = []
+    for line in sorted(candidates, key=lambda c: (c["bbox"][1], c["bbox"][0])):
+        if regions:
+            last = regions[-1]
+            height = line["bbox"][3] - line["bbox"][1]
+            horizontal_overlap = min(last["bbox"][2], line["bbox"][2]) > max(last["bbox"][0], line["bbox"][0])
+            if horizontal_overlap and line["bbox"][1] - last["bbox"][3] < 0.8 * height:
+                last["bbox"] = [min(last["bbox"][0], line["bbox"][0]), last["bbox"][1],
+                                max(last["bbox"][2], line["bbox"][2]), max(last["bbox"][3], line["bbox"][3])]
+                last["text"] += "\n" + line["text"]
+                last["equation_number"] = last["equation_number"] or line["equation_number"]
+                last["score"] = max(last["score"], line["score"])
+                continue
+        regions.append(dict(line))
+    
+    return [
+        {
+            "page": page_number,
+            "bbox": [round(v, 1) for v in region["bbox"]],
+            "text": region["text"],
+            "equation_number": region["equation_number"],
+            "score": round(region["score"], 3),
+        }
+        for region in regions
+    ]
+
+
+def _text_columns(bboxes: List[Tuple[float, ...]], page_width: float) -> List[Tuple[float, float]]:
+    """估计正文栏的左右边界（单栏或双栏）"""
+    mid = page_width / 2
+    left = [b for b in bboxes if b[2] <= mid + 5]
+    right = [b for b in bboxes if b[0] >= mid - 5]
+    if len(left) >= 0.3 * len(bboxes) and len(right) >= 0.3 * len(bboxes):
+        groups = [left, right]
+    else:
+        groups = [bboxes]
+    
+    columns = []
+    for group in groups:
+        x0s = sorted(b[0] for b in group)
+        x1s = sorted(b[2] for b in group)
+        columns.append((x0s[len(x0s) // 10], x1s[len(x1s) * 9 // 10]))
+    return columns
+
+
+def _formula_line_score(bbox: Tuple[float, ...],
+                        spans: List[Dict[str, Any]],
+                        text: str,
+                        columns: List[Tuple[float, float]],
+                        has_number: bool) -> float:
+    """单行的公式可能性评分（0-1）"""
+    chars = [c for c in text if not c.isspace()]
+    if len(chars) < 3:
+        return 0.0
+    
+    math_font_chars = sum(
+        len(span["text"].replace(" ", "")) for span in spans if _MATH_FONT_RE.search(span["font"])
+    )
+    symbol_chars = sum(
+        1 for c in chars
+        if c in _MATH_SYMBOLS or unicodedata.category(c) == "Sm" or "\u0391" <= c <= "\u03c9"
+    )
+    prose_words = len(_PROSE_WORD_RE.findall(text))
+    
+    center = (bbox[0] + bbox[2]) / 2
+    column = min(columns, key=lambda col: abs((col[0] + col[1]) / 2 - center))
+    column_width = max(column[1] - column[0], 1.0)
+    indented = bbox[0] - column[0] > 0.08 * column_width
+    centered = indented and abs(center - (column[0] + column[1]) / 2) < 0.15 * column_width
+    
+    score = (
+        0.35 * min(1.0, 2 * math_font_chars / len(chars))
+        + 0.3 * min(1.0, 4 * symbol_chars / len(chars))
+        + 0.15 * centered
+        + 0.3 * has_number
+        - 0.1 * max(0, prose_words - 2)
+    )
+    if symbol_chars == 0 and math_font_chars == 0:
+        score = min(score, FORMULA_SCORE_THRESHOLD - 0.01)
+    return max(0.0, min(1.0, score))
+
+
+def _parse_reference_entry(entry: str) -> Dict[str, Any]:
+    """解析单条参考文献"""
+    year_match = _REF_YEAR_RE.search(entry)
+    year = int(year_match.group(1)) if year_match else None
+    
+    vancouver = _VANCOUVER_AUTHORS_RE.match(entry)
+    if vancouver:
+        authors_part = vancouver.group(1)
+        title = _REF_SENTENCE_RE.split(entry[vancouver.end():], maxsplit=1)[0]
+    # 作者-年份格式: "Authors (2017). Title. Venue." / "Authors, 2017. Title."
+    elif year_match and year_match.start() < len(entry) // 2 and _REF_SENTENCE_RE.search(entry[:year_match.start()]) is None:
+        authors_part = entry[:year_match.start()]
+        rest = entry[year_match.end():].lstrip(" .,:")
+        title = _REF_SENTENCE_RE.split(rest, maxsplit=1)[0]
+    else:
+        # 编号格式: "Authors. Title. Venue, 2017."
+        sentences = _REF_SENTENCE_RE.split(entry, maxsplit=2)
+        authors_part = sentences[0]
+        title = sentences[1] if len(sentences) > 1 else None
+    
+    if title:
+        title = title.strip(" .,\"“”")
+        if year and title.endswith(str(year)):
+            title = title[:-4].rstrip(" ,(")
+    
+    return {
+        "authors": _split_reference_authors(authors_part),
+        "year": year,
+        "title": title or None,
+        "raw": entry,
+    }
+
+
+def _split_reference_authors(text: str) -> List[str]:
+    """拆分作者列表，兼容 "Surname, X." 与 "X. Surname" 两种写法"""
+    text = re.sub(r"\bet\s+al\.?", "", text).strip(" .,(")
+    authors = []
+    for chunk in _AUTHOR_SPLIT_RE.split(text):
+        parts = [p.strip() for p in chunk.split(",") if p.strip()]
+        for part in parts:
+            # "Vaswani, A." 中的首字母归入前一个姓氏
+            if authors and _INITIALS_RE.match(part) and "," not in authors[-1] and " " not in authors[-1]:
+                authors[-1] = f"{authors[-1]}, {part}"
+            else:
+                authors.append(part)
+    return [a for a in authors if any(c.isalpha() for c in a)][:20]
+
+
+def revision_lineage(title: str, arxiv_id: Optional[str] = None, doi: Optional[str] = None,
+                     first_page: str = "") -> Optional[str]:
+    """
+    同一论文各版本共用的键：优先来源ID（不含版本号的arXiv ID、DOI），
+    其次首页的arXiv编号标记，最后才用标题
+
+    标题来自首行启发式，"Unknown Title"、过短或通用页眉类的标题会把不相关的论文
+    归为一篇，此时返回 None，不做修订比较。
+    """
+    if arxiv_id:
+        return f"arxiv:{_ARXIV_VERSION_RE.sub('', arxiv_id.strip().lower())}"
+    if doi:
+        return f"doi:{doi.strip().lower()}"
+    stamp = _ARXIV_STAMP_RE.search(first_page)
+    if stamp:
+        return f"arxiv:{stamp.group(1)}"
+
+    key = title_key(title or "")
+    if len(key.split()) < _MIN_LINEAGE_TITLE_WORDS or _GENERIC_TITLE_RE.match(key):
+        return None
+    return f"title:{key}"
+
+
+def section_hashes(sections: Dict[str, str]) -> Dict[str, str]:
+    """各章节文本的摘要，修订记录只保存摘要而不是章节全文"""
+    return {name: hashlib.sha1(text.encode("utf-8")).hexdigest() for name, text in sections.items()}
+
+
+def diff_revision(previous: Dict[str, Any],
+                  page_hashes: List[str],
+                  sections: Dict[str, str]) -> Dict[str, Any]:
+    """
+    与同一论文上一次解析的结果比较，得到变化的页面和章节
+
+    Args:
+        previous: 上一版本的解析记录（page_hashes, section_hashes）
+        page_hashes: 当前版本各页的页面指纹
+        sections: 当前版本的章节摘要（见 section_hashes）
+
+    Returns:
+        changed_pages 为内容有变化的页码（从1开始），changed_sections 为有变化的章节名
+    """
+    previous_hashes = set(previous.get("page_hashes") or [])
+    previous_sections = previous.get("section_hashes")
+    if previous_sections is None:
+        # 旧版记录保存的是章节全文
+        previous_sections = section_hashes(previous.get("sections") or {})
+
+    return {
+        "previous_pages": len(previous.get("page_hashes") or []),
+        "changed_pages": [i + 1 for i, h in enumerate(page_hashes) if h not in previous_hashes],
+        "changed_sections": sorted(
+            name for name in set(sections) | set(previous_sections)
+            if sections.get(name) != previous_sections.get(name)
+        ),
+    }
+
 
 class PaperParserAgent:
     """论文解析Agent"""
     
-    def __init__(self):
+    def __init__(self, page_cache: Optional[PageCache] = None):
         self.logger = logger
+        # 按页面指纹缓存提取结果，修订版论文只需重新提取有变化的页面
+        if page_cache is None and settings.ENABLE_PARSE_CACHE:
+            page_cache = PageCache(settings.PARSE_CACHE_DIR)
+        self.page_cache = page_cache
         
-    def parse_pdf(self, pdf_path: str) -> Dict[str, Any]:
+    def parse_pdf(self, pdf_path: str, arxiv_id: Optional[str] = None, doi: Optional[str] = None) -> Dict[str, Any]:
         """
         解析PDF文件，提取结构化信息
         
         Args:
             pdf_path: PDF文件路径
+            arxiv_id: 来源arXiv ID（可选），用于识别同一论文的修订版
+            doi: 来源DOI（可选），用于识别同一论文的修订版
             
         Returns:
             包含元数据、全文、章节等信息的字典
         """
         try:
-            doc = pymupdf.open(pdf_path)
+            import fitz  # PyMuPDF，首次解析时导入
             
-            # 提取文本内容
-            full_text = ""
-            sections = {}
+            doc = fitz.open(pdf_path)
+            
+            # 提取文本内容，同一次版面解析中定位行间公式；页面指纹命中缓存时跳过提取
+            page_texts = []
+            page_hashes = []
+            formula_regions = []
+            extracted = 0
             
             for page_num, page in enumerate(doc):
-                text = page.get_text()
-                full_text += text + "\n"
+                entry, fingerprint, cached = self._extract_page(page, page_num + 1)
+                extracted += not cached
+                page_texts.append(entry["text"])
+                page_hashes.append(fingerprint)
+                if len(formula_regions) < _MAX_FORMULA_REGIONS:
+                    # 缓存的区域可能来自其他文档的不同页码
+                    formula_regions.extend(dict(region, page=page_num + 1) for region in entry["formula_regions"])
+            
+            full_text = "".join(text + "\n" for text in page_texts)
+            page_offsets = [0]
+            for text in page_texts:
+                page_offsets.append(page_offsets[-1] + len(text) + 1)
             
             # 识别主要章节
             sections = self._identify_sections(full_text)
+            references = parse_references(sections.get("references", ""))
             
             # 提取元数据
-            metadata = self._extract_metadata(doc, full_text)
+            metadata = self._extract_metadata(doc, full_text, page_texts[0] if page_texts else "")
+            total_pages = len(doc)
             
             doc.close()
             
+            if self.page_cache is not None:
+                self.logger.info(f"PDF解析: {total_pages} 页，重新提取 {extracted} 页")
+            
             return {
                 "metadata": metadata,
                 "full_text": full_text,
                 "sections": sections,
-                "total_pages": len(doc),
+                "references": references,
+                "formula_regions": formula_regions[:_MAX_FORMULA_REGIONS],
+                "total_pages": total_pages,
+                "page_offsets": page_offsets,
+                "revision": self._record_revision(
+                    revision_lineage(metadata.get("title", ""), arxiv_id, doi, page_texts[0] if page_texts else ""),
+                    metadata, page_hashes, sections),
                 "success": True
             }
             
@@ -62,9 +417,65 @@ class PaperParserAgent:
                 "error": str(e)
             }
     
-    def _extract_metadata(self, doc, full_text: str) -> Dict[str, Any]:
+    def _extract_page(self, page, page_number: int) -> Tuple[Dict[str, Any], Optional[str], bool]:
+        """
+        提取单页文本和公式区域，先按页面指纹查缓存
+
+        Returns:
+            (提取结果, 页面指纹, 是否命中缓存)；未启用缓存或指纹计算失败时指纹为 None
+        """
+        fingerprint = None
+        if self.page_cache is not None:
+            try:
+                fingerprint = page_fingerprint(page)
+            except Exception as e:
+                self.logger.debug(f"页面指纹计算失败: {e}")
+            if fingerprint is not None:
+                cached = self.page_cache.get_page(fingerprint)
+                if cached is not None:
+                    return cached, fingerprint, True
+        
+        import fitz
+        
+        page_dict = page.get_text("dict", flags=fitz.TEXTFLAGS_TEXT)
+        entry = {
+            "text": page_text_from_dict(page_dict),
+            "formula_regions": locate_formula_regions(page_dict, page_number),
+        }
+        if fingerprint is not None:
+            self.page_cache.put_page(fingerprint, entry)
+        return entry, fingerprint, False
+    
+    def _record_revision(self,
+                         lineage: Optional[str],
+                         metadata: Dict[str, Any],
+                         page_hashes: List[Optional[str]],
+                         sections: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        按版本键（见 revision_lineage）识别同一论文的不同版本，记录本次解析并返回与上一版本的差异
+
+        Returns:
+            首次解析、内容未变化或无法识别时为 None
+        """
+        if self.page_cache is None or not lineage or None in page_hashes:
+            return None
+        
+        previous = self.page_cache.get_document(lineage)
+        hashes = section_hashes(sections)
+        self.page_cache.put_document(lineage, {
+            "title": metadata.get("title"),
+            "page_hashes": page_hashes,
+            "section_hashes": hashes,
+            "parsed_at": datetime.now().isoformat(),
+        })
+        if previous is None or previous.get("page_hashes") == page_hashes:
+            return None
+        return diff_revision(previous, page_hashes, hashes)
+    
+    def _extract_metadata(self, doc, full_text: str, first_page: Optional[str] = None) -> Dict[str, Any]:
         """提取论文元数据"""
-        first_page = doc[0].get_text()
+        if first_page is None:
+            first_page = doc[0].get_text()
         lines = [l.strip() for l in first_page.split("\n") if l.strip()]
         
         return {
@@ -132,6 +543,11 @@ class PaperParserAgent:
                     sections[section_name] = text[start:start+2000]
                     break
         
+        # 参考文献通常位于正文末尾，取最后一个标题到全文结束（可能后接附录）
+        headings = list(REFERENCES_HEADING_RE.finditer(text))
+        if headings:
+            sections["references"] = text[headings[-1].end():]
+        
         return sections
 
 
@@ -4,43 +4,50 @@ Scholar Analyzer Agent
 """
 
 import logging
-from typing import List, Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from collections import Counter
+from typing import Iterable, List, Dict, Any, Union
 import json
 import re
 
 from app.models.schemas import ScholarInfo
-from app.config import settings
+from app.services.llm import create_llm
 
 logger = logging.getLogger(__name__)
 
+# 引文中的作者提及: "Name Surname et al." 或 "Name Surname, 2020"
+# 用前瞻合并两种形式，一次扫描全文
+CITATION_NAME_PATTERN = re.compile(r"\b([A-Z][a-z]+\s+[A-Z][a-z]+)(?=\s+et\s+al|,\s+\d{4})")
+
+
+def count_citation_mentions(text: Union[str, Iterable[str]]) -> Counter:
+    """统计全文（或按顺序产出的正文分块）中每个作者名被引用提及的次数"""
+    return Counter(
+        name
+        for chunk in ((text,) if isinstance(text, str) else text)
+        for name in CITATION_NAME_PATTERN.findall(chunk)
+        if len(name) > 5
+    )
+
 
 class ScholarAnalyzerAgent:
     """学者信息分析Agent"""
     
     def __init__(self):
         self.logger = logger
-        import os
-        os.environ['OPENAI_PROXY'] = ''
-        
-        self.llm = ChatOpenAI(
-            model_name=settings.OPENAI_MODEL,
-            temperature=settings.OPENAI_TEMPERATURE,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
+        # LLM_BACKEND 可切换为录制/回放（见 app.services.llm）
+        self.llm = create_llm()
     
     async def analyze_scholars(self, 
                               title: str,
                               abstract: str,
-                              content: str) -> List[ScholarInfo]:
+                              content: Union[str, Iterable[str]]) -> List[ScholarInfo]:
         """
         识别论文中引用的关键学者
         
         Args:
             title: 论文标题
             abstract: 摘要
-            content: 论文内容
+            content: 论文内容，或按块产出正文的可迭代对象
             
         Returns:
             ScholarInfo列表
@@ -64,22 +71,6 @@ class ScholarAnalyzerAgent:
             self.logger.error(f"学者分析错误: {str(e)}")
             return []
     
-    def _extract_scholar_names(self, text: str) -> List[str]:
-        """从文本中提取可能的学者名字"""
-        # 简单的启发式方法：查找括号内的名字
-        names = []
-        
-        # 匹配 "Name et al." 或 "(Name, Year)" 模式
-        patterns = [
-            r'([A-Z][a-z]+\s+[A-Z][a-z]+)\s+et\s+al',
-            r'([A-Z][a-z]+\s+[A-Z][a-z]+),\s+\d{4}',
-        ]
-        
-        for pattern in patterns:
-            matches = re.finditer(pattern, text)
-            for match in matches:
-                name = match.group(1).strip()
-                if name not in names and len(name) > 5:
-                    names.append(name)
-        
-        return names[:10]
+    def _extract_scholar_names(self, text: Union[str, Iterable[str]], limit: int = 10) -> List[str]:
+        """从文本中提取可能的学者名字，按被提及次数降序（同次数按首次出现顺序）"""
+        return [name for name, _ in count_citation_mentions(text).most_common(limit)]
@@ -4,14 +4,12 @@ Tech Roadmap Agent
 """
 
 import logging
-import re
-from typing import List, Dict, Any
-from langchain_openai import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
+from typing import Iterable, List, Dict, Any, Optional, Union
 import json
 
 from app.models.schemas import TechRoadmapNode
-from app.config import settings
+from app.services.llm import create_llm
+from app.utils.temporal import TemporalFeatures, extract_temporal_features
 
 logger = logging.getLogger(__name__)
 
@@ -21,26 +19,22 @@ class TechRoadmapAgent:
     
     def __init__(self):
         self.logger = logger
-        import os
-        os.environ['OPENAI_PROXY'] = ''
-        
-        self.llm = ChatOpenAI(
-            model_name=settings.OPENAI_MODEL,
-            temperature=settings.OPENAI_TEMPERATURE,
-            openai_api_key=settings.OPENAI_API_KEY
-        )
+        # LLM_BACKEND 可切换为录制/回放（见 app.services.llm）
+        self.llm = create_llm()
     
     async def generate_tech_roadmap(self,
                                    title: str,
                                    abstract: str,
-                                   content: str) -> List[TechRoadmapNode]:
+                                   content: Union[str, Iterable[str]],
+                                   temporal: Optional[TemporalFeatures] = None) -> List[TechRoadmapNode]:
         """
         生成技术发展路线图
         
         Args:
             title: 论文标题
             abstract: 摘要
-            content: 论文内容
+            content: 论文内容，或按块产出正文的可迭代对象
+            temporal: 已提取的年份特征，未提供时扫描 content
             
         Returns:
             技术路线节点列表
@@ -49,17 +43,10 @@ class TechRoadmapAgent:
             # 从论文内容中提取技术演进信息
             nodes = []
             
-            # 简单启发式：查找论文中提及的年份和方法
-            year_patterns = re.finditer(r'((?:20|19)\d{2})', content)
-            method_patterns = re.finditer(r'([A-Z][a-zA-Z]+(?:\s+[A-Z][a-zA-Z]+)*)', content)
-            
-            years = []
-            for match in year_patterns:
-                year = int(match.group(1))
-                if 1990 <= year <= 2024:
-                    years.append(year)
-            
-            years = sorted(list(set(years)))
+            # 简单启发式：按论文中提及的年份生成节点
+            if temporal is None:
+                temporal = extract_temporal_features(content)
+            years = temporal.years(min_year=1990)
             
             # 为每个年份创建节点
             for i, year in enumerate(years[:5]):  # 限制5个节点
@@ -5,11 +5,16 @@ Main FastAPI Application
 
 import logging
 import asyncio
+import contextlib
+import hmac
+import json
 import uuid
 import sys
 import os
+import threading
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List, Dict, Any, Tuple
 from pathlib import Path
 
 # 确保app模块可以被导入
@@ -18,17 +23,27 @@ project_root = Path(__file__).parent.parent
 if str(project_root) not in sys.path:
     sys.path.insert(0, str(project_root))
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks, Query, Request, Response, WebSocket, WebSocketDisconnect, Depends, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse
 from contextlib import asynccontextmanager
 import uvicorn
 
 from app.config import settings
-from app.models.schemas import PaperInput, PaperAnalysis, AnalysisStatus, TaskResponse
+from app.models.schemas import (
+    PaperInput, PaperAnalysis, AnalysisStatus, TaskResponse, BatchAnalyzeRequest, DomainStats,
+    ANALYSIS_FIELDS
+)
 from app.agents.orchestrator import AcademicAnalysisOrchestrator
-from app.services.cache_service import CacheService
+from app.services.cache_service import (
+    CacheService, ANALYSIS_BASE_FIELD, analysis_cache_key, split_analysis, merge_analysis
+)
+from app.services.page_cache import PageCache
 from app.services.rag_service import RAGService
+from app.services.task_store import TaskStore, TERMINAL_STATUSES, ready_fields
+from app.services.upload_store import UploadStore
+from app.utils.encoded_response import EncodedResponseCache
+from app.utils.profiler import SamplingProfiler, LoopLagMonitor, ProfilerBusy
 
 # 配置日志
 logging.basicConfig(
@@ -41,9 +56,38 @@ logger = logging.getLogger(__name__)
 orchestrator = AcademicAnalysisOrchestrator()
 cache_service = CacheService()
 rag_service = RAGService()
+upload_store = UploadStore()
+
+# 任务状态存储（含进度事件推送）
+task_store = TaskStore()
+
+# 已完成任务的状态响应：序列化一次，之后的轮询直接返回字节
+completed_responses = EncodedResponseCache(settings.RESPONSE_CACHE_SIZE)
+
+# 各阶段完成时的进度百分比，每个Agent完成再增加 AGENT_PROGRESS_STEP
+STAGE_PROGRESS = {"started": 10, "parsed": 30, "analyzed": 90, "cached": 95, "completed": 100}
+AGENT_PROGRESS_STEP = 15
+
+# SSE心跳间隔（秒）
+SSE_HEARTBEAT_INTERVAL = 15
+
+# 所有批量请求共享的分析并发上限
+batch_semaphore = asyncio.Semaphore(settings.BATCH_MAX_CONCURRENCY)
+
+# Agent后台预热状态，/ready 据此判断是否可接收分析请求
+warmup_state: Dict[str, Any] = {"ready": False, "errors": {}, "seconds": None}
+
+# 按需采样分析（仅管理接口触发）与常驻的事件循环延迟监测
+profiler = SamplingProfiler()
+loop_lag = LoopLagMonitor(settings.LOOP_LAG_INTERVAL)
 
-# 内存任务队列
-task_queue: dict = {}
+
+async def _warm_up_agents():
+    """后台导入并构造Agent，不阻塞服务启动"""
+    started = time.perf_counter()
+    errors = await asyncio.to_thread(orchestrator.warm_up)
+    warmup_state.update(ready=True, errors=errors, seconds=round(time.perf_counter() - started, 3))
+    logger.info(f"Agent预热完成，耗时 {warmup_state['seconds']} 秒")
 
 
 # 使用现代的 lifespan 上下文管理器替代废弃的 on_event
@@ -61,12 +105,33 @@ async def lifespan(app: FastAPI):
     # 连接服务
     await cache_service.connect()
     await rag_service.initialize()
+    if settings.SHARED_STATE:
+        # 多worker部署时任务状态、指标与知识库经Redis共享；Redis不可用时各worker独立
+        task_store.attach(cache_service.redis_client)
+        rag_service.attach(cache_service.redis_client)
+    
+    # 按配额定期清理上传目录与页面解析缓存；Agent与知识库索引在后台预热，启动不等待
+    background = [
+        asyncio.create_task(upload_store.run_reaper()),
+        asyncio.create_task(_warm_up_agents()),
+        asyncio.create_task(rag_service.warm_up()),
+    ]
+    if settings.ENABLE_PARSE_CACHE:
+        background.append(asyncio.create_task(PageCache(settings.PARSE_CACHE_DIR).run_reaper()))
+    loop_lag.start()
     
     logger.info("✅ 系统启动完成")
     
     yield
     
     # 关闭事件
+    for task in background:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+    await loop_lag.stop()
+    await orchestrator.close()
+    await rag_service.close()
     await cache_service.disconnect()
     logger.info("👋 系统已关闭")
 
@@ -99,6 +164,8 @@ async def root():
         "endpoints": {
             "analyze": "/api/v1/analyze",
             "status": "/api/v1/status/{task_id}",
+            "ready": "/ready",
+            "events": "/api/v1/status/{task_id}/events",
             "search": "/api/v1/search",
             "docs": "/docs"
         }
@@ -111,13 +178,30 @@ async def health_check():
     return {"status": "healthy"}
 
 
+@app.get("/ready")
+async def readiness_check(response: Response):
+    """
+    就绪检查 - Agent预热完成后返回200
+
+    /health 只表示进程存活；负载均衡与滚动发布应以本端点判断是否转发请求。
+    """
+    if not warmup_state["ready"]:
+        response.status_code = 503
+        return {"status": "warming_up"}
+    if warmup_state["errors"]:
+        response.status_code = 503
+        return {"status": "degraded", "errors": warmup_state["errors"]}
+    return {"status": "ready", "warmup_seconds": warmup_state["seconds"]}
+
+
 @app.post("/api/v1/analyze", response_model=TaskResponse)
 async def analyze_paper(
     background_tasks: BackgroundTasks,
     file: Optional[UploadFile] = None,
     arxiv_id: Optional[str] = None,
     doi: Optional[str] = None,
-    title: Optional[str] = None
+    title: Optional[str] = None,
+    include: Optional[List[str]] = Query(None)
 ):
     """
     论文分析主接口
@@ -126,28 +210,16 @@ async def analyze_paper(
     1. 上传PDF文件
     2. 提供arXiv ID
     3. 提供DOI
+    
+    include 指定需要的分析字段（逗号分隔或重复参数），未指定时计算全部字段。
+    缓存按字段存储，已缓存的字段不会重复计算。上传的PDF按内容哈希查找缓存。
     """
     try:
+        requested = _parse_include(include)
+        
         # 生成任务ID
         task_id = str(uuid.uuid4())
         
-        # 检查缓存
-        cache_key = None
-        if arxiv_id:
-            cache_key = f"paper:arxiv:{arxiv_id}"
-        elif doi:
-            cache_key = f"paper:doi:{doi}"
-        
-        if cache_key and settings.ENABLE_REDIS_CACHE:
-            cached_result = await cache_service.get(cache_key)
-            if cached_result:
-                logger.info(f"缓存命中: {cache_key}")
-                return TaskResponse(
-                    task_id=task_id,
-                    status=AnalysisStatus.COMPLETED,
-                    result=PaperAnalysis(**cached_result)
-                )
-        
         # 验证输入
         if not file and not arxiv_id and not doi:
             raise HTTPException(
@@ -155,13 +227,35 @@ async def analyze_paper(
                 detail="必须提供PDF文件、arXiv ID或DOI之一"
             )
         
-        # 保存上传的文件
+        # 保存上传的文件（按内容去重，任务持有指向内容的硬链接）
         file_path = None
+        content_hash = None
         if file:
-            file_path = f"{settings.UPLOAD_DIR}/{task_id}_{file.filename}"
-            with open(file_path, "wb") as f:
-                content = await file.read()
-                f.write(content)
+            with upload_store.open_writer(file.filename, task_id) as writer:
+                while chunk := await file.read(1 << 20):
+                    writer.write(chunk)
+                    if writer.size > settings.MAX_UPLOAD_SIZE:
+                        raise HTTPException(
+                            status_code=413,
+                            detail=f"文件超过大小上限 {settings.MAX_UPLOAD_SIZE} 字节"
+                        )
+            file_path, content_hash = writer.task_path, writer.digest
+        
+        # 检查缓存（上传的文件优先于 arxiv_id/doi 解析，缓存键同样按内容哈希）
+        cache_key = analysis_cache_key(arxiv_id, doi, content_hash)
+        
+        cached_entries = {}
+        if cache_key and settings.ENABLE_REDIS_CACHE:
+            cached_entries = await cache_service.get_hash(cache_key)
+            cached_result = _cached_analysis(cached_entries, requested)
+            if cached_result:
+                logger.info(f"缓存命中: {cache_key}")
+                upload_store.release(file_path)
+                return TaskResponse(
+                    task_id=task_id,
+                    status=AnalysisStatus.COMPLETED,
+                    result=PaperAnalysis(**cached_result)
+                )
         
         # 创建任务
         paper_input = PaperInput(
@@ -172,26 +266,23 @@ async def analyze_paper(
         )
         
         # 初始化任务状态
-        task_queue[task_id] = {
-            "status": AnalysisStatus.PENDING,
-            "progress": 0,
-            "result": None,
-            "error": None,
-            "created_at": datetime.now()
-        }
+        await task_store.create(task_id)
         
         # 后台执行分析
         background_tasks.add_task(
             run_analysis,
             task_id,
             paper_input,
-            cache_key
+            cache_key,
+            requested,
+            cached_entries
         )
         
         return TaskResponse(
             task_id=task_id,
             status=AnalysisStatus.PROCESSING,
-            message=f"分析已启动，使用 /api/v1/status/{task_id} 查询进度"
+            message=f"分析已启动，使用 /api/v1/status/{task_id} 查询进度，"
+                    f"或订阅 /api/v1/status/{task_id}/events 接收推送"
         )
         
     except HTTPException:
@@ -201,62 +292,383 @@ async def analyze_paper(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def run_analysis(task_id: str, paper_input: PaperInput, cache_key: Optional[str]):
+def _parse_include(include: Optional[List[str]]) -> Tuple[str, ...]:
+    """解析并校验 include 参数，未指定时返回全部分析字段"""
+    if not include:
+        return ANALYSIS_FIELDS
+    
+    fields = tuple(dict.fromkeys(
+        field.strip() for value in include for field in value.split(",") if field.strip()
+    ))
+    unknown = set(fields) - set(ANALYSIS_FIELDS)
+    if unknown:
+        raise HTTPException(
+            status_code=400,
+            detail=f"未知的分析字段: {', '.join(sorted(unknown))}，可选: {', '.join(ANALYSIS_FIELDS)}"
+        )
+    return fields
+
+
+def _cached_analysis(entries: Dict[str, Any], requested: Tuple[str, ...]) -> Optional[dict]:
+    """缓存已覆盖全部请求字段时返回合并后的结果"""
+    if ANALYSIS_BASE_FIELD in entries and all(field in entries for field in requested):
+        return merge_analysis(entries)
+    return None
+
+
+async def _analyze_missing(paper_input: PaperInput,
+                           requested: Tuple[str, ...],
+                           cached_entries: Dict[str, Any],
+                           progress_callback=None) -> Tuple[PaperAnalysis, Dict[str, Any]]:
+    """
+    只计算缓存中缺少的字段，并与已缓存字段合并
+    
+    Returns:
+        (合并后的结果, 需要写入缓存的新字段)
+    """
+    missing = [field for field in requested if field not in cached_entries]
+    result = await orchestrator.analyze_paper(
+        paper_input,
+        progress_callback=progress_callback,
+        include=missing
+    )
+    
+    new_entries = split_analysis(result.dict(), missing)
+    if ANALYSIS_BASE_FIELD in cached_entries:
+        # 保留已缓存的基础信息（paper_id等），保证多次补算结果一致
+        del new_entries[ANALYSIS_BASE_FIELD]
+    
+    merged = merge_analysis({**cached_entries, **new_entries})
+    return PaperAnalysis(**merged), new_entries
+
+
+async def _store_result(cache_key: Optional[str], result: PaperAnalysis, new_entries: Dict[str, Any]):
+    """按字段缓存新计算的结果，并把合并结果写入知识库"""
+    if cache_key and settings.ENABLE_REDIS_CACHE and new_entries:
+        await cache_service.set_hash(cache_key, new_entries)
+    
+    if settings.ENABLE_RAG:
+        await rag_service.add_paper(result.dict())
+
+
+async def run_analysis(task_id: str,
+                       paper_input: PaperInput,
+                       cache_key: Optional[str],
+                       requested: Tuple[str, ...] = ANALYSIS_FIELDS,
+                       cached_entries: Optional[Dict[str, Any]] = None):
     """后台执行论文分析"""
     try:
         logger.info(f"[{task_id}] 开始分析")
-        task_queue[task_id]["status"] = AnalysisStatus.PROCESSING
-        task_queue[task_id]["progress"] = 10
+        await task_store.update(
+            task_id, stage="started",
+            status=AnalysisStatus.PROCESSING,
+            progress=STAGE_PROGRESS["started"]
+        )
         
-        # 执行分析
-        result = await orchestrator.analyze_paper(paper_input)
+        async def on_progress(stage: str, data: dict):
+            task = await task_store.get(task_id)
+            if stage == "agent_done":
+                # 发布该Agent的结果，客户端无需等待其余Agent
+                agent, result = data["agent"], data.get("result")
+                progress = min(task["progress"] + AGENT_PROGRESS_STEP, STAGE_PROGRESS["analyzed"])
+                await task_store.update(
+                    task_id, stage=f"{agent}_done",
+                    event_data={agent: result},
+                    progress=progress,
+                    partial={**task["partial"], agent: result}
+                )
+            elif stage in STAGE_PROGRESS:
+                await task_store.update(task_id, stage=stage, progress=STAGE_PROGRESS[stage])
+        
+        # 执行分析（只计算缓存中缺少的字段）
+        result, new_entries = await _analyze_missing(
+            paper_input, requested, cached_entries or {}, progress_callback=on_progress
+        )
+        await task_store.update(task_id, stage="analyzed", progress=STAGE_PROGRESS["analyzed"])
         
-        task_queue[task_id]["progress"] = 100
-        task_queue[task_id]["status"] = AnalysisStatus.COMPLETED
-        task_queue[task_id]["result"] = result.dict()
+        # 缓存结果并写入知识库
+        await _store_result(cache_key, result, new_entries)
+        await task_store.update(task_id, stage="cached", progress=STAGE_PROGRESS["cached"])
         
-        # 缓存结果
-        if cache_key and settings.ENABLE_REDIS_CACHE:
-            await cache_service.set(cache_key, result.dict())
+        task = await task_store.update(
+            task_id, stage="completed",
+            status=AnalysisStatus.COMPLETED,
+            progress=STAGE_PROGRESS["completed"],
+            result=result.dict()
+        )
+        encoded = completed_responses.put(task_id, _task_response(task_id, task, result).model_dump_json().encode())
+        await task_store.save_response(task_id, encoded.body)
         
         logger.info(f"[{task_id}] 分析完成")
         
     except Exception as e:
         logger.error(f"[{task_id}] 分析失败: {str(e)}")
-        task_queue[task_id]["status"] = AnalysisStatus.FAILED
-        task_queue[task_id]["error"] = str(e)
+        await task_store.update(
+            task_id, stage="failed",
+            status=AnalysisStatus.FAILED,
+            error=str(e)
+        )
+    finally:
+        upload_store.release(paper_input.file_path)
 
 
-@app.get("/api/v1/status/{task_id}", response_model=TaskResponse)
-async def get_task_status(task_id: str):
-    """查询任务执行状态"""
-    if task_id not in task_queue:
-        raise HTTPException(status_code=404, detail="任务不存在")
+@app.post("/api/v1/analyze/batch")
+async def analyze_batch(batch: BatchAnalyzeRequest, request: Request):
+    """
+    批量论文分析接口
+    
+    一次批量查询缓存，只对未命中的论文在共享并发上限下执行分析，
+    每篇论文完成即推送一条结果。默认返回NDJSON，
+    请求头 Accept: text/event-stream 时返回SSE。
+    """
+    requested = _parse_include(batch.include)
+    
+    items = []
+    seen = set()
+    for source, values in (("arxiv_id", batch.arxiv_ids), ("doi", batch.dois)):
+        for value in values:
+            if value and (source, value) not in seen:
+                seen.add((source, value))
+                items.append((source, value))
+    
+    if not items:
+        raise HTTPException(status_code=400, detail="必须提供至少一个arXiv ID或DOI")
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"单次批量请求最多 {settings.BATCH_MAX_ITEMS} 篇论文"
+        )
+    
+    keyed = [(source, value, analysis_cache_key(**{source: value})) for source, value in items]
+    
+    entries = {}
+    if settings.ENABLE_REDIS_CACHE:
+        entries = await cache_service.get_hash_many([key for _, _, key in keyed])
+    cached = {}
+    for key, cached_entries in entries.items():
+        cached_result = _cached_analysis(cached_entries, requested)
+        if cached_result:
+            cached[key] = cached_result
+    
+    use_sse = "text/event-stream" in request.headers.get("accept", "")
     
-    task = task_queue[task_id]
+    def encode(record: dict) -> str:
+        data = json.dumps(record, ensure_ascii=False, default=str)
+        if use_sse:
+            return f"event: {record['event']}\ndata: {data}\n\n"
+        return data + "\n"
     
+    async def analyze_one(source: str, value: str, cache_key: str) -> dict:
+        record = {"event": "result", source: value, "cached": False}
+        try:
+            async with batch_semaphore:
+                result, new_entries = await _analyze_missing(
+                    PaperInput(**{source: value}), requested, entries.get(cache_key, {})
+                )
+            await _store_result(cache_key, result, new_entries)
+            record.update(status=AnalysisStatus.COMPLETED, result=result.dict())
+        except Exception as e:
+            logger.error(f"批量分析失败 {source}={value}: {str(e)}")
+            record.update(status=AnalysisStatus.FAILED, error=str(e))
+        return record
+    
+    async def stream():
+        completed = failed = 0
+        for source, value, key in keyed:
+            if key in cached:
+                completed += 1
+                yield encode({
+                    "event": "result", source: value, "cached": True,
+                    "status": AnalysisStatus.COMPLETED, "result": cached[key]
+                })
+        
+        tasks = [
+            asyncio.create_task(analyze_one(source, value, key))
+            for source, value, key in keyed if key not in cached
+        ]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                record = await next_done
+                if record["status"] == AnalysisStatus.COMPLETED:
+                    completed += 1
+                else:
+                    failed += 1
+                yield encode(record)
+        finally:
+            # 客户端断开时取消尚未完成的分析
+            for task in tasks:
+                task.cancel()
+        
+        yield encode({
+            "event": "done",
+            "total": len(keyed),
+            "cache_hits": len(cached),
+            "completed": completed,
+            "failed": failed
+        })
+    
+    media_type = "text/event-stream" if use_sse else "application/x-ndjson"
+    return StreamingResponse(stream(), media_type=media_type)
+
+
+def _task_etag(task_id: str, task: dict) -> str:
+    """任务状态的弱ETag，任务每次更新版本号递增"""
+    return f'W/"{task_id}-{task["version"]}"'
+
+
+def _task_response(task_id: str, task: dict, result: Optional[PaperAnalysis] = None) -> TaskResponse:
+    """任务记录 -> 状态响应模型（已有结果模型时不再重新校验）"""
+    if result is None and task["result"]:
+        result = PaperAnalysis(**task["result"])
     return TaskResponse(
         task_id=task_id,
         status=task["status"],
         progress=task["progress"],
-        result=PaperAnalysis(**task["result"]) if task["result"] else None,
+        result=result,
+        partial_result=task["partial"] if not result else {},
+        ready_fields=ready_fields(task),
         error=task["error"]
     )
 
 
+@app.get("/api/v1/status/{task_id}", response_model=TaskResponse)
+async def get_task_status(task_id: str, request: Request, response: Response):
+    """
+    查询任务执行状态
+    
+    支持 If-None-Match，任务未变化时返回304且不构造结果。
+    已完成任务返回预序列化的正文，并按 Accept-Encoding 使用 br / gzip 压缩。
+    共享模式下先只读取任务的状态与版本号，比较ETag或取到已保存的正文后即返回，
+    不解码完整的任务记录。
+    """
+    meta = await task_store.get_meta(task_id)
+    if meta is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    etag = _task_etag(task_id, meta)
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    if meta["status"] == AnalysisStatus.COMPLETED:
+        encoded = completed_responses.get(task_id)
+        if encoded is None:
+            # 其他worker完成的任务：取其保存的正文；正文尚未写入时由完整记录序列化
+            body = await task_store.load_response(task_id)
+            if body is None:
+                task = await task_store.get(task_id)
+                if task is None:
+                    raise HTTPException(status_code=404, detail="任务不存在")
+                body = _task_response(task_id, task).model_dump_json().encode()
+            encoded = completed_responses.put(task_id, body)
+        return encoded.response(request.headers.get("accept-encoding"), headers={"ETag": etag})
+    
+    task = await task_store.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    response.headers["ETag"] = _task_etag(task_id, task)
+    return _task_response(task_id, task)
+
+
+@app.get("/api/v1/status/{task_id}/events")
+async def stream_task_events(task_id: str, request: Request):
+    """通过SSE推送任务进度，任务结束后关闭连接"""
+    task = await task_store.get(task_id)
+    if task is None:
+        raise HTTPException(status_code=404, detail="任务不存在")
+    
+    queue = task_store.subscribe(task_id)
+    
+    def encode(event: dict) -> str:
+        data = json.dumps(event, ensure_ascii=False, default=str)
+        return f"id: {event['version']}\nevent: {event['event']}\ndata: {data}\n\n"
+    
+    async def stream():
+        try:
+            event = task_store.snapshot(task_id, task)
+            yield encode(event)
+            while event["status"] not in TERMINAL_STATUSES:
+                try:
+                    next_event = await asyncio.wait_for(queue.get(), timeout=SSE_HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": heartbeat\n\n"
+                    continue
+                # 跨worker转发时可能收到重复或过期的快照
+                if next_event["version"] <= event["version"]:
+                    continue
+                event = next_event
+                yield encode(event)
+        finally:
+            task_store.unsubscribe(task_id, queue)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@app.websocket("/api/v1/ws/status/{task_id}")
+async def websocket_task_events(websocket: WebSocket, task_id: str):
+    """通过WebSocket推送任务进度，任务结束后关闭连接"""
+    await websocket.accept()
+    
+    task = await task_store.get(task_id)
+    if task is None:
+        await websocket.close(code=4404, reason="任务不存在")
+        return
+    
+    queue = task_store.subscribe(task_id)
+    try:
+        event = task_store.snapshot(task_id, task)
+        await websocket.send_text(json.dumps(event, ensure_ascii=False, default=str))
+        while event["status"] not in TERMINAL_STATUSES:
+            next_event = await queue.get()
+            if next_event["version"] <= event["version"]:
+                continue
+            event = next_event
+            await websocket.send_text(json.dumps(event, ensure_ascii=False, default=str))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        task_store.unsubscribe(task_id, queue)
+
+
 @app.get("/api/v1/search")
-async def search_papers(query: str, limit: int = 10):
+async def search_papers(
+    query: str,
+    limit: int = 10,
+    year: Optional[int] = None,
+    year_min: Optional[int] = None,
+    year_max: Optional[int] = None,
+    field: Optional[str] = None,
+    keywords: Optional[List[str]] = Query(None),
+    authors: Optional[List[str]] = Query(None)
+):
     """
     在知识库中搜索相似论文
+    
+    支持按年份、主要领域、关键词、作者过滤，过滤在相似度计算之前完成。
     """
     try:
         if limit > 50:
             limit = 50
         
-        results = await rag_service.search(query, limit=limit)
+        filters = {
+            "year": year,
+            "year_min": year_min,
+            "year_max": year_max,
+            "field": field,
+            "keywords": keywords,
+            "authors": authors,
+        }
+        results = await rag_service.search(query, limit=limit, **filters)
         
         return {
             "query": query,
+            "filters": {k: v for k, v in filters.items() if v is not None},
             "results": results,
             "count": len(results)
         }
@@ -265,12 +677,31 @@ async def search_papers(query: str, limit: int = 10):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/v1/graph/domains/{domain}", response_model=DomainStats)
+async def get_domain_stats(domain: str, limit: int = Query(5, ge=1, le=50)):
+    """领域统计：高影响学者、近期热门方法与关键文献（来自引文图谱）"""
+    stats = await asyncio.to_thread(orchestrator.citation_graph.domain_stats, domain, limit=limit)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="领域未收录")
+    return DomainStats(**stats)
+
+
+@app.get("/api/v1/graph/coauthors")
+async def get_coauthors(name: str, limit: int = Query(10, ge=1, le=100)):
+    """合作者查询（来自引文图谱）"""
+    coauthors = await asyncio.to_thread(orchestrator.citation_graph.coauthors, name, limit=limit)
+    return {
+        "name": name,
+        "coauthors": [{"name": coauthor, "papers": count} for coauthor, count in coauthors],
+        "count": len(coauthors)
+    }
+
+
 @app.get("/api/v1/metrics")
 async def get_metrics():
     """获取系统性能指标"""
-    total_tasks = len(task_queue)
-    completed = sum(1 for t in task_queue.values() if t["status"] == AnalysisStatus.COMPLETED)
-    failed = sum(1 for t in task_queue.values() if t["status"] == AnalysisStatus.FAILED)
+    counts = await task_store.counts()
+    total_tasks, completed, failed = counts["total"], counts["completed"], counts["failed"]
     
     return {
         "total_tasks": total_tasks,
@@ -281,9 +712,61 @@ async def get_metrics():
     }
 
 
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """管理接口鉴权：未配置 ADMIN_TOKEN 时接口不存在，令牌不符时拒绝"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), settings.ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="管理令牌无效")
+
+
+@app.post("/api/v1/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_worker(
+    duration: float = Query(10.0, gt=0),
+    interval: float = Query(settings.PROFILE_DEFAULT_INTERVAL, ge=0.001, le=1.0)
+):
+    """
+    对处理本请求的worker采样 duration 秒，返回折叠栈（flamegraph.pl / speedscope 可直接读取）
+
+    采样覆盖事件循环线程与线程池中的全部线程；多worker部署时只分析其中一个worker，
+    进程号见响应头 X-Worker-Pid。
+    """
+    if duration > settings.PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"采样时间不能超过 {settings.PROFILE_MAX_SECONDS} 秒")
+    try:
+        result = await profiler.profile(duration, interval)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    pid = os.getpid()
+    filename = f"profile-{pid}-{datetime.now().strftime('%Y%m%d%H%M%S')}.collapsed"
+    return PlainTextResponse(result["collapsed"], headers={
+        "X-Worker-Pid": str(pid),
+        "X-Profile-Samples": str(result["samples"]),
+        "X-Profile-Seconds": str(result["seconds"]),
+        "Content-Disposition": f'attachment; filename="{filename}"',
+    })
+
+
+@app.get("/api/v1/admin/diagnostics", dependencies=[Depends(require_admin)])
+async def get_diagnostics(limit: int = Query(10, ge=1, le=100)):
+    """本worker的事件循环延迟、最慢的近期分析与各阶段耗时分位数"""
+    return {
+        "worker_pid": os.getpid(),
+        "event_loop_lag": loop_lag.stats(),
+        "slowest_analyses": orchestrator.slowest_analyses(limit),
+        "stage_latency_seconds": orchestrator.stage_latency(),
+        "asyncio_tasks": len(asyncio.all_tasks()),
+        "threads": threading.active_count(),
+        "profiling": profiler.active,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
 if __name__ == "__main__":
+    # 多worker模式需要以导入字符串启动；生产部署见 docker/gunicorn.conf.py
     uvicorn.run(
-        app,
+        "app.main:app",
         host=settings.HOST,
         port=settings.PORT,
         workers=settings.WORKERS,
@@ -9,6 +9,10 @@ from .schemas import (
     TechRoadmapNode,
     ResearchGap,
     PaperAnalysis,
+    TaskResponse,
+    BatchAnalyzeRequest,
+    AGENT_FIELDS,
+    ANALYSIS_FIELDS,
 )
 
 __all__ = [
@@ -20,4 +24,8 @@ __all__ = [
     "TechRoadmapNode",
     "ResearchGap",
     "PaperAnalysis",
+    "TaskResponse",
+    "BatchAnalyzeRequest",
+    "AGENT_FIELDS",
+    "ANALYSIS_FIELDS",
 ]
@@ -34,6 +34,8 @@ class MathModel(BaseModel):
     formula_type: str = Field(..., description="公式类型: equation/theorem/algorithm/property")
     location: str = Field(..., description="公式在论文中的位置")
     importance: float = Field(default=0.5, description="重要性评分 0-1")
+    page: Optional[int] = Field(None, description="所在页码（从1开始，来自版面检测）")
+    bbox: Optional[List[float]] = Field(None, description="页面坐标 [x0, y0, x1, y1]（PDF点）")
 
 
 class DomainInfo(BaseModel):
@@ -72,6 +74,19 @@ class ResearchGap(BaseModel):
     suggested_approach: Optional[str] = Field(None, description="建议研究方向")
 
 
+# 由各分析Agent产出的 PaperAnalysis 字段
+AGENT_FIELDS = ("math_models", "domain_info", "key_scholars", "tech_roadmap")
+
+# 可按需选择计算（include=）并按字段缓存的 PaperAnalysis 字段
+ANALYSIS_FIELDS = AGENT_FIELDS + (
+    "innovation_points",
+    "limitations",
+    "research_gaps",
+    "reproducibility_score",
+    "summary",
+)
+
+
 class PaperAnalysis(BaseModel):
     """完整论文分析结果"""
     # 基本信息
@@ -103,6 +118,7 @@ class PaperAnalysis(BaseModel):
     status: AnalysisStatus = Field(default=AnalysisStatus.COMPLETED, description="分析状态")
     created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
     analysis_duration: float = Field(default=0.0, description="分析耗时（秒）")
+    content_hash: Optional[str] = Field(None, description="PDF内容哈希（SHA-256），对应文档存储中的解析结果")
     summary: Optional[str] = Field(None, description="分析摘要")
 
 
@@ -113,10 +129,19 @@ class TaskResponse(BaseModel):
     progress: int = Field(default=0, description="进度百分比 0-100")
     message: Optional[str] = Field(None, description="提示消息")
     result: Optional[PaperAnalysis] = Field(None, description="分析结果")
+    partial_result: Dict[str, Any] = Field(default_factory=dict, description="已完成Agent的部分结果")
+    ready_fields: Dict[str, bool] = Field(default_factory=dict, description="各分析字段是否就绪")
     error: Optional[str] = Field(None, description="错误信息")
     created_at: datetime = Field(default_factory=datetime.now)
 
 
+class BatchAnalyzeRequest(BaseModel):
+    """批量分析请求"""
+    arxiv_ids: List[str] = Field(default_factory=list, description="arXiv论文ID列表")
+    dois: List[str] = Field(default_factory=list, description="DOI列表")
+    include: Optional[List[str]] = Field(None, description="需要的分析字段，默认全部")
+
+
 class SearchResult(BaseModel):
     """搜索结果项"""
     title: str
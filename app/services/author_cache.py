@@ -0,0 +1,121 @@
+"""
+学者信息本地缓存 - SQLite
+Local Author Cache
+"""
+
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS authors (
+    author_id      TEXT PRIMARY KEY,
+    name           TEXT NOT NULL,
+    affiliation    TEXT,
+    h_index        INTEGER,
+    citation_count INTEGER,
+    paper_count    INTEGER,
+    fetched_at     REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS author_names (
+    norm_name   TEXT PRIMARY KEY,
+    author_id   TEXT,
+    resolved_at REAL NOT NULL
+);
+"""
+
+AUTHOR_COLUMNS = ("author_id", "name", "affiliation", "h_index", "citation_count", "paper_count", "fetched_at")
+
+
+def normalize_name(name: str) -> str:
+    """规范化姓名：去除重音和标点、小写、合并空白"""
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(_NON_WORD_RE.sub(" ", stripped).lower().split())
+
+
+class AuthorCache:
+    """学者信息缓存
+
+    两张表：authors 按学者ID保存档案，author_names 保存规范化姓名到学者ID的映射
+    （author_id 为空表示远端查无此人，用于负缓存）。时间戳随记录保存，
+    是否过期由调用方按TTL判断。
+    """
+
+    def __init__(self, path: str):
+        self.logger = logger
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # 查询在线程池中执行，连接跨线程共享，由锁串行化
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def lookup(self, names: Iterable[str]) -> Tuple[Dict[str, Tuple[Optional[str], float]], Dict[str, Dict[str, Any]]]:
+        """
+        按规范化姓名查询
+
+        Returns:
+            (姓名映射 {norm_name: (author_id, resolved_at)},
+             学者档案 {author_id: 档案})，未缓存的姓名不出现在结果中
+        """
+        names = list(set(names))
+        if not names:
+            return {}, {}
+
+        with self._lock:
+            placeholders = ",".join("?" * len(names))
+            name_rows = self._conn.execute(
+                f"SELECT norm_name, author_id, resolved_at FROM author_names WHERE norm_name IN ({placeholders})",
+                names,
+            ).fetchall()
+            mapping = {row[0]: (row[1], row[2]) for row in name_rows}
+
+            author_ids = list({author_id for author_id, _ in mapping.values() if author_id})
+            authors = {}
+            if author_ids:
+                placeholders = ",".join("?" * len(author_ids))
+                rows = self._conn.execute(
+                    f"SELECT {', '.join(AUTHOR_COLUMNS)} FROM authors WHERE author_id IN ({placeholders})",
+                    author_ids,
+                ).fetchall()
+                authors = {row[0]: dict(zip(AUTHOR_COLUMNS, row)) for row in rows}
+        return mapping, authors
+
+    def store(self, names: Dict[str, Optional[str]], authors: List[Dict[str, Any]]):
+        """
+        写入查询结果（单个事务）
+
+        Args:
+            names: {norm_name: author_id 或 None}
+            authors: 学者档案列表，需包含 author_id 和 name
+        """
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO author_names (norm_name, author_id, resolved_at) VALUES (?, ?, ?)",
+                [(name, author_id, now) for name, author_id in names.items()],
+            )
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO authors ({', '.join(AUTHOR_COLUMNS)}) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (a["author_id"], a["name"], a.get("affiliation"), a.get("h_index"),
+                     a.get("citation_count"), a.get("paper_count"), now)
+                    for a in authors
+                ],
+            )
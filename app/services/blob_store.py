@@ -0,0 +1,97 @@
+"""
+内容寻址文件存储
+Content-Addressed Blob Store
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """按 SHA-256 存储文件，目录按哈希前缀分片: root/ab/cd/<sha256><suffix>
+
+    相同内容只保存一份；写入先落临时文件再原子重命名，读者不会看到半个文件。
+    """
+
+    def __init__(self, root: str, suffix: str = ""):
+        self.logger = logger
+        self.root = Path(root)
+        self.suffix = suffix
+
+    def path_for(self, digest: str) -> Path:
+        """哈希对应的存储路径"""
+        return self.root / digest[:2] / digest[2:4] / f"{digest}{self.suffix}"
+
+    def exists(self, digest: str) -> bool:
+        return self.path_for(digest).exists()
+
+    def put_bytes(self, data: bytes) -> str:
+        """写入内容，返回其哈希"""
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.exists(digest):
+            with self.open_writer() as writer:
+                writer.write(data)
+        return digest
+
+    def open_writer(self) -> "BlobWriter":
+        """流式写入（边写边计算哈希），关闭时落盘到内容地址"""
+        return BlobWriter(self)
+
+    def _commit(self, tmp_path: str, digest: str) -> Path:
+        target = self.path_for(digest)
+        if target.exists():
+            os.unlink(tmp_path)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, target)
+        return target
+
+
+class BlobWriter:
+    """BlobStore 的流式写入器"""
+
+    def __init__(self, store: BlobStore):
+        self.store = store
+        self.digest: Optional[str] = None
+        self.path: Optional[Path] = None
+        self.size = 0
+        self.aborted = False
+        self._hash = hashlib.sha256()
+        store.root.mkdir(parents=True, exist_ok=True)
+        fd, self._tmp_path = tempfile.mkstemp(dir=store.root, prefix=".incoming-")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes):
+        self._hash.update(data)
+        self._file.write(data)
+        self.size += len(data)
+
+    def abort(self):
+        """放弃写入并删除临时文件"""
+        self.aborted = True
+        if not self._file.closed:
+            self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.unlink(self._tmp_path)
+
+    def __enter__(self) -> "BlobWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None or self.aborted:
+            self.abort()
+            return False
+        self._file.close()
+        self.digest = self._hash.hexdigest()
+        self.path = self._commit()
+        return False
+
+    def _commit(self) -> Path:
+        """把临时文件提交到内容地址，子类可在此之前为临时文件建立引用"""
+        return self.store._commit(self._tmp_path, self.digest)
@@ -5,13 +5,50 @@ Cache Service with Redis
 
 import logging
 import json
-from typing import Any, Optional
+from typing import Any, Dict, Iterable, List, Optional
 import redis.asyncio as redis
 
 from app.config import settings
+from app.models.schemas import ANALYSIS_FIELDS
 
 logger = logging.getLogger(__name__)
 
+# 按字段缓存 PaperAnalysis 时，非分析字段（标题、作者、年份等）所在的哈希字段
+ANALYSIS_BASE_FIELD = "_base"
+
+
+def analysis_cache_key(arxiv_id: Optional[str] = None,
+                       doi: Optional[str] = None,
+                       content_hash: Optional[str] = None) -> Optional[str]:
+    """
+    论文结果的缓存键（Redis哈希，每个分析字段一项）
+
+    上传的PDF与批量导入的论文按内容哈希缓存，同一PDF无论从哪条路径进入都命中同一条记录。
+    """
+    if content_hash:
+        return f"analysis:sha256:{content_hash}"
+    if arxiv_id:
+        return f"analysis:arxiv:{arxiv_id}"
+    if doi:
+        return f"analysis:doi:{doi}"
+    return None
+
+
+def split_analysis(analysis: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    """把 PaperAnalysis 字典拆成按字段缓存的映射（基础信息 + 指定分析字段）"""
+    base = {k: v for k, v in analysis.items() if k not in ANALYSIS_FIELDS}
+    entries = {field: analysis[field] for field in fields if field in analysis}
+    entries[ANALYSIS_BASE_FIELD] = base
+    return entries
+
+
+def merge_analysis(entries: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """由按字段缓存的映射还原 PaperAnalysis 字典，缺少基础信息时返回 None"""
+    base = entries.get(ANALYSIS_BASE_FIELD)
+    if base is None:
+        return None
+    return {**base, **{field: entries[field] for field in ANALYSIS_FIELDS if field in entries}}
+
 
 class CacheService:
     """Redis缓存服务"""
@@ -77,6 +114,59 @@ class CacheService:
             self.logger.warning(f"缓存set错误 {key}: {e}")
             return False
     
+    async def get_hash(self, key: str) -> Dict[str, Any]:
+        """获取哈希的全部字段"""
+        if not self.redis_client:
+            return {}
+        
+        try:
+            data = await self.redis_client.hgetall(key)
+            return {field: json.loads(value) for field, value in data.items()}
+        except Exception as e:
+            self.logger.warning(f"缓存hgetall错误 {key}: {e}")
+            return {}
+    
+    async def get_hash_many(self, keys: List[str]) -> Dict[str, Dict[str, Any]]:
+        """批量获取多个哈希（单次pipeline往返），只返回非空的键"""
+        if not self.redis_client or not keys:
+            return {}
+        
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.hgetall(key)
+                results = await pipe.execute()
+            return {
+                key: {field: json.loads(value) for field, value in data.items()}
+                for key, data in zip(keys, results) if data
+            }
+        except Exception as e:
+            self.logger.warning(f"缓存批量hgetall错误 ({len(keys)}项): {e}")
+            return {}
+    
+    async def set_hash(self, key: str, mapping: Dict[str, Any], ttl: Optional[int] = None) -> bool:
+        """写入哈希的部分字段（已有字段保留）并刷新过期时间"""
+        return await self.set_hash_many({key: mapping}, ttl=ttl)
+    
+    async def set_hash_many(self, items: Dict[str, Dict[str, Any]], ttl: Optional[int] = None) -> bool:
+        """批量写入多个哈希（单次pipeline往返）"""
+        if not self.redis_client or not items:
+            return False
+        
+        try:
+            ttl = ttl or self.settings.REDIS_TTL
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                for key, mapping in items.items():
+                    pipe.hset(key, mapping={
+                        field: json.dumps(value, default=str) for field, value in mapping.items()
+                    })
+                    pipe.expire(key, ttl)
+                await pipe.execute()
+            return True
+        except Exception as e:
+            self.logger.warning(f"缓存批量hset错误 ({len(items)}项): {e}")
+            return False
+    
     async def delete(self, key: str) -> bool:
         """删除缓存"""
         if not self.redis_client:
@@ -0,0 +1,691 @@
+"""
+引文图谱 - 嵌入式论文/作者/方法图存储
+Embedded Citation Graph Store
+"""
+
+import contextlib
+import functools
+import json
+import logging
+import os
+import re
+import threading
+from array import array
+from collections import Counter, deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.author_cache import normalize_name
+
+try:
+    import fcntl
+except ImportError:  # Windows 下单进程运行，不加文件锁
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_VANCOUVER_INITIALS_RE = re.compile(r"^[A-Z]{1,3}$")
+
+# 节点类型与关系: 关系名 -> (源节点类型, 目标节点类型)
+NODE_KINDS = ("paper", "author", "method", "field")
+RELATIONS = {
+    "cites": ("paper", "paper"),
+    "authored": ("paper", "author"),
+    "uses": ("paper", "method"),
+    "in_field": ("paper", "field"),
+}
+
+
+def title_key(title: str) -> str:
+    """标题归一化（小写、仅保留字母数字），论文节点键的标题部分"""
+    return " ".join(_WORD_RE.findall(title.lower()))
+
+
+def paper_key(title: str, year: Optional[int] = None, identity: Optional[str] = None) -> str:
+    """
+    论文节点的键: "<归一化标题>|<年份>"，年份未知时只有标题；
+    同标题同年份但身份不同的论文另加 "#<身份>"
+    """
+    key = title_key(title)
+    if year:
+        key = f"{key}|{year}"
+    if identity:
+        key = f"{key}#{identity}"
+    return key
+
+
+def _key_title(key: str) -> str:
+    """论文节点键中的标题部分"""
+    return key.split("|", 1)[0].split("#", 1)[0]
+
+
+def author_key(name: str) -> str:
+    """
+    作者归一化为 "姓 名首字母"，使 "Vaswani, A."、"A. Vaswani"、
+    "Ashish Vaswani"、"Vaswani A" 指向同一节点
+    """
+    if "," in name:
+        surname, _, given = name.partition(",")
+    else:
+        tokens = name.split()
+        if len(tokens) > 1 and _VANCOUVER_INITIALS_RE.match(tokens[-1]):
+            surname, given = " ".join(tokens[:-1]), tokens[-1]
+        else:
+            surname, given = tokens[-1] if tokens else "", " ".join(tokens[:-1])
+    surname = normalize_name(surname)
+    given = normalize_name(given)
+    return f"{surname} {given[:1]}".strip()
+
+
+def _locked(method):
+    """在进程内互斥锁下执行：写入与查询在不同线程中进行（见 CitationGraph）"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._mutex:
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class _Adjacency:
+    """单向邻接表
+
+    基础部分为CSR数组（indptr / indices），持久化为 .npy 并以 mmap 只读加载；
+    新增边先进入内存中的增量表，压缩时与基础部分合并成新的CSR。
+    """
+
+    def __init__(self):
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self._delta: Dict[int, List[int]] = {}
+        self.delta_count = 0
+
+    def add(self, src: int, dst: int):
+        self._delta.setdefault(src, []).append(dst)
+        self.delta_count += 1
+
+    def neighbors(self, node: int) -> List[int]:
+        result = []
+        if node < len(self.indptr) - 1:
+            result = self.indices[self.indptr[node]:self.indptr[node + 1]].tolist()
+        delta = self._delta.get(node)
+        return result + delta if delta else result
+
+    def degrees(self, num_nodes: int) -> np.ndarray:
+        """所有节点的出度"""
+        result = np.zeros(num_nodes, dtype=np.int64)
+        base = np.diff(self.indptr)
+        result[:len(base)] = base
+        for node, targets in self._delta.items():
+            result[node] += len(targets)
+        return result
+
+    def compacted(self, num_nodes: int) -> Tuple[np.ndarray, np.ndarray]:
+        """合并基础部分与增量，返回新的 (indptr, indices)；同一节点的边保持写入顺序"""
+        base_src = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+        delta_src = np.array([node for node, targets in self._delta.items() for _ in targets], dtype=np.int32)
+        delta_dst = np.array([dst for targets in self._delta.values() for dst in targets], dtype=np.int32)
+
+        src = np.concatenate([base_src, delta_src])
+        order = np.argsort(src, kind="stable")
+        indices = np.concatenate([np.asarray(self.indices, dtype=np.int32), delta_dst])[order]
+        indptr = np.zeros(num_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=num_nodes), out=indptr[1:])
+        return indptr, indices
+
+    def load(self, indptr: np.ndarray, indices: np.ndarray):
+        self.indptr, self.indices = indptr, indices
+        self._delta = {}
+        self.delta_count = 0
+
+
+class CitationGraph:
+    """引文图谱
+
+    节点为论文（已分析论文及其参考文献，按归一化标题与年份合并，见 paper_key）、作者、方法和领域；
+    每种关系同时维护正向与反向邻接表，k跳遍历与反查均为数组切片。
+
+    指定 root 时持久化：
+      graph.json                 当前代数
+      <gen>/nodes.json           节点表
+      <gen>/<关系>.<方向>.*.npy   CSR数组（mmap加载）
+      <gen>/journal.jsonl        该代之后的增量操作日志，启动时重放
+    增量边超过 compact_threshold 或关闭时写出新一代并删除旧代。
+
+    多个进程（多worker部署）可共享同一目录：日志是各进程共同的操作序列，
+    写入前持 graph.lock 排他锁并先重放其他进程追加的日志，查询前同样追上日志，
+    因此各进程按相同顺序执行相同操作，节点ID一致。其他进程压缩后 graph.json
+    的代数变化，本进程重新加载新一代。
+
+    写入（日志追加、文件锁、压缩）与查询都是阻塞的文件操作，调用方应在线程中执行
+    （asyncio.to_thread）；进程内各线程由 _mutex 互斥（flock 只在进程间互斥）。
+    """
+
+    def __init__(self, root: Optional[str] = None, compact_threshold: int = 50000):
+        self.logger = logger
+        self.root = Path(root) if root else None
+        self.compact_threshold = compact_threshold
+
+        self._generation = 0
+        self._manifest_mtime = None
+        self._journal = None
+        self._offset = 0  # 已重放到的日志字节偏移
+        self._lock_file = None
+        self._mutex = threading.RLock()
+        self._reset()
+        if self.root is not None:
+            self.root.mkdir(parents=True, exist_ok=True)
+            self._lock_file = open(self.root / "graph.lock", "a")
+            with self._exclusive():
+                pass
+
+    def _reset(self):
+        """清空内存中的图"""
+        self._keys: Dict[str, Dict[str, int]] = {kind: {} for kind in NODE_KINDS}
+        # 归一化标题 -> 论文节点，解析无年份的引用
+        self._titles: Dict[str, List[int]] = {}
+        self.labels: Dict[str, List[str]] = {kind: [] for kind in NODE_KINDS}
+        self.paper_years = array("i")  # 0 表示未知
+        # 已登记参考文献的论文节点 -> 论文身份（内容哈希或来源ID，未知时为空串）
+        self._analyzed: Dict[int, str] = {}
+
+        self._adjacency: Dict[Tuple[str, bool], _Adjacency] = {
+            (relation, reverse): _Adjacency() for relation in RELATIONS for reverse in (False, True)
+        }
+        self._in_degree: Optional[np.ndarray] = None
+
+    # ==================== 写入 ====================
+
+    @property
+    def num_papers(self) -> int:
+        return len(self.labels["paper"])
+
+    @property
+    def num_citations(self) -> int:
+        return int(self._adjacency[("cites", False)].degrees(self.num_papers).sum())
+
+    def add_paper(self,
+                  title: str,
+                  year: Optional[int],
+                  authors: List[str],
+                  references: List[Dict[str, Any]],
+                  identity: Optional[str] = None) -> int:
+        """
+        登记一篇已分析的论文及其参考文献
+
+        论文节点按（归一化标题, 年份）合并，同标题不同年份的论文是不同节点；年份未知时
+        按标题合并。identity（内容哈希或来源ID）用于区分标题与年份都相同的论文：
+        - 与已登记的身份相同：同一论文重复登记，不再加边
+        - 与已登记的身份不同：另一篇论文，另建节点，不沿用前者的引用关系
+        - 任一方身份未知：无法区分，参考文献合并到同一节点（已有的边不重复）
+
+        Returns:
+            论文节点ID
+        """
+        with self._exclusive():
+            return self._add_paper(title, year, authors, references, identity or "")
+
+    def _add_paper(self,
+                   title: str,
+                   year: Optional[int],
+                   authors: List[str],
+                   references: List[Dict[str, Any]],
+                   identity: str = "") -> int:
+        node = self._paper_node(title, year)
+        known = self._analyzed.get(node)
+        if known and identity and known != identity:
+            node = self._paper_node(title, year, identity=identity)
+            known = self._analyzed.get(node)
+        self._add_authors(node, authors)
+        if known and known == identity:
+            return node
+        if known is None or (identity and not known):
+            self._analyzed[node] = identity
+            self._log({"op": "analyzed", "node": node, "identity": identity})
+
+        cited = set(self._adjacency[("cites", False)].neighbors(node))
+        for ref in references:
+            ref_authors = ref.get("authors") or []
+            key = ref.get("title") or (f"{author_key(ref_authors[0])} {ref.get('year') or ''}" if ref_authors else "")
+            if not title_key(key):
+                continue
+            ref_node = self._paper_node(key, ref.get("year"))
+            if ref_node == node or ref_node in cited:
+                continue
+            cited.add(ref_node)
+            self._add_authors(ref_node, ref_authors)
+            self._add_edge("cites", node, ref_node)
+
+        self._maybe_compact()
+        return node
+
+    def add_analysis(self, node: int, field: Optional[str], methods: List[str]):
+        """登记分析完成后得到的领域和方法（每篇论文仅首次生效）"""
+        with self._exclusive():
+            self._add_analysis(node, field, methods)
+
+    def _add_analysis(self, node: int, field: Optional[str], methods: List[str]):
+        if field and not self._adjacency[("in_field", False)].neighbors(node):
+            self._add_edge("in_field", node, self._node("field", normalize_name(field), field))
+        if methods and not self._adjacency[("uses", False)].neighbors(node):
+            seen = set()
+            for method in methods:
+                key = normalize_name(method)
+                if key and key not in seen:
+                    seen.add(key)
+                    self._add_edge("uses", node, self._node("method", key, method))
+        self._maybe_compact()
+
+    # ==================== 查询 ====================
+
+    @_locked
+    def ancestors(self, node: int, depth: int = 2) -> Dict[int, int]:
+        """沿引用边广度优先遍历，返回 {论文节点: 跳数}（不含自身）"""
+        self._sync()
+        cites = self._adjacency[("cites", False)]
+        hops = {node: 0}
+        queue = deque([node])
+        while queue:
+            current = queue.popleft()
+            if hops[current] >= depth:
+                continue
+            for neighbor in cites.neighbors(current):
+                if neighbor not in hops:
+                    hops[neighbor] = hops[current] + 1
+                    queue.append(neighbor)
+        del hops[node]
+        return hops
+
+    @_locked
+    def roadmap(self, node: int, limit: int = 5, depth: int = 2) -> List[Dict[str, Any]]:
+        """
+        有影响力的前作：k跳引用链上有年份的论文，按 (图内被引次数 / 跳数)
+        选出最重要的 limit 篇，再按年份排序
+
+        Returns:
+            [{"title", "year", "cited_by", "hops", "score"}]，score 归一化到 0-1
+        """
+        self._sync()
+        in_degree = self._in_degree_array()
+        candidates = []
+        for paper, hop in self.ancestors(node, depth).items():
+            if self.paper_years[paper]:
+                candidates.append((int(in_degree[paper]) / hop, paper, hop))
+        if not candidates:
+            return []
+
+        candidates.sort(key=lambda c: (-c[0], self.paper_years[c[1]], c[1]))
+        top = candidates[:limit]
+        best = top[0][0]
+        top.sort(key=lambda c: (self.paper_years[c[1]], -c[0], c[1]))
+        return [
+            {
+                "title": self.labels["paper"][paper],
+                "year": self.paper_years[paper],
+                "cited_by": int(in_degree[paper]),
+                "hops": hop,
+                "score": round(score / best, 3),
+            }
+            for score, paper, hop in top
+        ]
+
+    @_locked
+    def rank_authors(self, node: int, limit: int = 10, depth: int = 2) -> List[Tuple[str, float]]:
+        """
+        学者排名：引用链上论文的作者按 Σ 1/跳数 计分（不含本文作者）
+
+        Returns:
+            [(作者名, 得分)]，得分降序，同分按姓名排序
+        """
+        self._sync()
+        authored = self._adjacency[("authored", False)]
+        own = set(authored.neighbors(node))
+        scores: Dict[int, float] = {}
+        for paper, hop in self.ancestors(node, depth).items():
+            for author in authored.neighbors(paper):
+                if author not in own:
+                    scores[author] = scores.get(author, 0.0) + 1.0 / hop
+        names = self.labels["author"]
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], names[item[0]]))
+        return [(names[author], round(score, 3)) for author, score in ranked[:limit]]
+
+    @_locked
+    def coauthors(self, name: str, limit: int = 10) -> List[Tuple[str, int]]:
+        """
+        合作者：与该作者共同署名的作者及合作论文数
+
+        Returns:
+            [(作者名, 合作论文数)]，按次数降序
+        """
+        self._sync()
+        author = self._keys["author"].get(author_key(name))
+        if author is None:
+            return []
+        authored = self._adjacency[("authored", False)]
+        counts: Counter = Counter()
+        for paper in self._adjacency[("authored", True)].neighbors(author):
+            counts.update(a for a in authored.neighbors(paper) if a != author)
+        names = self.labels["author"]
+        ranked = sorted(counts.items(), key=lambda item: (-item[1], names[item[0]]))
+        return [(names[a], count) for a, count in ranked[:limit]]
+
+    @_locked
+    def domain_stats(self, field: str, limit: int = 5, recent_years: int = 3) -> Optional[Dict[str, Any]]:
+        """
+        领域统计（对应 DomainStats）
+
+        - top_scholars: 领域论文所引文献的作者，按这些文献的图内被引次数累计
+        - trending_topics: 近 recent_years 年领域论文中最常用的方法
+        - recent_breakthroughs: 领域论文引用的近期文献中被引最多者
+
+        Returns:
+            领域未收录时返回 None
+        """
+        self._sync()
+        field_node = self._keys["field"].get(normalize_name(field))
+        if field_node is None:
+            return None
+        papers = self._adjacency[("in_field", True)].neighbors(field_node)
+
+        in_degree = self._in_degree_array()
+        cites = self._adjacency[("cites", False)]
+        authored = self._adjacency[("authored", False)]
+        uses = self._adjacency[("uses", False)]
+
+        cited = set()
+        for paper in papers:
+            cited.update(cites.neighbors(paper))
+        latest = max((self.paper_years[p] for p in list(papers) + list(cited)), default=0)
+
+        scholar_scores: Counter = Counter()
+        for paper in cited:
+            for author in authored.neighbors(paper):
+                scholar_scores[author] += int(in_degree[paper])
+
+        topics: Counter = Counter()
+        for paper in papers:
+            if self.paper_years[paper] >= latest - recent_years + 1:
+                topics.update(uses.neighbors(paper))
+
+        recent = [p for p in cited if self.paper_years[p] >= latest - recent_years + 1]
+        recent.sort(key=lambda p: (-int(in_degree[p]), -self.paper_years[p], p))
+
+        def top(counter: Counter, kind: str) -> List[str]:
+            labels = self.labels[kind]
+            ranked = sorted(counter.items(), key=lambda item: (-item[1], labels[item[0]]))
+            return [labels[node] for node, _ in ranked[:limit]]
+
+        return {
+            "domain": self.labels["field"][field_node],
+            "paper_count": len(papers),
+            "top_scholars": top(scholar_scores, "author"),
+            "trending_topics": top(topics, "method"),
+            "recent_breakthroughs": [self.labels["paper"][p] for p in recent[:limit]],
+        }
+
+    # ==================== 节点与边 ====================
+
+    def _node(self, kind: str, key: str, label: str) -> int:
+        node = self._keys[kind].get(key)
+        if node is None:
+            node = len(self.labels[kind])
+            self._keys[kind][key] = node
+            self.labels[kind].append(label)
+            if kind == "paper":
+                self.paper_years.append(0)
+                self._titles.setdefault(_key_title(key), []).append(node)
+            self._log({"op": "node", "kind": kind, "key": key, "label": label})
+        return node
+
+    def _paper_node(self, title: str, year: Optional[int], identity: Optional[str] = None) -> int:
+        """
+        按（标题, 年份）查找或创建论文节点
+
+        无年份的引用在该标题只有一个节点时指向它，否则落到只按标题的节点；
+        有年份时也接受旧版本按标题建立、年份相同的节点。
+        """
+        key = paper_key(title, year, identity)
+        if identity is None and key not in self._keys["paper"]:
+            candidates = self._titles.get(title_key(title), [])
+            if not year and len(candidates) == 1:
+                return candidates[0]
+            legacy = self._keys["paper"].get(title_key(title))
+            if year and legacy is not None and self.paper_years[legacy] == year:
+                return legacy
+        node = self._node("paper", key, " ".join(title.split()))
+        if year and not self.paper_years[node]:
+            self.paper_years[node] = year
+            self._log({"op": "year", "node": node, "year": year})
+        return node
+
+    def _add_authors(self, paper: int, authors: List[str]):
+        """首次获得作者信息时写入署名边"""
+        if not authors or self._adjacency[("authored", False)].neighbors(paper):
+            return
+        seen = set()
+        for name in authors:
+            key = author_key(name)
+            if key and key not in seen:
+                seen.add(key)
+                self._add_edge("authored", paper, self._node("author", key, name))
+
+    def _add_edge(self, relation: str, src: int, dst: int, log: bool = True):
+        self._adjacency[(relation, False)].add(src, dst)
+        self._adjacency[(relation, True)].add(dst, src)
+        if relation == "cites":
+            self._in_degree = None
+        if log:
+            self._log({"op": "edge", "rel": relation, "src": src, "dst": dst})
+
+    def _in_degree_array(self) -> np.ndarray:
+        if self._in_degree is None:
+            self._in_degree = self._adjacency[("cites", True)].degrees(self.num_papers)
+        return self._in_degree
+
+    # ==================== 持久化 ====================
+
+    def _gen_dir(self, generation: int) -> Path:
+        return self.root / f"gen-{generation:06d}"
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        """
+        写入临界区：持进程内互斥锁与排他文件锁，追上其他进程的日志（首次进入时加载）后再执行操作
+
+        日志末尾超出已重放偏移的部分只可能是崩溃进程写了一半的行，截掉后再追加。
+        """
+        with self._mutex:
+            if self.root is None:
+                yield
+                return
+            if fcntl is not None:
+                fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+            try:
+                if self._journal is None:
+                    self._load()
+                else:
+                    self._sync()
+                if os.fstat(self._journal.fileno()).st_size > self._offset:
+                    self._journal.truncate(self._offset)
+                yield
+                self._journal.flush()
+                self._offset = os.fstat(self._journal.fileno()).st_size
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _journal_path(self) -> Path:
+        return self._gen_dir(self._generation) / "journal.jsonl"
+
+    def _sync(self):
+        """追上其他进程的写入：代数变化时重新加载，否则重放日志的新增部分"""
+        if self.root is None:
+            return
+        manifest = self.root / "graph.json"
+        try:
+            mtime = manifest.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime != self._manifest_mtime:
+            with open(manifest, "r", encoding="utf-8") as f:
+                generation = json.load(f)["generation"]
+            if generation != self._generation:
+                self._reset()
+                self._load()
+                return
+            self._manifest_mtime = mtime
+        try:
+            size = self._journal_path().stat().st_size
+        except FileNotFoundError:
+            return
+        if size > self._offset:
+            self._replay()
+
+    def _load(self):
+        """加载最新一代的CSR与节点表，并重放其日志"""
+        manifest = self.root / "graph.json"
+        if manifest.exists():
+            self._manifest_mtime = manifest.stat().st_mtime_ns
+            with open(manifest, "r", encoding="utf-8") as f:
+                self._generation = json.load(f)["generation"]
+            gen_dir = self._gen_dir(self._generation)
+
+            with open(gen_dir / "nodes.json", "r", encoding="utf-8") as f:
+                nodes = json.load(f)
+            for kind in NODE_KINDS:
+                self.labels[kind] = nodes["labels"][kind]
+                self._keys[kind] = {key: i for i, key in enumerate(nodes["keys"][kind])}
+            for key, node in self._keys["paper"].items():
+                self._titles.setdefault(_key_title(key), []).append(node)
+            self.paper_years = array("i", nodes["paper_years"])
+            analyzed = nodes["analyzed"]
+            # 旧版本只保存节点列表，身份视为未知
+            self._analyzed = ({int(n): i for n, i in analyzed.items()} if isinstance(analyzed, dict)
+                              else dict.fromkeys(analyzed, ""))
+
+            for (relation, reverse), adjacency in self._adjacency.items():
+                prefix = gen_dir / f"{relation}.{'rev' if reverse else 'fwd'}"
+                adjacency.load(
+                    np.load(f"{prefix}.indptr.npy", mmap_mode="r"),
+                    np.load(f"{prefix}.indices.npy", mmap_mode="r"),
+                )
+
+        if self._journal is not None:
+            self._journal.close()
+        journal = self._journal_path()
+        journal.parent.mkdir(parents=True, exist_ok=True)
+        self._journal = open(journal, "a", encoding="utf-8")
+        self._offset = 0
+        self._replay()
+        self.logger.info(
+            f"引文图谱已加载: {self.num_papers} 篇论文, {len(self.labels['author'])} 位作者, "
+            f"{self.num_citations} 条引用"
+        )
+
+    def _replay(self):
+        """从已重放偏移处继续重放日志，停在未写完的行"""
+        with open(self._journal_path(), "rb") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                self._apply(entry)
+                self._offset += len(line)
+
+    def _apply(self, entry: Dict[str, Any]):
+        op = entry["op"]
+        if op == "node":
+            kind = entry["kind"]
+            node = self._keys[kind][entry["key"]] = len(self.labels[kind])
+            self.labels[kind].append(entry["label"])
+            if kind == "paper":
+                self.paper_years.append(0)
+                self._titles.setdefault(_key_title(entry["key"]), []).append(node)
+        elif op == "year":
+            self.paper_years[entry["node"]] = entry["year"]
+        elif op == "analyzed":
+            self._analyzed[entry["node"]] = entry.get("identity", "")
+        elif op == "edge":
+            self._add_edge(entry["rel"], entry["src"], entry["dst"], log=False)
+
+    def _log(self, entry: Dict[str, Any]):
+        if self._journal is not None:
+            self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    def _maybe_compact(self):
+        if self._journal is None:
+            return
+        if self._adjacency[("cites", False)].delta_count >= self.compact_threshold:
+            self._compact()
+
+    def compact(self):
+        """将增量合并为新一代CSR并写盘"""
+        if self.root is None:
+            return
+        with self._exclusive():
+            self._compact()
+
+    def _compact(self):
+        """先写新代再切换 graph.json，最后删除旧代（调用方持有写锁）"""
+        self._journal.flush()
+        generation = self._generation + 1
+        gen_dir = self._gen_dir(generation)
+        gen_dir.mkdir(parents=True, exist_ok=True)
+
+        arrays = {}
+        for (relation, reverse), adjacency in self._adjacency.items():
+            kind = RELATIONS[relation][1 if reverse else 0]
+            indptr, indices = adjacency.compacted(len(self.labels[kind]))
+            prefix = gen_dir / f"{relation}.{'rev' if reverse else 'fwd'}"
+            np.save(f"{prefix}.indptr.npy", indptr)
+            np.save(f"{prefix}.indices.npy", indices)
+            arrays[(relation, reverse)] = prefix
+
+        with open(gen_dir / "nodes.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "labels": self.labels,
+                "keys": {kind: list(keys) for kind, keys in self._keys.items()},
+                "paper_years": self.paper_years.tolist(),
+                "analyzed": {str(node): identity for node, identity in sorted(self._analyzed.items())},
+            }, f, ensure_ascii=False)
+
+        tmp_manifest = self.root / "graph.json.tmp"
+        with open(tmp_manifest, "w", encoding="utf-8") as f:
+            json.dump({"generation": generation}, f)
+        os.replace(tmp_manifest, self.root / "graph.json")
+        self._manifest_mtime = (self.root / "graph.json").stat().st_mtime_ns
+
+        old_dir = self._gen_dir(self._generation)
+        self._generation = generation
+        for (relation, reverse), prefix in arrays.items():
+            self._adjacency[(relation, reverse)].load(
+                np.load(f"{prefix}.indptr.npy", mmap_mode="r"),
+                np.load(f"{prefix}.indices.npy", mmap_mode="r"),
+            )
+        self._journal.close()
+        self._journal = open(gen_dir / "journal.jsonl", "a", encoding="utf-8")
+        self._offset = 0
+
+        for path in old_dir.glob("*"):
+            path.unlink()
+        if old_dir.exists():
+            old_dir.rmdir()
+        self.logger.info(f"引文图谱已压缩至第 {generation} 代")
+
+    @_locked
+    def close(self):
+        """有增量时压缩写盘并关闭日志"""
+        if self._journal is None:
+            return
+        with self._exclusive():
+            if any(adjacency.delta_count for adjacency in self._adjacency.values()):
+                self._compact()
+        self._journal.close()
+        self._journal = None
+        self._lock_file.close()
@@ -0,0 +1,300 @@
+"""
+已解析文档存储 - 内存映射的正文与偏移表
+Memory-Mapped Parsed Document Store
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+_TEXT_FILE = "text.utf8"
+_PAGES_FILE = "pages.npy"
+_META_FILE = "meta.json"
+
+# 全文扫描（年份、关键词、引用提及）时每次解码的字节数
+SCAN_CHUNK_BYTES = 1 << 16
+
+
+def sha256_file(path: str, block_size: int = 1 << 20) -> str:
+    """流式计算文件的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _byte_offsets(text: str, char_offsets: List[int]) -> Dict[int, int]:
+    """字符偏移 -> UTF-8 字节偏移（逐段编码，不复制整篇正文）"""
+    mapping = {0: 0}
+    position, byte_position = 0, 0
+    for offset in sorted(set(char_offsets)):
+        byte_position += len(text[position:offset].encode("utf-8"))
+        position = offset
+        mapping[offset] = byte_position
+    return mapping
+
+
+class ParsedDocument:
+    """单篇已解析文档的只读视图
+
+    text.utf8 为全文的 UTF-8 编码，通过 mmap 映射；pages.npy 为各页起始字节偏移
+    （长度为页数+1，同样按需映射）；章节以 [起, 止) 字节区间记录在 meta.json 中。
+    slice() 返回 memoryview，不复制数据；只有需要 str 的调用方才解码对应片段。
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with open(path / _META_FILE, "r", encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+        self.page_offsets = np.load(path / _PAGES_FILE, mmap_mode="r")
+
+        self._file = open(path / _TEXT_FILE, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # 空文件无法映射
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.buffer = memoryview(self._map) if self._map is not None else memoryview(b"")
+
+    @property
+    def size(self) -> int:
+        """正文字节数"""
+        return len(self.buffer)
+
+    @property
+    def page_count(self) -> int:
+        return len(self.page_offsets) - 1
+
+    @property
+    def section_names(self) -> List[str]:
+        return list(self.meta["sections"])
+
+    def slice(self, start: int = 0, end: Optional[int] = None) -> memoryview:
+        """按字节区间取正文（零拷贝）"""
+        return self.buffer[start:end]
+
+    def text(self, start: int = 0, end: Optional[int] = None) -> str:
+        return str(self.slice(start, end), "utf-8")
+
+    def page(self, number: int) -> str:
+        """第 number 页（从1开始）的文本"""
+        return self.text(int(self.page_offsets[number - 1]), int(self.page_offsets[number]))
+
+    def section(self, name: str) -> Optional[str]:
+        span = self.meta["sections"].get(name)
+        return self.text(*span) if span else None
+
+    def iter_chunks(self, size: int) -> Iterator[str]:
+        """
+        按约 size 字节切分正文，边界优先落在换行处，其次空白处，且不拆开多字节字符
+
+        每次只解码一个分块，大文档的分块处理不会把全文载入内存。
+        """
+        total, start = self.size, 0
+        while start < total:
+            end = min(start + size, total)
+            if end < total:
+                cut = self._map.rfind(b"\n", start, end) + 1
+                if cut <= start:
+                    cut = self._map.rfind(b" ", start, end) + 1
+                if cut <= start:
+                    # 整块没有空白：退到字符边界（跳过 UTF-8 续字节）
+                    cut = end
+                    while cut > start and self.buffer[cut] & 0xC0 == 0x80:
+                        cut -= 1
+                end = cut
+            yield self.text(start, end)
+            start = end
+
+    def head(self, limit: int) -> str:
+        """正文开头至多 limit 个字符，只解码所需的字节"""
+        # UTF-8 每个字符至多4字节；退到字符边界再解码
+        end = min(self.size, limit * 4)
+        while 0 < end < self.size and self.buffer[end] & 0xC0 == 0x80:
+            end -= 1
+        return self.text(0, end)[:limit]
+
+    def to_parsed(self) -> Dict[str, Any]:
+        """
+        以 parse_pdf 的返回格式提供本文档，供重新分析时跳过解析
+
+        full_text 与 sections 是映射之上的惰性视图（见 DocumentText），不解码全文；
+        结果引用本文档，使用完毕前不要关闭（"document" 为本对象，由调用方关闭）。
+        """
+        return {
+            "metadata": self.meta["metadata"],
+            "full_text": DocumentText(self),
+            "sections": DocumentSections(self),
+            "references": self.meta["references"],
+            "formula_regions": self.meta["formula_regions"],
+            "total_pages": self.meta["total_pages"],
+            "document": self,
+            "success": True,
+        }
+
+    def close(self):
+        try:
+            self.buffer.release()
+            if self._map is not None:
+                self._map.close()
+        except BufferError:
+            # 调用方仍持有 slice() 返回的视图，映射随其回收
+            pass
+        self._file.close()
+        self.page_offsets = None
+
+    def __enter__(self) -> "ParsedDocument":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+
+class DocumentText:
+    """
+    分析阶段读取的论文正文
+
+    新解析的论文包装 str；文档存储命中时包装 ParsedDocument，只解码各阶段实际需要的部分：
+    head() 取开头若干字符（LLM输入），迭代时逐块解码（全文扫描），
+    str() 才解码整篇。包装 str 时迭代只产出原字符串本身，不做任何复制。
+    """
+
+    __slots__ = ("source",)
+
+    def __init__(self, source: Union[str, ParsedDocument]):
+        self.source = source
+
+    def head(self, limit: int) -> str:
+        """开头至多 limit 个字符"""
+        return self.source[:limit] if isinstance(self.source, str) else self.source.head(limit)
+
+    def __iter__(self) -> Iterator[str]:
+        """按块产出正文；分块边界落在换行或空白处，不拆开单词"""
+        if isinstance(self.source, str):
+            yield self.source
+        else:
+            yield from self.source.iter_chunks(SCAN_CHUNK_BYTES)
+
+    def contains(self, keywords: Iterable[str]) -> Set[str]:
+        """正文中出现过的关键词（不区分大小写）"""
+        remaining = {keyword.lower() for keyword in keywords}
+        found = set()
+        for chunk in self:
+            lowered = chunk.lower()
+            found.update(keyword for keyword in remaining if keyword in lowered)
+            remaining -= found
+            if not remaining:
+                break
+        return found
+
+    def __str__(self) -> str:
+        return self.source if isinstance(self.source, str) else self.source.text()
+
+
+class DocumentSections(Mapping):
+    """章节名 -> 章节文本，访问时才从映射中解码"""
+
+    def __init__(self, document: ParsedDocument):
+        self._document = document
+
+    def __getitem__(self, name: str) -> str:
+        text = self._document.section(name)
+        if text is None:
+            raise KeyError(name)
+        return text
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._document.section_names)
+
+    def __len__(self) -> int:
+        return len(self._document.section_names)
+
+
+class DocumentStore:
+    """按PDF内容哈希存储解析结果: root/ab/cd/<sha256>/
+
+    同一内容只解析一次，重新分析直接读取。每篇文档写入临时目录后整体重命名，
+    多个进程并发写入同一文档时以先完成者为准。
+    """
+
+    def __init__(self, root: str):
+        self.logger = logger
+        self.root = Path(root)
+
+    def path_for(self, digest: str) -> Path:
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def exists(self, digest: str) -> bool:
+        return (self.path_for(digest) / _META_FILE).exists()
+
+    def get(self, digest: str) -> Optional[ParsedDocument]:
+        """打开已存储的文档，不存在或已损坏时返回 None"""
+        if not self.exists(digest):
+            return None
+        try:
+            return ParsedDocument(self.path_for(digest))
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"文档存储读取失败 {digest[:12]}: {e}")
+            return None
+
+    def put(self, digest: str, parsed: Dict[str, Any]) -> bool:
+        """
+        存储 parse_pdf 的结果
+
+        Args:
+            digest: PDF内容哈希
+            parsed: 解析结果；page_offsets 为各页起始字符偏移，缺失时整篇视为一页
+
+        Returns:
+            存储后（或已存在）为 True
+        """
+        if self.exists(digest):
+            return True
+
+        full_text: str = parsed["full_text"]
+        page_offsets = parsed.get("page_offsets") or [0, len(full_text)]
+        section_spans = {}
+        for name, section_text in (parsed.get("sections") or {}).items():
+            start = full_text.find(section_text) if section_text else -1
+            if start >= 0:
+                section_spans[name] = (start, start + len(section_text))
+
+        byte_offsets = _byte_offsets(
+            full_text, list(page_offsets) + [offset for span in section_spans.values() for offset in span]
+        )
+        meta = {
+            "metadata": parsed.get("metadata") or {},
+            "sections": {name: [byte_offsets[a], byte_offsets[b]] for name, (a, b) in section_spans.items()},
+            "references": parsed.get("references") or [],
+            "formula_regions": parsed.get("formula_regions"),
+            "total_pages": parsed.get("total_pages", len(page_offsets) - 1),
+        }
+
+        target = self.path_for(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=target.parent, prefix=".incoming-")
+        try:
+            with open(os.path.join(tmp_dir, _TEXT_FILE), "wb") as f:
+                f.write(full_text.encode("utf-8"))
+            np.save(os.path.join(tmp_dir, _PAGES_FILE),
+                    np.array([byte_offsets[offset] for offset in page_offsets], dtype=np.int64))
+            with open(os.path.join(tmp_dir, _META_FILE), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.rename(tmp_dir, target)
+        except OSError as e:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not self.exists(digest):
+                self.logger.warning(f"文档存储写入失败 {digest[:12]}: {e}")
+                return False
+        return True
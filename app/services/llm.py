@@ -0,0 +1,219 @@
+"""
+LLM后端 - 录制与回放
+LLM Backends with Record/Replay
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+LLM_BACKENDS = ("openai", "record", "replay")
+
+# 回放未命中且 LLM_REPLAY_MISS=stub 时的响应：各Agent解析不出结果，走启发式降级
+STUB_RESPONSE = "{}"
+
+
+class LLMReplayMiss(LookupError):
+    """回放模式下没有对应提示词的录制结果"""
+
+
+@dataclass
+class LLMResponse:
+    """回放得到的响应，与 langchain 消息一样通过 content 读取文本"""
+    content: str
+
+
+def prompt_key(model: str, temperature: float, messages: List[Any]) -> str:
+    """提示词哈希：模型、温度及各条消息的角色与内容"""
+    payload = json.dumps(
+        [model, temperature, [(message.type, message.content) for message in messages]],
+        ensure_ascii=False, separators=(",", ":")
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMRecordStore:
+    """提示词哈希 -> 响应 的录制存储（JSON文件，按前缀分片）
+
+    root/ab/<哈希>.json  {"model", "content", "latency"}
+
+    写入先落临时文件再原子重命名，多个进程可共享同一目录；
+    录制目录可以随基准语料一起保存，回放结果完全确定。
+    """
+
+    def __init__(self, root: str):
+        self.logger = logger
+        self.root = Path(root)
+        self.stats: Counter = Counter()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def put(self, key: str, record: Dict[str, Any]):
+        path = self._path(key)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(record, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"LLM录制写入失败 {key[:12]}: {e}")
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+
+class LatencyModel:
+    """
+    回放延迟分布，由规格字符串描述:
+      none                 不等待
+      recorded             使用录制时测得的耗时
+      fixed:秒             固定延迟
+      uniform:低,高        均匀分布
+      lognormal:中位数,σ   对数正态分布（长尾）
+
+    每次采样的随机源由种子与提示词哈希派生，同一提示词的延迟与并发下的调用顺序无关，
+    固定种子时整轮回放可复现。
+    """
+
+    _ARITY = {"none": 0, "recorded": 0, "fixed": 1, "uniform": 2, "lognormal": 2}
+
+    def __init__(self, spec: str, seed: int = 0):
+        kind, _, params = spec.partition(":")
+        self.kind = kind.strip().lower()
+        if self.kind not in self._ARITY:
+            raise ValueError(f"未知的延迟分布: {spec}")
+        self.params = [float(p) for p in params.split(",") if p.strip()]
+        if len(self.params) != self._ARITY[self.kind]:
+            raise ValueError(f"延迟分布 {self.kind} 需要 {self._ARITY[self.kind]} 个参数: {spec}")
+        self.seed = seed
+
+    def sample(self, key: str, recorded: Optional[float] = None) -> float:
+        if self.kind == "recorded":
+            return recorded or 0.0
+        if self.kind == "fixed":
+            return self.params[0]
+        rng = random.Random(f"{self.seed}:{key}")
+        if self.kind == "uniform":
+            return rng.uniform(*self.params)
+        if self.kind == "lognormal":
+            median, sigma = self.params
+            return rng.lognormvariate(math.log(median), sigma)
+        return 0.0
+
+
+class RecordingLLM:
+    """调用真实LLM，并把响应与耗时写入录制存储"""
+
+    def __init__(self, llm, store: LLMRecordStore, model: str, temperature: float):
+        self.llm = llm
+        self.store = store
+        self.model = model
+        self.temperature = temperature
+
+    async def ainvoke(self, messages: List[Any], **kwargs):
+        started = time.perf_counter()
+        response = await self.llm.ainvoke(messages, **kwargs)
+        # 写文件放到线程中，录制时不阻塞事件循环上的其他请求
+        await asyncio.to_thread(self.store.put, prompt_key(self.model, self.temperature, messages), {
+            "model": self.model,
+            "content": response.content,
+            "latency": round(time.perf_counter() - started, 4),
+        })
+        self.store.stats["recorded"] += 1
+        return response
+
+
+class ReplayLLM:
+    """只从录制存储返回响应，按延迟分布等待后返回，不访问网络"""
+
+    def __init__(self,
+                 store: LLMRecordStore,
+                 model: str,
+                 temperature: float,
+                 latency: LatencyModel,
+                 on_miss: str = "error"):
+        self.store = store
+        self.model = model
+        self.temperature = temperature
+        self.latency = latency
+        self.on_miss = on_miss
+
+    async def ainvoke(self, messages: List[Any], **kwargs) -> LLMResponse:
+        key = prompt_key(self.model, self.temperature, messages)
+        record = self.store.get(key)
+        if record is None:
+            self.store.stats["misses"] += 1
+            if self.on_miss != "stub":
+                raise LLMReplayMiss(f"没有录制结果: {key[:12]}")
+            content, recorded = STUB_RESPONSE, None
+        else:
+            self.store.stats["hits"] += 1
+            content, recorded = record["content"], record.get("latency")
+
+        delay = self.latency.sample(key, recorded)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return LLMResponse(content)
+
+
+_stores: Dict[str, LLMRecordStore] = {}
+
+
+def record_store(root: Optional[str] = None) -> LLMRecordStore:
+    """同一目录的录制存储在进程内共享（统计也随之共享）"""
+    root = root or settings.LLM_RECORD_DIR
+    if root not in _stores:
+        _stores[root] = LLMRecordStore(root)
+    return _stores[root]
+
+
+def create_llm():
+    """
+    按 LLM_BACKEND 创建各Agent使用的LLM
+
+    - openai: ChatOpenAI
+    - record: ChatOpenAI，并把每次调用的响应录制到 LLM_RECORD_DIR
+    - replay: 只回放录制结果，按 LLM_REPLAY_LATENCY 注入延迟
+    """
+    backend = settings.LLM_BACKEND.lower()
+    if backend not in LLM_BACKENDS:
+        raise ValueError(f"未知的LLM后端: {settings.LLM_BACKEND}，可选 {', '.join(LLM_BACKENDS)}")
+
+    if backend == "replay":
+        latency = LatencyModel(settings.LLM_REPLAY_LATENCY, settings.LLM_REPLAY_SEED)
+        return ReplayLLM(record_store(), settings.OPENAI_MODEL, settings.OPENAI_TEMPERATURE,
+                         latency, settings.LLM_REPLAY_MISS)
+
+    # 禁用代理验证，防止 Pydantic 验证错误
+    os.environ['OPENAI_PROXY'] = ''
+    # langchain 导入耗时较长，推迟到首次构造Agent时
+    from langchain_openai import ChatOpenAI
+
+    llm = ChatOpenAI(
+        model_name=settings.OPENAI_MODEL,
+        temperature=settings.OPENAI_TEMPERATURE,
+        openai_api_key=settings.OPENAI_API_KEY
+    )
+    if backend == "record":
+        return RecordingLLM(llm, record_store(), settings.OPENAI_MODEL, settings.OPENAI_TEMPERATURE)
+    return llm
@@ -0,0 +1,234 @@
+"""
+论文元数据解析服务 - arXiv / Semantic Scholar 批量查询
+Batched Paper Metadata Resolver
+"""
+
+import asyncio
+import logging
+import re
+import xml.etree.ElementTree as ET
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+import httpx
+
+from app.config import settings
+from app.utils.rate_limiter import AsyncRateLimiter
+
+logger = logging.getLogger(__name__)
+
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_ARXIV_VERSION_RE = re.compile(r"v\d+$")
+
+
+class BatchCoalescer:
+    """
+    将短时间窗口内的单条查询合并为一次批量调用
+
+    get(key) 登记查询并等待结果；窗口到期或积攒满 max_batch 条时
+    调用 batch_fn(keys)，每次调用前先向限流器申请令牌
+    （rate_limiter 为 None 时由 batch_fn 自行限流）。
+    攒满一批即刷新，上一批可能仍在限流或请求中，因此进行中的刷新任务可有多个，
+    由 close() 统一取消。
+    """
+
+    def __init__(self,
+                 name: str,
+                 batch_fn: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+                 window: float,
+                 max_batch: int,
+                 rate_limiter: Optional[AsyncRateLimiter] = None):
+        self.name = name
+        self.batch_fn = batch_fn
+        self.window = window
+        self.max_batch = max_batch
+        self.rate_limiter = rate_limiter
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flush_tasks: Set[asyncio.Task] = set()
+
+    async def close(self):
+        """取消计时器与进行中的刷新，未完成的查询返回 None"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, {}
+        _resolve_missing(pending, {})
+        for task in list(self._flush_tasks):
+            task.cancel()
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+
+    async def get(self, key: str) -> Optional[Any]:
+        """查询单个键，无结果时返回 None"""
+        future = self._pending.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._pending[key] = future
+            if len(self._pending) >= self.max_batch:
+                self._schedule_flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._schedule_flush)
+        return await asyncio.shield(future)
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            # 保留任务引用，否则事件循环只持有弱引用，刷新可能被回收
+            task = asyncio.create_task(self._flush(batch))
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    async def _flush(self, batch: Dict[str, asyncio.Future]):
+        keys = list(batch)
+        try:
+            for start in range(0, len(keys), self.max_batch):
+                chunk = keys[start:start + self.max_batch]
+                try:
+                    if self.rate_limiter is not None:
+                        await self.rate_limiter.acquire()
+                    results = await self.batch_fn(chunk)
+                except Exception as e:
+                    logger.warning(f"{self.name} 批量查询失败 ({len(chunk)}项): {e}")
+                    results = {}
+                _resolve_missing({key: batch[key] for key in chunk}, results)
+        finally:
+            # 被 close() 取消时，等待中的查询按无结果返回
+            _resolve_missing(batch, {})
+
+
+def _resolve_missing(futures: Dict[str, asyncio.Future], results: Dict[str, Any]):
+    for key, future in futures.items():
+        if not future.done():
+            future.set_result(results.get(key))
+
+
+class MetadataResolver:
+    """论文元数据解析器
+
+    arXiv 导出API支持 id_list 一次查询多篇，Semantic Scholar 提供 /paper/batch；
+    两者都通过 BatchCoalescer 合并并发查询，并遵守各自的速率限制。
+    """
+
+    def __init__(self, client_factory: Callable[[], httpx.AsyncClient]):
+        self.logger = logger
+        self.client_factory = client_factory
+        # Semantic Scholar 的限额按 API Key 计算，论文与学者查询共用
+        self.s2_limiter = AsyncRateLimiter(settings.SEMANTIC_SCHOLAR_RATE_PER_SECOND, burst=1)
+
+        self.arxiv = BatchCoalescer(
+            "arXiv",
+            self._arxiv_batch,
+            window=settings.METADATA_BATCH_WINDOW,
+            max_batch=settings.ARXIV_BATCH_SIZE,
+            rate_limiter=AsyncRateLimiter(1.0 / settings.ARXIV_MIN_INTERVAL, burst=1),
+        )
+        self.semantic_scholar = BatchCoalescer(
+            "Semantic Scholar",
+            self._semantic_scholar_batch,
+            window=settings.METADATA_BATCH_WINDOW,
+            max_batch=settings.SEMANTIC_SCHOLAR_BATCH_SIZE,
+            rate_limiter=self.s2_limiter,
+        )
+
+    async def close(self):
+        """取消尚未完成的批量查询"""
+        await asyncio.gather(self.arxiv.close(), self.semantic_scholar.close())
+
+    async def resolve(self, arxiv_id: Optional[str] = None, doi: Optional[str] = None) -> Dict[str, Any]:
+        """
+        解析论文元数据
+
+        Returns:
+            可能包含 title / authors / abstract / year / url /
+            citations_count / references_count 的字典，查询失败的部分缺省
+        """
+        lookups = []
+        if arxiv_id:
+            lookups.append(self.arxiv.get(_ARXIV_VERSION_RE.sub("", arxiv_id)))
+            lookups.append(self.semantic_scholar.get(f"ARXIV:{_ARXIV_VERSION_RE.sub('', arxiv_id)}"))
+        elif doi:
+            lookups.append(self.semantic_scholar.get(f"DOI:{doi}"))
+        else:
+            return {}
+
+        metadata: Dict[str, Any] = {}
+        # arXiv 结果在前，标题、摘要、作者以其为准；引用数来自 Semantic Scholar
+        for result in await asyncio.gather(*lookups):
+            for key, value in (result or {}).items():
+                if value not in (None, "", []):
+                    metadata.setdefault(key, value)
+
+        if arxiv_id:
+            metadata.setdefault("url", f"https://arxiv.org/abs/{arxiv_id}")
+        elif doi:
+            metadata.setdefault("url", f"https://doi.org/{doi}")
+        return metadata
+
+    async def _arxiv_batch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """arXiv导出API批量查询（Atom格式）"""
+        response = await self.client_factory().get(
+            settings.ARXIV_BASE_URL,
+            params={"id_list": ",".join(ids), "max_results": len(ids)},
+        )
+        response.raise_for_status()
+
+        results = {}
+        root = ET.fromstring(response.content)
+        for entry in root.iter(f"{_ATOM}entry"):
+            entry_id = (entry.findtext(f"{_ATOM}id") or "").rsplit("/abs/", 1)[-1]
+            base_id = _ARXIV_VERSION_RE.sub("", entry_id)
+            if not base_id:
+                continue
+            published = entry.findtext(f"{_ATOM}published") or ""
+            results[base_id] = {
+                "title": " ".join((entry.findtext(f"{_ATOM}title") or "").split()),
+                "abstract": " ".join((entry.findtext(f"{_ATOM}summary") or "").split()),
+                "authors": [
+                    name.strip() for name in
+                    (author.findtext(f"{_ATOM}name") for author in entry.iter(f"{_ATOM}author"))
+                    if name
+                ],
+                "year": int(published[:4]) if published[:4].isdigit() else None,
+            }
+        return results
+
+    async def _semantic_scholar_batch(self, ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Semantic Scholar /paper/batch 批量查询"""
+        response = await self.semantic_scholar_request(
+            "POST", "/paper/batch",
+            params={"fields": "title,year,authors,citationCount,referenceCount"},
+            json={"ids": ids},
+        )
+
+        results = {}
+        # 返回列表与请求顺序一致，未找到的论文为 null
+        for paper_id, paper in zip(ids, response.json()):
+            if not paper:
+                continue
+            results[paper_id] = {
+                "title": paper.get("title"),
+                "year": paper.get("year"),
+                "authors": [a["name"] for a in paper.get("authors") or [] if a.get("name")],
+                "citations_count": paper.get("citationCount"),
+                "references_count": paper.get("referenceCount"),
+            }
+        return results
+
+    async def semantic_scholar_request(self, method: str, path: str, **kwargs) -> httpx.Response:
+        """发送 Semantic Scholar API 请求（附带API Key），非2xx时抛出异常"""
+        headers = kwargs.pop("headers", {})
+        if settings.SEMANTIC_SCHOLAR_API_KEY:
+            headers["x-api-key"] = settings.SEMANTIC_SCHOLAR_API_KEY
+
+        response = await self.client_factory().request(
+            method,
+            f"{settings.SEMANTIC_SCHOLAR_BASE_URL.rstrip('/')}{path}",
+            headers=headers,
+            **kwargs,
+        )
+        response.raise_for_status()
+        return response
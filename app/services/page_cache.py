@@ -0,0 +1,156 @@
+"""
+页面级解析缓存
+Page-Level Parse Cache
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# 提取逻辑或指纹算法变化时递增，使旧缓存失效
+PAGE_CACHE_VERSION = 2
+
+# 子集字体名前缀 "ABCDEF+"，每次重新嵌入都会变化
+_SUBSET_TAG_RE = re.compile(r"^[A-Z]{6}\+")
+
+
+def page_fingerprint(page) -> str:
+    """
+    页面指纹：内容流 + 引用的表单XObject内容流 + 字体名 + 页面尺寸与旋转
+
+    不依赖对象编号与子集字体前缀，修订版PDF中未改动的页面指纹不变；
+    文本位于表单XObject中的页面，XObject内容变化时指纹随之变化。
+    """
+    digest = hashlib.sha256(f"v{PAGE_CACHE_VERSION}|{tuple(page.rect)}|{page.rotation}|".encode())
+    digest.update(page.read_contents())
+    for xref, name, _, _ in page.get_xobjects():
+        digest.update(f"|{name}|".encode("utf-8"))
+        digest.update(page.parent.xref_stream(xref) or b"")
+    fonts = sorted(_SUBSET_TAG_RE.sub("", font[3]) for font in page.get_fonts())
+    digest.update(repr(fonts).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PageCache:
+    """按页面指纹缓存页面提取结果（JSON文件，按前缀分片）
+
+    pages/ab/cd/<指纹>.json   页面文本与公式区域
+    docs/<sha1(文档标识)>.json 文档最近一次解析的页面指纹与章节哈希，用于计算修订差异
+
+    写入先落临时文件再原子重命名，多个解析进程可共享同一目录。
+    命中时刷新文件的修改时间，reap() 按总量配额从最久未用的页面开始淘汰。
+    """
+
+    def __init__(self, root: str):
+        self.logger = logger
+        self.root = Path(root)
+
+    def get_page(self, fingerprint: str) -> Optional[Dict[str, Any]]:
+        path = self._page_path(fingerprint)
+        entry = self._read(path)
+        if entry is not None:
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return entry
+
+    def put_page(self, fingerprint: str, entry: Dict[str, Any]):
+        self._write(self._page_path(fingerprint), entry)
+
+    def get_document(self, lineage: str) -> Optional[Dict[str, Any]]:
+        return self._read(self._document_path(lineage))
+
+    def put_document(self, lineage: str, record: Dict[str, Any]):
+        self._write(self._document_path(lineage), record)
+
+    def reap(self, max_bytes: Optional[int] = None) -> Dict[str, int]:
+        """
+        页面缓存总量超过 max_bytes 时，按最近使用时间从旧到新删除页面
+
+        文档修订记录很小，不参与淘汰。
+
+        Returns:
+            清理统计
+        """
+        max_bytes = settings.PARSE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        stats = {"removed": 0, "freed_bytes": 0, "kept": 0, "kept_bytes": 0}
+
+        pages: List[Tuple[float, int, str]] = []
+        total = 0
+        for directory, _, names in os.walk(self.root / "pages"):
+            for name in names:
+                path = os.path.join(directory, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if name.startswith(".tmp-") and time.time() - st.st_mtime < 3600:
+                    continue  # 其他进程正在写入
+                pages.append((st.st_mtime, st.st_size, path))
+                total += st.st_size
+
+        pages.sort()
+        for index, (_, size, path) in enumerate(pages):
+            if total <= max_bytes:
+                stats["kept"] = len(pages) - index
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            stats["removed"] += 1
+            stats["freed_bytes"] += size
+        stats["kept_bytes"] = total
+        return stats
+
+    async def run_reaper(self, interval: Optional[float] = None):
+        """后台定期清理，直到任务被取消"""
+        interval = interval or settings.PARSE_CACHE_REAP_INTERVAL
+        while True:
+            try:
+                stats = await asyncio.to_thread(self.reap)
+                if stats["removed"]:
+                    self.logger.info(
+                        f"解析缓存清理: 删除 {stats['removed']} 页，释放 {stats['freed_bytes']} 字节，"
+                        f"保留 {stats['kept']} 页（{stats['kept_bytes']} 字节）"
+                    )
+            except Exception as e:
+                self.logger.warning(f"解析缓存清理失败: {e}")
+            await asyncio.sleep(interval)
+
+    def _page_path(self, fingerprint: str) -> Path:
+        return self.root / "pages" / fingerprint[:2] / fingerprint[2:4] / f"{fingerprint}.json"
+
+    def _document_path(self, lineage: str) -> Path:
+        return self.root / "docs" / f"{hashlib.sha1(lineage.encode('utf-8')).hexdigest()}.json"
+
+    @staticmethod
+    def _read(path: Path) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write(self, path: Path, data: Dict[str, Any]):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"解析缓存写入失败 {path.name}: {e}")
@@ -0,0 +1,179 @@
+"""
+论文下载服务 - 从arXiv/DOI获取PDF
+Paper Fetcher with Pooled HTTP and On-Disk PDF Cache
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import httpx
+
+from app.config import settings
+from app.services.blob_store import BlobStore
+
+logger = logging.getLogger(__name__)
+
+_PDF_MAGIC = b"%PDF"
+_ARXIV_VERSION_RE = re.compile(r"v\d+$")
+
+
+class PaperFetcher:
+    """论文PDF下载器
+
+    - 共享 httpx.AsyncClient（连接池、HTTP/2）
+    - PDF按内容哈希存储在本地，来源标识 -> 哈希的映射记录在 refs/ 下
+    - 已缓存的论文直接返回本地路径；超过重新验证周期后发送条件请求
+      （If-None-Match / If-Modified-Since），304时不重新下载
+    - 同一论文的并发请求合并为一次下载；下载在独立任务中进行，
+      某个等待者被取消（如阶段截止时间）不影响其他等待者
+    """
+
+    def __init__(self):
+        self.logger = logger
+        self.client: Optional[httpx.AsyncClient] = None
+        self.blobs = BlobStore(os.path.join(settings.PDF_CACHE_DIR, "blobs"), suffix=".pdf")
+        self._refs_dir = Path(settings.PDF_CACHE_DIR) / "refs"
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    def get_client(self) -> httpx.AsyncClient:
+        """首次使用时创建共享客户端"""
+        if self.client is None:
+            http2 = settings.FETCH_HTTP2
+            if http2:
+                try:
+                    import h2  # noqa: F401
+                except ImportError:
+                    self.logger.warning("未安装h2，论文下载使用HTTP/1.1")
+                    http2 = False
+
+            self.client = httpx.AsyncClient(
+                http2=http2,
+                timeout=settings.FETCH_TIMEOUT,
+                follow_redirects=True,
+                limits=httpx.Limits(
+                    max_connections=settings.FETCH_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.FETCH_MAX_CONNECTIONS,
+                ),
+                headers={"User-Agent": f"{settings.APP_NAME}/{settings.VERSION}"},
+            )
+        return self.client
+
+    async def close(self):
+        """取消进行中的下载并关闭连接池"""
+        for task in list(self._inflight.values()):
+            task.cancel()
+        if self._inflight:
+            await asyncio.gather(*self._inflight.values(), return_exceptions=True)
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def fetch_pdf(self,
+                        arxiv_id: Optional[str] = None,
+                        doi: Optional[str] = None) -> Optional[Tuple[str, str]]:
+        """
+        获取论文PDF的本地路径
+
+        Args:
+            arxiv_id: arXiv论文ID
+            doi: DOI标识符
+
+        Returns:
+            (本地PDF路径, 内容哈希)，无法获取时返回 None
+        """
+        if arxiv_id:
+            key, url = f"arxiv:{arxiv_id}", f"{settings.ARXIV_PDF_URL.rstrip('/')}/{arxiv_id}"
+        elif doi:
+            key, url = f"doi:{doi}", f"{settings.DOI_RESOLVER_URL.rstrip('/')}/{doi}"
+        else:
+            return None
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._download(key, url))
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._inflight.pop(key, None) if self._inflight.get(key) is done else None)
+        # 取消只作用于当前等待者，下载继续为其他等待者进行
+        return await asyncio.shield(task)
+
+    async def _download(self, key: str, url: str) -> Optional[Tuple[str, str]]:
+        try:
+            return await self._fetch(key, url)
+        except Exception as e:
+            self.logger.warning(f"论文下载失败 {key}: {e}")
+            return None
+
+    async def _fetch(self, key: str, url: str) -> Optional[Tuple[str, str]]:
+        ref = self._load_ref(key)
+        if ref and self.blobs.exists(ref["sha256"]):
+            if not self._needs_revalidation(key, ref):
+                return str(self.blobs.path_for(ref["sha256"])), ref["sha256"]
+        else:
+            ref = None
+
+        headers = {"Accept": "application/pdf"}
+        if ref:
+            if ref.get("etag"):
+                headers["If-None-Match"] = ref["etag"]
+            if ref.get("last_modified"):
+                headers["If-Modified-Since"] = ref["last_modified"]
+
+        async with self.get_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and ref:
+                ref["checked_at"] = time.time()
+                self._save_ref(key, ref)
+                return str(self.blobs.path_for(ref["sha256"])), ref["sha256"]
+
+            response.raise_for_status()
+
+            with self.blobs.open_writer() as writer:
+                async for chunk in response.aiter_bytes():
+                    if writer.size == 0 and not chunk.startswith(_PDF_MAGIC):
+                        writer.abort()
+                        self.logger.warning(f"{key} 返回的不是PDF: {response.headers.get('content-type')}")
+                        return None
+                    writer.write(chunk)
+                    if writer.size > settings.MAX_UPLOAD_SIZE:
+                        writer.abort()
+                        raise ValueError(f"PDF超过大小上限 {settings.MAX_UPLOAD_SIZE} 字节")
+
+            self._save_ref(key, {
+                "sha256": writer.digest,
+                "url": str(response.url),
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "checked_at": time.time(),
+            })
+            self.logger.info(f"论文已下载 {key}: {writer.size} 字节")
+            return str(writer.path), writer.digest
+
+    def _needs_revalidation(self, key: str, ref: Dict[str, Any]) -> bool:
+        """带版本号的arXiv ID内容不变，永不重新验证"""
+        if key.startswith("arxiv:") and _ARXIV_VERSION_RE.search(key):
+            return False
+        return time.time() - ref.get("checked_at", 0) > settings.FETCH_REVALIDATE_SECONDS
+
+    def _ref_path(self, key: str) -> Path:
+        return self._refs_dir / f"{hashlib.sha1(key.encode('utf-8')).hexdigest()}.json"
+
+    def _load_ref(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._ref_path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _save_ref(self, key: str, ref: Dict[str, Any]):
+        path = self._ref_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"key": key, **ref}, f)
+        os.replace(tmp_path, path)
@@ -3,52 +3,478 @@ RAG检索服务
 RAG Service for Semantic Search
 """
 
+import asyncio
+import json
 import logging
-from typing import List, Dict, Any, Optional
+import os
+import re
+import tempfile
+import zlib
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Iterable
+
+import numpy as np
+
+from app.config import settings
+from app.services.document_store import DocumentStore
 
 logger = logging.getLogger(__name__)
 
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+# 正文向量相对于标题/摘要向量的权重
+_BODY_WEIGHT = 0.5
+# 共享模式下各worker共同追加、各自重放的论文日志
+RAG_PAPERS_KEY = "rag:papers"
+# 共享模式下的索引快照（CHROMA_PERSIST_DIR 下），记录已重放到的日志位置
+RAG_SNAPSHOT_FILE = "rag_snapshot.npz"
+_SNAPSHOT_VERSION = 1
+# 每次从共享日志读取的条数
+_SYNC_PAGE_SIZE = 500
+# 建索引用到的论文字段，写入共享日志时只保留这些
+_INDEX_FIELDS = ("paper_id", "title", "abstract", "summary", "authors", "year", "domain_info", "content_hash", "url")
+
+
+def _index_key(paper_data: Dict[str, Any]) -> str:
+    """
+    论文在索引中的身份：PDF内容哈希，其次来源链接，最后 paper_id
+
+    上传与按arXiv ID/DOI下载的论文都带内容哈希，同一PDF无论经哪条路径分析、
+    重新分析或补算字段，都覆盖同一行，不会产生重复的检索结果。
+    """
+    if paper_data.get("content_hash"):
+        return f"sha256:{paper_data['content_hash']}"
+    if paper_data.get("url"):
+        return f"url:{paper_data['url']}"
+    return f"id:{paper_data.get('paper_id') or paper_data.get('title')}"
+
+
+def _normalize(value: Any) -> str:
+    """归一化过滤字段取值（大小写、首尾空白）"""
+    return str(value).strip().lower()
+
 
 class RAGService:
-    """RAG向量检索服务"""
-    
+    """RAG向量检索服务
+
+    除向量外，为每篇论文的元数据维护预计算索引：
+    - year: 列式 int32 数组，支持等值与范围过滤
+    - field / keyword / author: 取值 -> 位图（Python int 按行置位）
+
+    检索时先由索引求出候选行掩码，再只在候选行上计算相似度，
+    因此过滤条件不会挤占 top-k，结果数始终为 min(limit, 候选数)。
+
+    论文带有 content_hash 且文档存储中有解析结果时，正文按 RAG_CHUNK_SIZE
+    逐块从内存映射中读取并累加到向量中，不需要把全文留在内存里。
+
+    attach() 传入Redis客户端后，新论文追加到共享列表 rag:papers，每个worker
+    在写入和检索前重放自己尚未索引的部分，因此任一worker分析的论文都能被所有
+    worker检索到。Redis不可用时退回只索引到本进程。
+
+    建索引（正文分词）在线程中执行，不阻塞事件循环；索引的修改与检索由 _sync_lock 串行。
+    共享模式下每重放 RAG_SNAPSHOT_INTERVAL 篇写一次快照（向量、索引与日志偏移），
+    worker重启后从快照继续重放，不必从日志开头重建。
+    """
+
+    _BITMAP_FACETS = ("field", "keyword", "author")
+
     def __init__(self):
         self.logger = logger
         self.vector_store = None
-        
+
+        self._dim = settings.RAG_EMBEDDING_DIM
+        self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+        self._years = np.zeros(0, dtype=np.int32)
+        self._size = 0
+        self._docs: List[Dict[str, Any]] = []
+        self._row_by_id: Dict[str, int] = {}
+        self._alive = 0
+        self._bitmaps: Dict[str, Dict[str, int]] = {facet: {} for facet in self._BITMAP_FACETS}
+        self._log_offset = 0
+        self.document_store = DocumentStore(settings.DOCUMENT_STORE_DIR) if settings.ENABLE_DOCUMENT_STORE else None
+        self._redis = None
+        self._sync_lock = asyncio.Lock()
+        self.snapshot_path = Path(settings.CHROMA_PERSIST_DIR) / RAG_SNAPSHOT_FILE
+        self._snapshot_loaded = False
+        self._unsaved = 0  # 上次快照之后重放的论文数
+
     async def initialize(self):
         """初始化向量数据库"""
         try:
             # 实际使用时引入Chroma
             # from langchain_community.vectorstores import Chroma
             # from langchain_openai import OpenAIEmbeddings
-            
+
             self.logger.info("✅ 向量数据库已初始化")
         except Exception as e:
             self.logger.warning(f"向量数据库初始化失败: {e}")
-    
+
+    def attach(self, redis_client):
+        """启用（redis_client 为 None 时关闭）共享模式，首次同步时从快照或日志开头重放"""
+        self._redis = redis_client
+        self._log_offset = 0
+
+    async def warm_up(self):
+        """加载快照并重放共享日志，服务启动后在后台调用，首个检索请求不再等待重建"""
+        await self._sync()
+
+    async def close(self):
+        """有未写入快照的论文时写一次快照"""
+        if self._redis is None or not self._unsaved:
+            return
+        async with self._sync_lock:
+            await asyncio.to_thread(self._save_snapshot)
+
     async def add_paper(self, paper_data: Dict[str, Any]) -> bool:
         """添加论文到知识库"""
         try:
             self.logger.info(f"添加论文到知识库: {paper_data.get('title')}")
-            # 实际实现会调用向量数据库的add方法
+            if await self._append_shared([paper_data]):
+                await self._sync()
+            else:
+                async with self._sync_lock:
+                    await asyncio.to_thread(self._index_paper, paper_data)
             return True
         except Exception as e:
             self.logger.error(f"添加论文错误: {e}")
             return False
-    
-    async def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
-        """语义搜索相似论文"""
+
+    async def add_papers(self, papers: List[Dict[str, Any]]) -> int:
+        """批量添加论文，返回成功写入的数量"""
+        if await self._append_shared(papers):
+            await self._sync()
+            self.logger.info(f"批量添加论文到共享知识库: {len(papers)}")
+            return len(papers)
+
+        async with self._sync_lock:
+            added = await asyncio.to_thread(self._index_papers, papers)
+        self.logger.info(f"批量添加论文到知识库: {added}/{len(papers)}")
+        return added
+
+    async def publish_papers(self, papers: List[Dict[str, Any]]) -> bool:
+        """只追加到共享日志、不在本进程建索引（批量导入使用），未启用共享模式或写入失败时返回 False"""
+        return await self._append_shared(papers)
+
+    async def search(self,
+                     query: str,
+                     limit: int = 10,
+                     year: Optional[int] = None,
+                     year_min: Optional[int] = None,
+                     year_max: Optional[int] = None,
+                     field: Optional[str] = None,
+                     keywords: Optional[List[str]] = None,
+                     authors: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        语义搜索相似论文
+
+        同一维度内多个取值为"或"，不同维度之间为"与"。
+        """
         try:
-            # 实际实现会调用向量数据库的搜索方法
-            return [
-                {
-                    "title": f"Related Paper {i+1}",
-                    "similarity": 0.9 - i*0.05,
-                    "snippet": "..."
-                }
-                for i in range(limit)
-            ]
+            await self._sync()
+            async with self._sync_lock:
+                return self._search(query, limit, year, year_min, year_max, field, keywords, authors)
         except Exception as e:
             self.logger.error(f"搜索错误: {e}")
             return []
+
+    # ==================== 共享日志 ====================
+
+    async def _append_shared(self, papers: List[Dict[str, Any]]) -> bool:
+        """追加到共享日志，未启用或写入失败时返回 False（由调用方本地索引）"""
+        if self._redis is None or not papers:
+            return False
+        try:
+            await self._redis.rpush(RAG_PAPERS_KEY, *(
+                json.dumps({k: paper[k] for k in _INDEX_FIELDS if k in paper}, ensure_ascii=False, default=str)
+                for paper in papers
+            ))
+            return True
+        except Exception as e:
+            self.logger.warning(f"共享知识库写入失败，仅索引到本进程: {e}")
+            return False
+
+    async def _sync(self):
+        """索引共享日志中本进程尚未重放的论文（首次同步时先加载快照），按页读取并在线程中建索引"""
+        if self._redis is None:
+            return
+        async with self._sync_lock:
+            try:
+                if not self._snapshot_loaded:
+                    self._snapshot_loaded = True
+                    await asyncio.to_thread(self._load_snapshot)
+                    if await self._redis.llen(RAG_PAPERS_KEY) < self._log_offset:
+                        # 日志被清空或重建，快照已不对应
+                        self.logger.warning("共享知识库日志短于快照位置，从头重建索引")
+                        self._reset_index()
+                while True:
+                    entries = await self._redis.lrange(
+                        RAG_PAPERS_KEY, self._log_offset, self._log_offset + _SYNC_PAGE_SIZE - 1)
+                    if not entries:
+                        break
+                    await asyncio.to_thread(self._index_entries, entries)
+                    self._log_offset += len(entries)
+                    self._unsaved += len(entries)
+                    if settings.RAG_SNAPSHOT_INTERVAL > 0 and self._unsaved >= settings.RAG_SNAPSHOT_INTERVAL:
+                        await asyncio.to_thread(self._save_snapshot)
+            except Exception as e:
+                self.logger.warning(f"共享知识库同步失败: {e}")
+
+    def _index_entries(self, entries: List[str]):
+        """索引共享日志中的一页论文"""
+        for raw in entries:
+            try:
+                self._index_paper(json.loads(raw))
+            except Exception as e:
+                self.logger.error(f"共享知识库论文索引错误: {e}")
+
+    # ==================== 快照 ====================
+
+    def _save_snapshot(self):
+        """写入索引快照（调用方持有 _sync_lock），先写临时文件再原子替换"""
+        state = {
+            "version": _SNAPSHOT_VERSION,
+            "dim": self._dim,
+            "log_offset": self._log_offset,
+            "docs": self._docs,
+            "keys": self._row_by_id,
+            "alive": format(self._alive, "x"),
+            "bitmaps": {facet: {value: format(bits, "x") for value, bits in index.items()}
+                        for facet, index in self._bitmaps.items()},
+        }
+        try:
+            self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.snapshot_path.parent, prefix=".rag-", suffix=".npz")
+            with os.fdopen(fd, "wb") as f:
+                np.savez(f,
+                         vectors=self._vectors[:self._size],
+                         years=self._years[:self._size],
+                         state=np.frombuffer(json.dumps(state, ensure_ascii=False, default=str).encode("utf-8"),
+                                             dtype=np.uint8))
+            os.replace(tmp_path, self.snapshot_path)
+            self._unsaved = 0
+            self.logger.info(f"知识库快照已写入: {self._size} 篇，日志位置 {self._log_offset}")
+        except OSError as e:
+            self.logger.warning(f"知识库快照写入失败: {e}")
+
+    def _load_snapshot(self):
+        """加载索引快照，不存在或不兼容时从空索引开始"""
+        try:
+            with np.load(self.snapshot_path) as data:
+                state = json.loads(data["state"].tobytes().decode("utf-8"))
+                if state.get("version") != _SNAPSHOT_VERSION or state.get("dim") != self._dim:
+                    self.logger.info("知识库快照版本或向量维度不匹配，忽略")
+                    return
+                vectors = np.array(data["vectors"], dtype=np.float32)
+                years = np.array(data["years"], dtype=np.int32)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            self.logger.warning(f"知识库快照读取失败: {e}")
+            return
+
+        self._vectors, self._years = vectors, years
+        self._size = len(vectors)
+        self._docs = state["docs"]
+        self._row_by_id = state["keys"]
+        self._alive = int(state["alive"], 16)
+        self._bitmaps = {facet: {value: int(bits, 16) for value, bits in state["bitmaps"].get(facet, {}).items()}
+                         for facet in self._BITMAP_FACETS}
+        self._log_offset = state["log_offset"]
+        self.logger.info(f"知识库快照已加载: {self._size} 篇，日志位置 {self._log_offset}")
+
+    # ==================== 索引维护 ====================
+
+    def _reset_index(self):
+        """清空索引与日志位置"""
+        self._vectors = np.zeros((0, self._dim), dtype=np.float32)
+        self._years = np.zeros(0, dtype=np.int32)
+        self._size = 0
+        self._docs = []
+        self._row_by_id = {}
+        self._alive = 0
+        self._bitmaps = {facet: {} for facet in self._BITMAP_FACETS}
+        self._log_offset = 0
+
+    def _index_papers(self, papers: List[Dict[str, Any]]) -> int:
+        """本地索引一批论文，返回成功数量"""
+        added = 0
+        for paper_data in papers:
+            try:
+                self._index_paper(paper_data)
+                added += 1
+            except Exception as e:
+                self.logger.error(f"添加论文错误 {paper_data.get('title')}: {e}")
+        return added
+
+    def _index_paper(self, paper_data: Dict[str, Any]):
+        """写入向量、列式年份与位图索引（同一论文覆盖旧行，见 _index_key）"""
+        paper_id = str(paper_data.get("paper_id") or paper_data.get("title") or self._size)
+        key = _index_key(paper_data)
+        domain_info = paper_data.get("domain_info") or {}
+
+        facets = {
+            "field": [domain_info.get("primary_field")] if domain_info.get("primary_field") else [],
+            "keyword": domain_info.get("keywords") or [],
+            "author": paper_data.get("authors") or [],
+        }
+
+        if key in self._row_by_id:
+            row = self._row_by_id[key]
+            self._clear_row(row)
+        else:
+            row = self._append_row()
+            self._row_by_id[key] = row
+
+        text = " ".join([
+            paper_data.get("title") or "",
+            paper_data.get("abstract") or "",
+            " ".join(facets["keyword"]),
+            paper_data.get("summary") or "",
+        ])
+        self._vectors[row] = self._embed_paper(text, paper_data.get("content_hash"))
+        self._years[row] = int(paper_data.get("year") or 0)
+        self._docs[row] = {
+            "paper_id": paper_id,
+            "title": paper_data.get("title", ""),
+            "authors": list(facets["author"]),
+            "year": paper_data.get("year"),
+            "primary_field": domain_info.get("primary_field"),
+            "snippet": (paper_data.get("abstract") or "")[:200],
+        }
+
+        bit = 1 << row
+        self._alive |= bit
+        for facet, values in facets.items():
+            index = self._bitmaps[facet]
+            for value in {_normalize(v) for v in values if v}:
+                index[value] = index.get(value, 0) | bit
+
+    def _append_row(self) -> int:
+        """追加一行，容量不足时按倍数扩容"""
+        row = self._size
+        if row >= self._vectors.shape[0]:
+            capacity = max(64, self._vectors.shape[0] * 2)
+            vectors = np.zeros((capacity, self._dim), dtype=np.float32)
+            vectors[:row] = self._vectors[:row]
+            years = np.zeros(capacity, dtype=np.int32)
+            years[:row] = self._years[:row]
+            self._vectors, self._years = vectors, years
+        self._docs.append({})
+        self._size += 1
+        return row
+
+    def _clear_row(self, row: int):
+        """从所有位图中移除该行"""
+        mask = ~(1 << row)
+        self._alive &= mask
+        for index in self._bitmaps.values():
+            for value in list(index):
+                index[value] &= mask
+                if not index[value]:
+                    del index[value]
+
+    # ==================== 查询 ====================
+
+    def _search(self,
+                query: str,
+                limit: int,
+                year: Optional[int],
+                year_min: Optional[int],
+                year_max: Optional[int],
+                field: Optional[str],
+                keywords: Optional[List[str]],
+                authors: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """在候选行上计算相似度并取 top-k（调用方持有 _sync_lock）"""
+        if self._size == 0 or limit <= 0:
+            return []
+
+        candidates = self._candidate_mask(year, year_min, year_max, field, keywords, authors)
+        rows = np.flatnonzero(candidates)
+        if rows.size == 0:
+            return []
+
+        scores = self._vectors[rows] @ self._embed(query)
+        k = min(limit, rows.size)
+        if k < rows.size:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(rows.size)
+        top = top[np.argsort(-scores[top], kind="stable")]
+
+        results = []
+        for i in top:
+            doc = self._docs[rows[i]]
+            results.append({**doc, "similarity": round(float(scores[i]), 4)})
+        return results
+
+    def _candidate_mask(self,
+                        year: Optional[int],
+                        year_min: Optional[int],
+                        year_max: Optional[int],
+                        field: Optional[str],
+                        keywords: Optional[List[str]],
+                        authors: Optional[List[str]]) -> np.ndarray:
+        """根据过滤条件计算候选行的布尔掩码"""
+        bitmap = self._alive
+        for facet, values in (
+            ("field", [field] if field else None),
+            ("keyword", keywords),
+            ("author", authors),
+        ):
+            if values:
+                bitmap &= self._facet_bitmap(facet, values)
+                if not bitmap:
+                    break
+
+        mask = self._bitmap_to_mask(bitmap)
+        years = self._years[:self._size]
+        if year is not None:
+            mask &= years == year
+        if year_min is not None:
+            mask &= years >= year_min
+        if year_max is not None:
+            mask &= years <= year_max
+        return mask
+
+    def _facet_bitmap(self, facet: str, values: Iterable[str]) -> int:
+        """同一维度多个取值的并集"""
+        index = self._bitmaps[facet]
+        bitmap = 0
+        for value in values:
+            bitmap |= index.get(_normalize(value), 0)
+        return bitmap
+
+    def _bitmap_to_mask(self, bitmap: int) -> np.ndarray:
+        """将位图展开为长度为行数的布尔数组"""
+        nbytes = (self._size + 7) // 8
+        packed = np.frombuffer(bitmap.to_bytes(nbytes, "little"), dtype=np.uint8)
+        return np.unpackbits(packed, bitorder="little")[:self._size].astype(bool)
+
+    def _embed_paper(self, text: str, content_hash: Optional[str]) -> np.ndarray:
+        """标题/摘要向量，文档存储中有正文时叠加正文分块向量"""
+        vector = self._embed(text)
+        document = self.document_store.get(content_hash) if self.document_store and content_hash else None
+        if document is None:
+            return vector
+
+        with document:
+            body = np.zeros(self._dim, dtype=np.float32)
+            for chunk in document.iter_chunks(settings.RAG_CHUNK_SIZE):
+                self._accumulate(body, chunk)
+        norm = np.linalg.norm(body)
+        if norm:
+            vector = vector + _BODY_WEIGHT * body / norm
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _embed(self, text: str) -> np.ndarray:
+        """特征哈希向量（本地占位，接入OpenAIEmbeddings时替换此方法）"""
+        vector = np.zeros(self._dim, dtype=np.float32)
+        self._accumulate(vector, text)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _accumulate(self, vector: np.ndarray, text: str):
+        """将文本的哈希特征累加到向量上"""
+        for token in _TOKEN_RE.findall(text.lower()):
+            h = zlib.crc32(token.encode("utf-8"))
+            vector[h % self._dim] += 1.0 if h & 0x80000000 else -1.0
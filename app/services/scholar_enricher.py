@@ -0,0 +1,178 @@
+"""
+学者信息补全服务 - Semantic Scholar 批量查询 + 本地缓存
+Scholar Profile Enrichment
+"""
+
+import asyncio
+import logging
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from app.config import settings
+from app.models.schemas import ScholarInfo
+from app.services.author_cache import AuthorCache, normalize_name
+from app.services.metadata_resolver import BatchCoalescer, MetadataResolver
+
+logger = logging.getLogger(__name__)
+
+_AUTHOR_FIELDS = "name,affiliations,hIndex,citationCount,paperCount"
+
+
+class ScholarEnricher:
+    """学者信息补全
+
+    先查本地缓存；未缓存的姓名通过 /author/search 解析（取相关度最高的结果），
+    档案过期的学者通过 /author/batch 按ID批量刷新。并发论文中的同名查询
+    由 BatchCoalescer 合并，所有请求共用 Semantic Scholar 限流器。
+    每位学者查到即写入缓存，补全阶段超时被取消时已查到的结果不会丢失；
+    远端查询失败时不写缓存，保留已有信息。
+    """
+
+    def __init__(self, resolver: MetadataResolver, cache: AuthorCache):
+        self.logger = logger
+        self.resolver = resolver
+        self.cache = cache
+        self.stats = {"cache_hits": 0, "searched": 0, "refreshed": 0}
+
+        self.search = BatchCoalescer(
+            "Semantic Scholar 学者搜索",
+            self._search_batch,
+            window=settings.METADATA_BATCH_WINDOW,
+            max_batch=settings.SEMANTIC_SCHOLAR_BATCH_SIZE,
+        )
+        self.refresh = BatchCoalescer(
+            "Semantic Scholar 学者批量查询",
+            self._author_batch,
+            window=settings.METADATA_BATCH_WINDOW,
+            max_batch=settings.SEMANTIC_SCHOLAR_BATCH_SIZE,
+            rate_limiter=resolver.s2_limiter,
+        )
+
+    async def close(self):
+        """取消尚未完成的批量查询并关闭学者缓存"""
+        await asyncio.gather(self.search.close(), self.refresh.close())
+        self.cache.close()
+
+    async def enrich(self, scholars: List[ScholarInfo]) -> List[ScholarInfo]:
+        """
+        补全学者的机构、H指数和引用数（原地更新并返回）
+
+        Args:
+            scholars: 仅含姓名的学者列表
+
+        Returns:
+            补全后的学者列表，查不到的学者保持原样
+        """
+        if not scholars:
+            return scholars
+
+        names = {scholar.name: normalize_name(scholar.name) for scholar in scholars}
+        try:
+            mapping, authors = await asyncio.to_thread(self.cache.lookup, names.values())
+        except sqlite3.Error as e:
+            self.logger.warning(f"学者缓存读取失败: {e}")
+            mapping, authors = {}, {}
+
+        now = time.time()
+        profiles: Dict[str, Dict[str, Any]] = {}
+        to_search: List[str] = []
+        to_refresh: Dict[str, str] = {}
+        for name in set(names.values()):
+            if name not in mapping:
+                to_search.append(name)
+                continue
+            author_id, resolved_at = mapping[name]
+            if author_id is None:
+                if now - resolved_at >= settings.AUTHOR_NEGATIVE_CACHE_TTL:
+                    to_search.append(name)
+                continue
+            profile = authors.get(author_id)
+            if profile is not None:
+                profiles[name] = profile
+            if profile is None or now - profile["fetched_at"] >= settings.AUTHOR_CACHE_TTL:
+                to_refresh[name] = author_id
+            else:
+                self.stats["cache_hits"] += 1
+
+        if to_search or to_refresh:
+            await self._lookup_remote(to_search, to_refresh, profiles)
+
+        for scholar in scholars:
+            profile = profiles.get(names[scholar.name])
+            if profile:
+                scholar.affiliation = profile.get("affiliation") or scholar.affiliation
+                scholar.h_index = profile.get("h_index")
+                scholar.citation_count = profile.get("citation_count")
+        return scholars
+
+    async def _lookup_remote(self,
+                             to_search: List[str],
+                             to_refresh: Dict[str, str],
+                             profiles: Dict[str, Dict[str, Any]]):
+        """远端查询；结果 None 表示查询失败，{} 表示查无此人（缓存由批量查询写入）"""
+        self.stats["searched"] += len(to_search)
+        self.stats["refreshed"] += len(to_refresh)
+        results = await asyncio.gather(
+            *(self.search.get(name) for name in to_search),
+            *(self.refresh.get(author_id) for author_id in to_refresh.values()),
+        )
+        for name, result in zip(to_search + list(to_refresh), results):
+            if result:
+                profiles[name] = result
+
+    async def _store(self, names: Dict[str, Optional[str]], authors: List[Dict[str, Any]]):
+        """写入缓存；批量查询在独立任务中运行，调用方被取消后仍会写入"""
+        try:
+            await asyncio.to_thread(self.cache.store, names, authors)
+        except sqlite3.Error as e:
+            self.logger.warning(f"学者缓存写入失败: {e}")
+
+    async def _search_batch(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """逐个姓名搜索（搜索接口不支持批量），每次请求申请一个令牌"""
+        results = {}
+        for name in names:
+            await self.resolver.s2_limiter.acquire()
+            try:
+                response = await self.resolver.semantic_scholar_request(
+                    "GET", "/author/search",
+                    params={"query": name, "limit": 1, "fields": _AUTHOR_FIELDS},
+                )
+            except httpx.HTTPError as e:
+                self.logger.warning(f"学者搜索失败 {name}: {e}")
+                continue
+            data = response.json().get("data") or []
+            profile = self._profile(data[0]) if data else {}
+            results[name] = profile
+            # 逐个写入，整批完成前被截止时间打断也保留已查到的学者
+            await self._store({name: profile.get("author_id")}, [profile] if profile else [])
+        return results
+
+    async def _author_batch(self, author_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """按学者ID批量查询档案"""
+        response = await self.resolver.semantic_scholar_request(
+            "POST", "/author/batch",
+            params={"fields": _AUTHOR_FIELDS},
+            json={"ids": author_ids},
+        )
+        results = {
+            author_id: self._profile(author) if author else {}
+            for author_id, author in zip(author_ids, response.json())
+        }
+        # 按ID刷新只更新档案，姓名映射不变
+        await self._store({}, [profile for profile in results.values() if profile])
+        return results
+
+    @staticmethod
+    def _profile(author: Dict[str, Any]) -> Dict[str, Any]:
+        affiliations = author.get("affiliations") or []
+        return {
+            "author_id": author["authorId"],
+            "name": author.get("name") or "",
+            "affiliation": affiliations[0] if affiliations else None,
+            "h_index": author.get("hIndex"),
+            "citation_count": author.get("citationCount"),
+            "paper_count": author.get("paperCount"),
+        }
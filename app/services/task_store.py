@@ -0,0 +1,298 @@
+"""
+任务状态存储与进度事件发布
+Task State Store with Progress Events
+"""
+
+import asyncio
+import json
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from app.config import settings
+from app.models.schemas import AnalysisStatus, AGENT_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# 终止状态，订阅者收到后结束推送
+TERMINAL_STATUSES = (AnalysisStatus.COMPLETED, AnalysisStatus.FAILED)
+
+# 共享模式下的Redis键
+TASK_KEY = "task:{}"
+TASK_META_KEY = "task:{}:meta"  # status / version，轮询先比较ETag，不解码完整记录
+TASK_RESPONSE_KEY = "task:{}:response"  # 已完成任务预序列化的状态响应
+TASK_EVENTS_CHANNEL = "task-events:{}"
+TASK_METRICS_KEY = "task-metrics"
+
+
+def ready_fields(task: Dict[str, Any]) -> Dict[str, bool]:
+    """各Agent字段的就绪状态"""
+    done = task["status"] == AnalysisStatus.COMPLETED
+    return {field: done or field in task["partial"] for field in AGENT_FIELDS}
+
+
+def _dumps(task: Dict[str, Any]) -> str:
+    return json.dumps(
+        {**task, "status": task["status"].value, "created_at": task["created_at"].isoformat()},
+        ensure_ascii=False, default=str
+    )
+
+
+def _loads(raw: str) -> Dict[str, Any]:
+    task = json.loads(raw)
+    task["status"] = AnalysisStatus(task["status"])
+    task["created_at"] = datetime.fromisoformat(task["created_at"])
+    return task
+
+
+class TaskStore:
+    """任务状态存储
+
+    每次更新递增任务的 version（用作ETag），并把进度事件
+    推送给该任务的所有订阅者（SSE / WebSocket）。
+
+    attach() 传入Redis客户端后进入共享模式，多个worker进程共用任务状态：
+    - 任务记录以JSON保存在 task:{id}（TASK_TTL 后过期），任何worker都能查询
+    - 状态与版本号另存于小哈希 task:{id}:meta，已完成任务的响应正文存于 task:{id}:response，
+      状态轮询只读这两项，不解码含结果的完整记录
+    - 执行任务的worker保留本地副本，任务结束后丢弃
+    - 进度事件同时发布到 task-events:{id}，其他worker上的订阅者经此收到
+    - 任务计数保存在 task-metrics 哈希中
+    Redis操作失败时记录警告，当前worker的本地订阅与查询不受影响。
+    """
+
+    def __init__(self):
+        self.logger = logger
+        self._tasks: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._redis = None
+        self._listeners: Dict[str, asyncio.Task] = {}
+        self.instance_id: Optional[str] = None
+
+    def attach(self, redis_client):
+        """启用（redis_client 为 None 时关闭）共享模式，应在worker进程中（fork之后）调用"""
+        self._redis = redis_client
+        # 区分本进程发布的事件，避免经Redis重复投递；预加载应用时实例创建于fork之前，不能在构造时生成
+        self.instance_id = uuid.uuid4().hex
+
+    async def create(self, task_id: str, **fields) -> Dict[str, Any]:
+        """创建任务记录"""
+        task = {
+            "status": AnalysisStatus.PENDING,
+            "progress": 0,
+            "stage": None,
+            "result": None,
+            "partial": {},
+            "error": None,
+            "created_at": datetime.now(),
+            "version": 0,
+        }
+        task.update(fields)
+        self._tasks[task_id] = task
+        if self._redis is not None:
+            try:
+                async with self._redis.pipeline(transaction=False) as pipe:
+                    self._write(pipe, task_id, task)
+                    pipe.hincrby(TASK_METRICS_KEY, "total", 1)
+                    await pipe.execute()
+            except Exception as e:
+                self.logger.warning(f"共享任务写入失败 {task_id}: {e}")
+        return task
+
+    async def get(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """获取任务记录（本地没有时从Redis读取其他worker的任务）"""
+        task = self._tasks.get(task_id)
+        if task is None and self._redis is not None:
+            task = await self._fetch(task_id)
+        return task
+
+    async def get_meta(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """
+        任务的状态与版本号 {"status", "version"}
+
+        本地没有时只读Redis中的 task:{id}:meta，不解码完整记录；
+        缺少 meta 的旧记录退回读取完整记录。
+        """
+        task = self._tasks.get(task_id)
+        if task is None and self._redis is not None:
+            try:
+                status, version = await self._redis.hmget(TASK_META_KEY.format(task_id), "status", "version")
+            except Exception as e:
+                self.logger.warning(f"共享任务状态读取失败 {task_id}: {e}")
+                return None
+            if status is not None:
+                return {"status": AnalysisStatus(status), "version": int(version)}
+            task = await self._fetch(task_id)
+        if task is None:
+            return None
+        return {"status": task["status"], "version": task["version"]}
+
+    async def save_response(self, task_id: str, body: bytes):
+        """保存已完成任务的序列化响应，供其他worker直接返回"""
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(TASK_RESPONSE_KEY.format(task_id), body, ex=settings.TASK_TTL)
+        except Exception as e:
+            self.logger.warning(f"共享任务响应写入失败 {task_id}: {e}")
+
+    async def load_response(self, task_id: str) -> Optional[bytes]:
+        """读取其他worker保存的已完成任务响应，没有时返回 None"""
+        if self._redis is None:
+            return None
+        try:
+            body = await self._redis.get(TASK_RESPONSE_KEY.format(task_id))
+        except Exception as e:
+            self.logger.warning(f"共享任务响应读取失败 {task_id}: {e}")
+            return None
+        if isinstance(body, str):
+            body = body.encode()
+        return body
+
+    async def list(self) -> List[Dict[str, Any]]:
+        """本进程持有的任务记录（共享模式下只含执行中的任务）"""
+        return list(self._tasks.values())
+
+    async def counts(self) -> Dict[str, int]:
+        """任务计数: total / completed / failed（共享模式下为所有worker的合计）"""
+        if self._redis is not None:
+            try:
+                stored = await self._redis.hgetall(TASK_METRICS_KEY)
+                return {key: int(stored.get(key, 0)) for key in ("total", "completed", "failed")}
+            except Exception as e:
+                self.logger.warning(f"共享任务计数读取失败: {e}")
+        tasks = self._tasks.values()
+        return {
+            "total": len(self._tasks),
+            "completed": sum(1 for t in tasks if t["status"] == AnalysisStatus.COMPLETED),
+            "failed": sum(1 for t in tasks if t["status"] == AnalysisStatus.FAILED),
+        }
+
+    async def update(self,
+                     task_id: str,
+                     stage: Optional[str] = None,
+                     event_data: Optional[Dict[str, Any]] = None,
+                     **fields) -> Optional[Dict[str, Any]]:
+        """更新任务并发布进度事件，event_data 仅附加在本次事件上"""
+        task = self._tasks.get(task_id)
+        if task is None:
+            return None
+
+        was_terminal = task["status"] in TERMINAL_STATUSES
+        task.update(fields)
+        if stage:
+            task["stage"] = stage
+        task["version"] += 1
+
+        event = self.snapshot(task_id, task)
+        if event_data:
+            event["data"] = event_data
+        self._deliver(task_id, event)
+
+        if self._redis is not None:
+            await self._publish(task_id, task, event, finished=not was_terminal and task["status"] in TERMINAL_STATUSES)
+            if task["status"] in TERMINAL_STATUSES:
+                self._tasks.pop(task_id, None)
+        return task
+
+    def subscribe(self, task_id: str) -> asyncio.Queue:
+        """订阅任务进度事件"""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(task_id, set()).add(queue)
+        # 任务由其他worker执行时，经Redis转发其进度事件
+        if self._redis is not None and task_id not in self._tasks and task_id not in self._listeners:
+            self._listeners[task_id] = asyncio.create_task(self._listen(task_id))
+        return queue
+
+    def unsubscribe(self, task_id: str, queue: asyncio.Queue):
+        """取消订阅"""
+        queues = self._subscribers.get(task_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self._subscribers[task_id]
+                listener = self._listeners.pop(task_id, None)
+                if listener is not None:
+                    listener.cancel()
+
+    @staticmethod
+    def snapshot(task_id: str, task: Dict[str, Any]) -> Dict[str, Any]:
+        """任务的进度事件表示（仅在完成时携带结果）"""
+        status = task["status"]
+        event = {
+            "task_id": task_id,
+            "event": task.get("stage") or status.value,
+            "status": status.value,
+            "progress": task["progress"],
+            "version": task["version"],
+            "ready_fields": ready_fields(task),
+        }
+        if status == AnalysisStatus.COMPLETED:
+            event["result"] = task["result"]
+        elif status == AnalysisStatus.FAILED:
+            event["error"] = task["error"]
+        return event
+
+    # ==================== 共享模式 ====================
+
+    @staticmethod
+    def _write(pipe, task_id: str, task: Dict[str, Any]):
+        """在pipeline中写入任务记录与其 meta（同一往返，版本号一致）"""
+        pipe.set(TASK_KEY.format(task_id), _dumps(task), ex=settings.TASK_TTL)
+        meta_key = TASK_META_KEY.format(task_id)
+        pipe.hset(meta_key, mapping={"status": task["status"].value, "version": task["version"]})
+        pipe.expire(meta_key, settings.TASK_TTL)
+
+    def _deliver(self, task_id: str, event: Dict[str, Any]):
+        for queue in self._subscribers.get(task_id, ()):
+            queue.put_nowait(event)
+
+    async def _fetch(self, task_id: str) -> Optional[Dict[str, Any]]:
+        try:
+            raw = await self._redis.get(TASK_KEY.format(task_id))
+        except Exception as e:
+            self.logger.warning(f"共享任务读取失败 {task_id}: {e}")
+            return None
+        return _loads(raw) if raw else None
+
+    async def _publish(self, task_id: str, task: Dict[str, Any], event: Dict[str, Any], finished: bool):
+        """写回任务记录并广播事件；任务首次进入终止状态时累加计数"""
+        message = json.dumps({"origin": self.instance_id, "event": event}, ensure_ascii=False, default=str)
+        try:
+            async with self._redis.pipeline(transaction=False) as pipe:
+                self._write(pipe, task_id, task)
+                pipe.publish(TASK_EVENTS_CHANNEL.format(task_id), message)
+                if finished:
+                    counter = "completed" if task["status"] == AnalysisStatus.COMPLETED else "failed"
+                    pipe.hincrby(TASK_METRICS_KEY, counter, 1)
+                await pipe.execute()
+        except Exception as e:
+            self.logger.warning(f"共享任务发布失败 {task_id}: {e}")
+
+    async def _listen(self, task_id: str):
+        """把其他worker发布的事件转发给本进程的订阅者，直到取消订阅"""
+        channel = TASK_EVENTS_CHANNEL.format(task_id)
+        pubsub = self._redis.pubsub()
+        try:
+            await pubsub.subscribe(channel)
+            # 订阅生效前发布的事件已错过，补发一次当前状态（订阅者按 version 去重）
+            task = await self._fetch(task_id)
+            if task is not None:
+                self._deliver(task_id, self.snapshot(task_id, task))
+            async for message in pubsub.listen():
+                if message["type"] != "message":
+                    continue
+                payload = json.loads(message["data"])
+                if payload["origin"] != self.instance_id:
+                    self._deliver(task_id, payload["event"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.warning(f"共享任务事件订阅失败 {task_id}: {e}")
+        finally:
+            try:
+                await pubsub.unsubscribe(channel)
+                await pubsub.aclose()
+            except Exception:
+                pass
@@ -0,0 +1,240 @@
+"""
+上传文件存储 - 内容寻址去重与定期清理
+Deduplicated Upload Storage with Quotas
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.services.blob_store import BlobStore, BlobWriter
+
+logger = logging.getLogger(__name__)
+
+
+class UploadStore:
+    """上传文件按内容哈希存储，任务通过硬链接引用
+
+    UPLOAD_DIR/blobs/ab/cd/<sha256>.<ext>  文件内容，相同内容只保存一份
+    UPLOAD_DIR/tasks/<task_id>.<ext>       分析中的任务对内容的硬链接
+
+    硬链接数即引用计数（跨进程有效）：链接数大于1的内容正被任务使用，清理时跳过。
+    任务结束后删除其链接，内容保留到超过保存期限或总量配额时按最近使用时间淘汰，
+    重复上传的论文在此期间无需再写盘。
+
+    任务链接在写入的临时文件提交之前创建，内容从落盘起就有任务引用，清理不会在
+    提交与建链之间删掉它。文件系统不支持硬链接时任务直接使用内容路径，由进程内
+    引用计数保护（清理与提交共用一把锁）；这种情况下其他进程的清理无法感知引用。
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self.logger = logger
+        self.root = Path(root or settings.UPLOAD_DIR)
+        self.blobs_dir = self.root / "blobs"
+        self.tasks_dir = self.root / "tasks"
+        self._stores: Dict[str, BlobStore] = {}
+        # 不支持硬链接时任务直接使用的内容路径 -> 引用数
+        self._pinned: Counter = Counter()
+        self._lock = threading.Lock()
+
+    def open_writer(self, filename: Optional[str], task_id: str) -> "UploadWriter":
+        """
+        流式写入上传内容，关闭时落盘到内容地址并为任务建立引用
+
+        关闭后 writer.task_path 为任务使用的文件路径，任务结束时交给 release()
+        """
+        suffix = Path(filename or "").suffix.lower()
+        if suffix.lstrip(".") not in settings.ALLOWED_EXTENSIONS:
+            suffix = ".pdf"
+        if suffix not in self._stores:
+            self._stores[suffix] = BlobStore(str(self.blobs_dir), suffix=suffix)
+        return UploadWriter(self._stores[suffix], self, task_id)
+
+    def _commit(self, store: BlobStore, tmp_path: str, digest: str, task_id: str) -> Tuple[Path, str]:
+        """
+        先为任务硬链接临时文件，再提交内容；内容已存在时任务改为链接已有内容
+
+        Returns:
+            (内容路径, 任务使用的文件路径)
+        """
+        target = store.path_for(digest)
+        self.tasks_dir.mkdir(parents=True, exist_ok=True)
+        task_path = self.tasks_dir / f"{task_id}{store.suffix}"
+
+        with self._lock:
+            try:
+                os.link(tmp_path, task_path)
+            except FileNotFoundError:
+                raise
+            except OSError as e:
+                self.logger.debug(f"无法创建硬链接，任务直接使用内容路径: {e}")
+                path = store._commit(tmp_path, digest)
+                os.utime(path)
+                self._pinned[str(path)] += 1
+                return path, str(path)
+
+            if target.exists():
+                # 重复上传：任务链接换成已有内容，刷新其最近使用时间，丢弃本次写入
+                swap_path = self.tasks_dir / f".{task_id}.swap"
+                try:
+                    os.link(target, swap_path)
+                except FileNotFoundError:
+                    # 已有内容刚被其他进程清理，提交本次写入的内容
+                    pass
+                else:
+                    os.replace(swap_path, task_path)
+                    os.utime(target)
+                    os.unlink(tmp_path)
+                    return target, str(task_path)
+
+            target.parent.mkdir(parents=True, exist_ok=True)
+            os.replace(tmp_path, target)
+            return target, str(task_path)
+
+    def release(self, file_path: Optional[str]):
+        """任务结束，删除其硬链接或释放进程内引用（内容本身由清理任务回收）"""
+        if not file_path:
+            return
+        with self._lock:
+            if self._pinned[file_path] > 0:
+                self._pinned[file_path] -= 1
+                if not self._pinned[file_path]:
+                    del self._pinned[file_path]
+                return
+            self._pinned.pop(file_path, None)
+        if Path(file_path).parent != self.tasks_dir:
+            return
+        try:
+            os.unlink(file_path)
+        except FileNotFoundError:
+            pass
+
+    def reap(self,
+             max_bytes: Optional[int] = None,
+             max_age: Optional[float] = None,
+             task_link_max_age: Optional[float] = None) -> Dict[str, int]:
+        """
+        按保存期限和总量配额清理上传目录
+
+        1. 删除超过 task_link_max_age 的任务链接（进程崩溃后遗留）
+        2. 删除超过 max_age 未使用且无任务引用的内容
+        3. 总量仍超过 max_bytes 时，按最近使用时间从旧到新删除无引用的内容
+
+        Returns:
+            清理统计
+        """
+        max_bytes = settings.UPLOAD_MAX_TOTAL_BYTES if max_bytes is None else max_bytes
+        max_age = settings.UPLOAD_MAX_AGE if max_age is None else max_age
+        task_link_max_age = settings.UPLOAD_TASK_LINK_MAX_AGE if task_link_max_age is None else task_link_max_age
+        now = time.time()
+        stats = {"removed": 0, "freed_bytes": 0, "kept": 0, "kept_bytes": 0, "in_use": 0}
+
+        # 任务链接与旧版 UPLOAD_DIR/{task_id}_{filename} 文件只按期限清理
+        for directory, limit in ((self.tasks_dir, task_link_max_age), (self.root, max_age)):
+            for entry in self._scan_files(directory):
+                if now - entry.stat().st_mtime > limit:
+                    self._remove(entry.path, entry.stat().st_size, stats)
+
+        blobs: List[Tuple[float, int, str]] = []
+        total = 0
+        for shard in self._scan_dirs(self.blobs_dir):
+            for subshard in self._scan_dirs(shard.path):
+                for entry in self._scan_files(subshard.path):
+                    st = entry.stat()
+                    if st.st_nlink > 1:
+                        stats["in_use"] += 1
+                    elif now - st.st_mtime > max_age:
+                        self._remove_unused(entry.path, st.st_mtime, st.st_size, stats)
+                        continue
+                    else:
+                        blobs.append((st.st_mtime, st.st_size, entry.path))
+                    total += st.st_size
+
+        # 写入中断遗留的临时文件
+        for entry in self._scan_files(self.blobs_dir):
+            if entry.name.startswith(".incoming-") and now - entry.stat().st_mtime > task_link_max_age:
+                self._remove(entry.path, entry.stat().st_size, stats)
+
+        blobs.sort()
+        for mtime, size, path in blobs:
+            if total <= max_bytes:
+                stats["kept"] += 1
+                stats["kept_bytes"] += size
+                continue
+            self._remove_unused(path, mtime, size, stats)
+            total -= size
+        return stats
+
+    async def run_reaper(self, interval: Optional[float] = None):
+        """后台定期清理，直到任务被取消"""
+        interval = interval or settings.UPLOAD_REAP_INTERVAL
+        while True:
+            try:
+                stats = await asyncio.to_thread(self.reap)
+                if stats["removed"]:
+                    self.logger.info(
+                        f"上传目录清理: 删除 {stats['removed']} 个文件，释放 {stats['freed_bytes']} 字节，"
+                        f"保留 {stats['kept']} 个（{stats['kept_bytes']} 字节），使用中 {stats['in_use']} 个"
+                    )
+            except Exception as e:
+                self.logger.warning(f"上传目录清理失败: {e}")
+            await asyncio.sleep(interval)
+
+    def _remove_unused(self, path: str, mtime: float, size: int, stats: Dict[str, int]):
+        """删除前再次确认：扫描后被重新上传（刷新了时间）或被任务引用的内容保留"""
+        with self._lock:
+            if self._pinned[path] > 0:
+                stats["in_use"] += 1
+                return
+            self._pinned.pop(path, None)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                return
+            if st.st_nlink > 1 or st.st_mtime != mtime:
+                return
+            self._remove(path, size, stats)
+
+    def _remove(self, path: str, size: int, stats: Dict[str, int]):
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            return
+        stats["removed"] += 1
+        stats["freed_bytes"] += size
+
+    @staticmethod
+    def _scan_files(directory: Path) -> List[os.DirEntry]:
+        try:
+            with os.scandir(directory) as it:
+                return [entry for entry in it if entry.is_file(follow_symlinks=False)]
+        except FileNotFoundError:
+            return []
+
+    @staticmethod
+    def _scan_dirs(directory: Path) -> List[os.DirEntry]:
+        try:
+            with os.scandir(directory) as it:
+                return [entry for entry in it if entry.is_dir(follow_symlinks=False)]
+        except FileNotFoundError:
+            return []
+
+
+class UploadWriter(BlobWriter):
+    """上传写入器：提交内容前先为任务建立引用，见 UploadStore._commit"""
+
+    def __init__(self, store: BlobStore, uploads: UploadStore, task_id: str):
+        super().__init__(store)
+        self.uploads = uploads
+        self.task_id = task_id
+        self.task_path: Optional[str] = None
+
+    def _commit(self) -> Path:
+        path, self.task_path = self.uploads._commit(self.store, self._tmp_path, self.digest, self.task_id)
+        return path
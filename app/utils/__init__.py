@@ -5,6 +5,9 @@ Utility Functions
 
 import logging
 
+from .rate_limiter import AsyncRateLimiter
+from .latency import LatencyTracker
+
 logger = logging.getLogger(__name__)
 
-__all__ = []
+__all__ = ["AsyncRateLimiter", "LatencyTracker"]
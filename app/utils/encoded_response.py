@@ -0,0 +1,96 @@
+"""
+预序列化JSON响应与压缩协商
+Pre-Encoded JSON Responses with Content Negotiation
+"""
+
+import gzip
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from fastapi import Response
+
+try:
+    import brotli
+except ImportError:  # 未安装时只提供gzip
+    brotli = None
+
+# 小于此大小的响应不压缩（压缩收益抵不过开销）
+MIN_COMPRESS_SIZE = 1024
+
+SUPPORTED_ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """按 Accept-Encoding 的q值选择压缩算法（同权重时br优先），都不接受时返回 None"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    wildcard = weights.get("*", 0.0)
+    best, best_weight = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        weight = weights.get(encoding, wildcard)
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class EncodedJSON:
+    """序列化一次的JSON正文，各压缩版本在首次请求时生成并保留"""
+
+    __slots__ = ("body", "_variants")
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._variants: Dict[str, bytes] = {}
+
+    def encode(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        variant = self._variants.get(encoding)
+        if variant is None:
+            if encoding == "br":
+                variant = brotli.compress(self.body, quality=9)
+            else:
+                variant = gzip.compress(self.body, compresslevel=9, mtime=0)
+            self._variants[encoding] = variant
+        return variant
+
+    def response(self, accept_encoding: Optional[str], headers: Optional[Dict[str, str]] = None) -> Response:
+        """按客户端支持的编码返回响应，不再经过模型校验与JSON编码"""
+        encoding = negotiate_encoding(accept_encoding) if len(self.body) >= MIN_COMPRESS_SIZE else None
+        response_headers = {"Vary": "Accept-Encoding", **(headers or {})}
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        return Response(content=self.encode(encoding), media_type="application/json", headers=response_headers)
+
+
+class EncodedResponseCache:
+    """按键缓存 EncodedJSON，超出容量时淘汰最久未访问的条目"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, EncodedJSON]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[EncodedJSON]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, body: bytes) -> EncodedJSON:
+        entry = self._entries[key] = EncodedJSON(body)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return entry
@@ -0,0 +1,28 @@
+"""
+滑动窗口延迟统计
+Sliding-Window Latency Tracker
+"""
+
+from collections import deque
+from typing import Optional
+
+
+class LatencyTracker:
+    """记录最近 window 次耗时（秒），用于计算分位数"""
+
+    def __init__(self, window: int = 200):
+        self._samples = deque(maxlen=window)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def count(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, p: float) -> Optional[float]:
+        """p 取值 0-1，样本为空时返回 None"""
+        if not self._samples:
+            return None
+        ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, max(0, int(round(p * (len(ordered) - 1)))))
+        return ordered[index]
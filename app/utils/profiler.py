@@ -0,0 +1,165 @@
+"""
+采样分析器与事件循环延迟监测
+Sampling Profiler and Event-Loop Lag Monitor
+"""
+
+import asyncio
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+from app.utils.latency import LatencyTracker
+
+# 线程池中的线程去掉序号后合并（ThreadPoolExecutor-0_3 -> ThreadPoolExecutor-0）
+_THREAD_INDEX = re.compile(r"_\d+$")
+
+
+class ProfilerBusy(RuntimeError):
+    """同一进程内已有采样在进行"""
+
+
+class SamplingProfiler:
+    """
+    定时读取各线程的调用栈（sys._current_frames），输出折叠栈格式：
+
+        线程;外层函数 (文件:行);...;内层函数 (文件:行) 次数
+
+    可直接交给 flamegraph.pl / speedscope 生成火焰图。事件循环所在线程记为 event-loop。
+    仅在采样期间运行独立线程，未采样时没有任何开销。
+    """
+
+    def __init__(self, max_depth: int = 64):
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self._lock.locked()
+
+    async def profile(self, duration: float, interval: float) -> Dict:
+        """
+        在后台线程采样 duration 秒，返回 {"collapsed", "samples", "seconds"}
+
+        Raises:
+            ProfilerBusy: 已有采样在进行
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("已有采样在进行")
+
+        loop = asyncio.get_running_loop()
+        done = loop.create_future()
+        loop_thread = threading.get_ident()
+
+        def resolve(result=None, error: Optional[BaseException] = None):
+            # 请求被取消（客户端断开、超时）后 done 已取消，结果直接丢弃
+            if done.cancelled():
+                return
+            if error is not None:
+                done.set_exception(error)
+            else:
+                done.set_result(result)
+
+        def run():
+            try:
+                result = self._sample(duration, interval, loop_thread)
+                loop.call_soon_threadsafe(resolve, result)
+            except BaseException as e:
+                loop.call_soon_threadsafe(resolve, None, e)
+            finally:
+                self._lock.release()
+
+        # 使用独立线程而非默认线程池，采样不占用分析任务的线程
+        threading.Thread(target=run, name="sampling-profiler", daemon=True).start()
+        return await done
+
+    def _sample(self, duration: float, interval: float, loop_thread: int) -> Dict:
+        stacks: Counter = Counter()
+        own_thread = threading.get_ident()
+        samples = 0
+        started = time.perf_counter()
+        deadline = started + duration
+
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own_thread:
+                    continue
+                thread = "event-loop" if ident == loop_thread else _THREAD_INDEX.sub("", names.get(ident, str(ident)))
+                stacks[self._collapse(thread, frame)] += 1
+            samples += 1
+            time.sleep(interval)
+
+        collapsed = "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        return {"collapsed": collapsed, "samples": samples, "seconds": round(time.perf_counter() - started, 3)}
+
+    def _collapse(self, thread: str, frame) -> str:
+        frames = []
+        while frame is not None and len(frames) < self.max_depth:
+            code = frame.f_code
+            # 按函数（定义行）聚合，同一函数内不同执行行合并为一个火焰图节点
+            frames.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+            frame = frame.f_back
+        frames.append(thread)
+        # 折叠栈中分号为分隔符
+        return ";".join(name.replace(";", ":") for name in reversed(frames))
+
+
+def _short_path(path: str) -> str:
+    """只保留 site-packages 或项目内的相对路径，缩短火焰图标签"""
+    for marker in ("site-packages/", "/app/", "/scripts/"):
+        index = path.rfind(marker)
+        if index >= 0:
+            return path[index + 1:] if marker.startswith("/") else path[index + len(marker):]
+    return path.rsplit("/", 1)[-1]
+
+
+class LoopLagMonitor:
+    """
+    事件循环延迟监测：每隔 interval 秒唤醒一次，
+    实际唤醒时间比预期晚多少即为事件循环被阻塞的时长。
+    """
+
+    def __init__(self, interval: float = 0.5, window: int = 600):
+        self.interval = interval
+        self._lag = LatencyTracker(window)
+        self._max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self._lag.record(lag)
+            self._max_lag = max(self._max_lag, lag)
+
+    def stats(self) -> Dict:
+        """最近窗口内延迟分位数与启动以来的最大值（毫秒）"""
+
+        def ms(value: Optional[float]) -> Optional[float]:
+            return round(value * 1000, 2) if value is not None else None
+
+        return {
+            "interval_seconds": self.interval,
+            "samples": self._lag.count(),
+            "p50_ms": ms(self._lag.percentile(0.5)),
+            "p99_ms": ms(self._lag.percentile(0.99)),
+            "max_ms": ms(self._max_lag),
+        }
@@ -0,0 +1,46 @@
+"""
+异步令牌桶限流器
+Async Token-Bucket Rate Limiter
+"""
+
+import asyncio
+import time
+from typing import Optional
+
+
+class AsyncRateLimiter:
+    """令牌桶限流器
+
+    rate 为每秒补充的令牌数，burst 为桶容量。rate <= 0 表示不限流。
+    等待者按到达顺序获取令牌。
+    """
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(1, int(rate))
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    @classmethod
+    def per_minute(cls, count: float, burst: Optional[int] = None) -> "AsyncRateLimiter":
+        """按每分钟次数构造"""
+        return cls(count / 60.0, burst=burst if burst is not None else 1)
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0):
+        """获取令牌，不足时等待"""
+        if self.rate <= 0:
+            return
+
+        async with self._lock:
+            while True:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
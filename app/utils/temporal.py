@@ -0,0 +1,55 @@
+"""
+论文时间特征提取
+Temporal Feature Extraction
+"""
+
+import re
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Union
+
+YEAR_PATTERN = re.compile(r"\b(?:19|20)\d{2}\b")
+
+
+@dataclass
+class TemporalFeatures:
+    """全文中的年份提及：次数、出现位置（字符偏移）及首个年份"""
+    counts: Counter = field(default_factory=Counter)
+    positions: Dict[int, List[int]] = field(default_factory=dict)
+    first_year: Optional[int] = None
+
+    def years(self, min_year: Optional[int] = None, max_year: Optional[int] = None) -> List[int]:
+        """去重后升序排列的年份"""
+        return sorted(
+            year for year in self.counts
+            if (min_year is None or year >= min_year) and (max_year is None or year <= max_year)
+        )
+
+
+def extract_temporal_features(text: Union[str, Iterable[str]],
+                              min_year: int = 1900,
+                              max_year: Optional[int] = None) -> TemporalFeatures:
+    """
+    单次扫描全文，统计合理范围内的年份提及
+
+    Args:
+        text: 论文全文，或按顺序产出正文分块的可迭代对象（分块不拆开单词）
+        min_year: 年份下限
+        max_year: 年份上限，默认当前年份+1（预印本可能标注次年的会议）
+    """
+    if max_year is None:
+        max_year = datetime.now().year + 1
+
+    features = TemporalFeatures()
+    offset = 0
+    for chunk in ((text,) if isinstance(text, str) else text):
+        for match in YEAR_PATTERN.finditer(chunk):
+            year = int(match.group())
+            if min_year <= year <= max_year:
+                features.counts[year] += 1
+                features.positions.setdefault(year, []).append(offset + match.start())
+                if features.first_year is None:
+                    features.first_year = year
+        offset += len(chunk)
+    return features
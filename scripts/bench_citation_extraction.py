@@ -0,0 +1,121 @@
+"""
+引文作者提取基准测试 - 引用密集的综述类文本
+Citation Name Extraction Benchmark
+"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+# 确保app模块可以被导入
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.agents.scholar_analyzer import count_citation_mentions
+
+_FIRST_NAMES = ["Alan", "Grace", "Geoffrey", "Yoshua", "Fei", "Andrew", "Daphne", "Judea",
+                "Michael", "Richard", "Barbara", "Leslie", "Donald", "Edsger", "Frances", "John"]
+_SURNAMES = ["Turing", "Hopper", "Hinton", "Bengio", "Li", "Ng", "Koller", "Pearl", "Jordan",
+             "Sutton", "Liskov", "Lamport", "Knuth", "Dijkstra", "Allen", "McCarthy", "Rivest",
+             "Shamir", "Adleman", "Hoare", "Milner", "Backus", "Kay", "Cerf", "Kahn", "Hellman"]
+_FILLER = ("Prior methods address this setting with different assumptions about the data "
+           "distribution and the available supervision. ")
+
+
+def legacy_extract(text: str) -> List[str]:
+    """改造前的实现：两次未预编译的扫描 + 列表去重"""
+    names = []
+    patterns = [
+        r'([A-Z][a-z]+\s+[A-Z][a-z]+)\s+et\s+al',
+        r'([A-Z][a-z]+\s+[A-Z][a-z]+),\s+\d{4}',
+    ]
+    for pattern in patterns:
+        for match in re.finditer(pattern, text):
+            name = match.group(1).strip()
+            if name not in names and len(name) > 5:
+                names.append(name)
+    return names[:10]
+
+
+def current_extract(text: str) -> List[str]:
+    """当前实现：单次扫描 + Counter 计数，按提及次数排序"""
+    return [name for name, _ in count_citation_mentions(text).most_common(10)]
+
+
+def _letters(index: int) -> str:
+    suffix = ""
+    while index:
+        index, rem = divmod(index, 26)
+        suffix += chr(ord("a") + rem)
+    return suffix
+
+
+def make_survey(citations: int, authors: int, seed: int = 0) -> str:
+    """生成引用密集的综述文本，作者被引次数服从长尾分布"""
+    rng = random.Random(seed)
+    # 姓氏后缀用小写字母编号，保证作者名互不相同且仍符合 "Name Surname" 形式
+    pool = [f"{_FIRST_NAMES[i % len(_FIRST_NAMES)]} {_SURNAMES[i % len(_SURNAMES)]}"
+            f"{_letters(i // len(_SURNAMES))}" for i in range(authors)]
+    weights = [1.0 / (rank + 1) for rank in range(authors)]
+
+    parts = []
+    for name in rng.choices(pool, weights=weights, k=citations):
+        if rng.random() < 0.5:
+            parts.append(f"{name} et al. proposed a related approach. ")
+        else:
+            parts.append(f"This was studied before ({name}, {rng.randint(1990, 2024)}). ")
+        parts.append(_FILLER)
+    return "".join(parts)
+
+
+def bench(fn: Callable[[str], List[str]], text: str, repeat: int) -> Dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(text)
+        timings.append(time.perf_counter() - started)
+    timings.sort()
+    return {"best_ms": timings[0] * 1000, "median_ms": timings[len(timings) // 2] * 1000}
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="学术助手系统 - 引文作者提取基准测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python scripts/bench_citation_extraction.py
+  python scripts/bench_citation_extraction.py --citations 20000 --authors 2000 --repeat 5
+        """
+    )
+    parser.add_argument("--citations", type=int, default=5000, help="引用提及次数（默认: 5000）")
+    parser.add_argument("--authors", type=int, default=1000, help="不同作者数（默认: 1000）")
+    parser.add_argument("--repeat", type=int, default=10, help="重复次数（默认: 10）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    args = parser.parse_args()
+
+    text = make_survey(args.citations, args.authors, args.seed)
+    mentions = count_citation_mentions(text)
+
+    report = {
+        "text_chars": len(text),
+        "citations": args.citations,
+        "distinct_names": len(mentions),
+        "legacy": bench(legacy_extract, text, args.repeat),
+        "current": bench(current_extract, text, args.repeat),
+        "legacy_top": legacy_extract(text)[:5],
+        "current_top": [f"{name} ({count})" for name, count in mentions.most_common(5)],
+    }
+    report["speedup"] = round(report["legacy"]["median_ms"] / report["current"]["median_ms"], 2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+启动导入耗时基准测试 - 基于 python -X importtime
+Import Time Benchmark
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# 确保app模块可以被导入
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# 启动时不应加载的重量级依赖（应在首次使用时导入）
+DEFERRED_MODULES = ("langchain", "langchain_openai", "openai", "fitz", "pymupdf", "httpx")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """
+    解析 -X importtime 输出
+
+    Returns:
+        [(模块名, 自身耗时us, 累计耗时us)]
+    """
+    records = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        records.append((name.strip(), int(self_us), int(cumulative_us)))
+    return records
+
+
+def measure(module: str) -> List[Tuple[str, int, int]]:
+    """在全新解释器中导入模块一次"""
+    env = dict(os.environ, PYTHONPATH=str(project_root))
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=project_root, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"导入 {module} 失败:\n{proc.stderr[-2000:]}")
+    return parse_importtime(proc.stderr)
+
+
+def summarize(runs: List[List[Tuple[str, int, int]]], module: str, top: int) -> Dict:
+    """取各模块累计耗时的中位数"""
+    cumulative: Dict[str, List[int]] = {}
+    self_time: Dict[str, List[int]] = {}
+    for records in runs:
+        for name, self_us, cumulative_us in records:
+            cumulative.setdefault(name, []).append(cumulative_us)
+            self_time.setdefault(name, []).append(self_us)
+
+    def median_ms(values: List[int]) -> float:
+        return round(statistics.median(values) / 1000, 2)
+
+    # 首次运行的模块集合即为导入的模块（后续运行相同）
+    loaded = {name for name, *_ in runs[0]}
+    app_modules = sorted(
+        (name for name in cumulative if name.startswith("app.")),
+        key=lambda name: -statistics.median(cumulative[name]),
+    )
+    return {
+        "module": module,
+        "runs": len(runs),
+        "total_ms": median_ms(cumulative[module]),
+        "modules_loaded": len(loaded),
+        "deferred_violations": sorted(loaded & set(DEFERRED_MODULES)),
+        "top_cumulative": [
+            {"module": name, "ms": median_ms(cumulative[name])}
+            for name in sorted(cumulative, key=lambda n: -statistics.median(cumulative[n]))[1:top + 1]
+        ],
+        "top_self": [
+            {"module": name, "ms": median_ms(self_time[name])}
+            for name in sorted(self_time, key=lambda n: -statistics.median(self_time[n]))[:top]
+        ],
+        "app_modules": [{"module": name, "ms": median_ms(cumulative[name])} for name in app_modules[:top]],
+    }
+
+
+def compare(report: Dict, baseline_path: str, tolerance: float) -> Optional[str]:
+    """与基线报告比较，总耗时超出容差时返回错误信息"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    report["baseline_ms"] = baseline["total_ms"]
+    report["change"] = round(report["total_ms"] / baseline["total_ms"] - 1, 3)
+    if report["change"] > tolerance:
+        return f"导入耗时 {report['total_ms']}ms 比基线 {baseline['total_ms']}ms 增加 {report['change']:.0%}"
+    return None
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="学术助手系统 - 启动导入耗时基准测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python scripts/bench_import_time.py
+  python scripts/bench_import_time.py --repeat 10 --output import_time.json
+  python scripts/bench_import_time.py --baseline import_time.json --tolerance 0.2
+        """
+    )
+    parser.add_argument("--module", default="app.main", help="要导入的模块（默认: app.main）")
+    parser.add_argument("--repeat", type=int, default=5, help="重复次数，取中位数（默认: 5）")
+    parser.add_argument("--top", type=int, default=15, help="列出耗时最多的模块数（默认: 15）")
+    parser.add_argument("--output", help="报告写入的JSON文件，可作为后续版本的基线")
+    parser.add_argument("--baseline", help="基线报告，总耗时超出容差时返回非零")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="相对基线允许的增幅（默认: 0.2）")
+    args = parser.parse_args()
+
+    # 先导入一次以生成字节码缓存，避免首轮计入编译耗时
+    measure(args.module)
+    runs = [measure(args.module) for _ in range(args.repeat)]
+    report = summarize(runs, args.module, args.top)
+
+    failures = []
+    if report["deferred_violations"]:
+        failures.append(f"启动时加载了应延迟导入的依赖: {', '.join(report['deferred_violations'])}")
+    if args.baseline:
+        regression = compare(report, args.baseline, args.tolerance)
+        if regression:
+            failures.append(regression)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
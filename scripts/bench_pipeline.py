@@ -0,0 +1,262 @@
+"""
+端到端分析流水线基准测试 - 基于LLM录制/回放
+End-to-End Pipeline Benchmark with Record/Replay LLM
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 确保app模块可以被导入
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def make_corpus(directory: str, count: int, pages: int) -> List[str]:
+    """生成确定性的测试论文（相同参数生成的PDF字节相同，回放可命中录制结果）"""
+    import fitz
+
+    paths = []
+    for index in range(count):
+        doc = fitz.open()
+        for number in range(pages):
+            page = doc.new_page()
+            y = 72
+            if number == 0:
+                page.insert_text((72, y), f"Scalable Learning Method {index}", fontsize=16)
+                page.insert_text((72, y + 30), "Abstract", fontsize=12)
+                page.insert_textbox(fitz.Rect(72, y + 40, 540, y + 120),
+                                    f"We propose a neural network approach {index} for graph optimization "
+                                    f"and evaluate it on benchmark datasets from 2019 to 2023.", fontsize=10)
+                y += 140
+            page.insert_text((72, y), f"{number + 1} Method", fontsize=12)
+            page.insert_textbox(fitz.Rect(72, y + 10, 540, y + 250), (
+                f"Following Alan Turing et al. (Alan Turing, 1950) and Geoffrey Hinton et al. (2006), "
+                f"we minimise the loss of model {index}. However, the approach is limited by memory. "
+            ) * 6, fontsize=10)
+            page.insert_text((200, y + 280), f"L = - sum_i y_i log p_i + {index % 7} ||w||^2", fontsize=11)
+            page.insert_text((500, y + 280), f"({number + 1})", fontsize=11)
+        path = os.path.join(directory, f"paper-{index:04d}.pdf")
+        with open(path, "wb") as f:
+            f.write(doc.tobytes(no_new_id=True))
+        doc.close()
+        paths.append(path)
+    return paths
+
+
+def configure(args, data_dir: str):
+    """在导入app之前通过环境变量设置配置（settings为导入时创建的单例）"""
+    os.environ.update(
+        LLM_BACKEND=args.backend,
+        LLM_REPLAY_MISS=args.miss,
+        LLM_REPLAY_SEED=str(args.seed),
+        # 每次运行使用全新的数据目录，解析与图谱写入都计入耗时
+        GRAPH_DB_DIR=os.path.join(data_dir, "graph"),
+        PARSE_CACHE_DIR=os.path.join(data_dir, "parse_cache"),
+        DOCUMENT_STORE_DIR=os.path.join(data_dir, "documents"),
+        AUTHOR_CACHE_PATH=os.path.join(data_dir, "author_cache.sqlite3"),
+        ENABLE_SCHOLAR_ENRICHMENT="true" if args.enrich else "false",
+    )
+    if args.records:
+        os.environ["LLM_RECORD_DIR"] = args.records
+    if args.latency:
+        os.environ["LLM_REPLAY_LATENCY"] = args.latency
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB计，macOS 以字节计
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def current_rss_mb() -> Dict[str, Optional[float]]:
+    """当前常驻内存：rss 为总量，anon 为私有匿名内存（不含可回收的文件映射页）；仅Linux"""
+    usage: Dict[str, Optional[float]] = {"rss": None, "anon": None}
+    try:
+        with open("/proc/self/status", "r", encoding="utf-8") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                if name in ("VmRSS", "RssAnon"):
+                    usage["rss" if name == "VmRSS" else "anon"] = round(int(value.split()[0]) / 1024, 1)
+    except OSError:
+        pass
+    return usage
+
+
+def percentiles_ms(values: List[float]) -> Dict[str, Optional[float]]:
+    if not values:
+        return {"p50": None, "p99": None}
+    ordered = sorted(values)
+    return {
+        "p50": round(statistics.median(ordered) * 1000, 1),
+        "p99": round(ordered[min(len(ordered) - 1, int(0.99 * len(ordered)))] * 1000, 1),
+    }
+
+
+async def run(paths: List[str], concurrency: int, include: Optional[List[str]], rounds: int = 1) -> Dict:
+    """
+    并发分析语料中的全部论文，共 rounds 轮
+
+    第一轮解析并写入文档存储，之后各轮直接读取存储（内存映射），
+    各轮结束时的常驻内存应基本持平。
+    """
+    from app.agents.orchestrator import AcademicAnalysisOrchestrator
+    from app.models.schemas import PaperInput
+    from app.services.llm import record_store
+
+    orchestrator = AcademicAnalysisOrchestrator()
+    warm_up_errors = orchestrator.warm_up()
+    if warm_up_errors:
+        raise RuntimeError(f"Agent构造失败: {warm_up_errors}")
+
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    parse_times: List[float] = []
+    failures: List[str] = []
+
+    async def analyze(path: str):
+        async with semaphore:
+            started = time.perf_counter()
+
+            async def on_progress(stage: str, data: dict):
+                if stage == "parsed":
+                    parse_times.append(time.perf_counter() - started)
+
+            try:
+                await orchestrator.analyze_paper(PaperInput(file_path=path), progress_callback=on_progress,
+                                                 include=include)
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                failures.append(f"{os.path.basename(path)}: {e}")
+
+    started = time.perf_counter()
+    memory = []
+    for round_index in range(rounds):
+        peak = {"anon": 0.0}
+
+        async def sample_memory():
+            # 轮内的匿名内存峰值：同时在途的论文各自持有的正文副本都计入
+            while True:
+                peak["anon"] = max(peak["anon"], current_rss_mb()["anon"] or 0.0)
+                await asyncio.sleep(0.05)
+
+        sampler = asyncio.create_task(sample_memory())
+        await asyncio.gather(*(analyze(path) for path in paths))
+        sampler.cancel()
+        memory.append({"round": round_index + 1, **current_rss_mb(), "peak_anon": peak["anon"]})
+    wall = time.perf_counter() - started
+    await orchestrator.close()
+
+    return {
+        "papers": len(paths) * rounds,
+        "completed": len(latencies),
+        "failed": len(failures),
+        "wall_seconds": round(wall, 3),
+        "papers_per_second": round(len(latencies) / wall, 2),
+        "paper_latency_ms": percentiles_ms(latencies),
+        "parse_latency_ms": percentiles_ms(parse_times),
+        "stages_ms": {
+            name: {
+                "count": stats["count"],
+                "p50": round(stats["p50"] * 1000, 1) if stats["p50"] is not None else None,
+                "p99": round(stats["p99"] * 1000, 1) if stats["p99"] is not None else None,
+            }
+            for name, stats in orchestrator.stage_latency().items()
+        },
+        "llm": dict(record_store().stats),
+        "peak_rss_mb": peak_rss_mb(),
+        "rss_by_round_mb": memory,
+        "sample_errors": failures[:3],
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="学术助手系统 - 端到端分析流水线基准测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  # 录制：调用真实LLM（需要 OPENAI_API_KEY），结果写入录制目录
+  python scripts/bench_pipeline.py --backend record --records bench/llm_records
+
+  # 回放：不访问网络，按录制时的耗时注入延迟
+  python scripts/bench_pipeline.py --records bench/llm_records
+
+  # 无录制结果时用空响应与长尾延迟模拟LLM
+  python scripts/bench_pipeline.py --miss stub --latency lognormal:0.8,0.5 --papers 50 --concurrency 8
+
+  # 重复分析同一批大论文：第2轮起读取文档存储，观察各轮常驻内存
+  python scripts/bench_pipeline.py --papers 8 --pages 300 --rounds 5 --latency none
+        """
+    )
+    parser.add_argument("--corpus", help="PDF目录（默认生成确定性的测试语料）")
+    parser.add_argument("--papers", type=int, default=20, help="生成的论文数（默认: 20）")
+    parser.add_argument("--pages", type=int, default=6, help="生成论文的页数（默认: 6）")
+    parser.add_argument("--concurrency", type=int, default=4, help="同时分析的论文数（默认: 4）")
+    parser.add_argument("--include", help="逗号分隔的分析字段（默认: 全部）")
+    parser.add_argument("--rounds", type=int, default=1, help="重复分析语料的轮数，第2轮起命中文档存储（默认: 1）")
+    parser.add_argument("--backend", choices=("replay", "record", "openai"), default="replay",
+                        help="LLM后端（默认: replay）")
+    parser.add_argument("--records", help="录制目录（默认: 配置中的 LLM_RECORD_DIR）")
+    parser.add_argument("--latency", help="回放延迟分布，如 none / recorded / fixed:0.5 / uniform:0.2,1.5 / lognormal:0.8,0.5")
+    parser.add_argument("--miss", choices=("error", "stub"), default="stub", help="回放未命中时的处理（默认: stub）")
+    parser.add_argument("--seed", type=int, default=0, help="延迟分布的随机种子（默认: 0）")
+    parser.add_argument("--enrich", action="store_true", help="启用学者信息补全（访问Semantic Scholar）")
+    parser.add_argument("--output", help="报告写入的JSON文件")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="bench-pipeline-")
+    try:
+        configure(args, data_dir)
+        if args.corpus:
+            paths = sorted(str(p) for p in Path(args.corpus).glob("*.pdf"))
+        else:
+            corpus_dir = os.path.join(data_dir, "corpus")
+            os.makedirs(corpus_dir)
+            paths = make_corpus(corpus_dir, args.papers, args.pages)
+        if not paths:
+            print("❌ 语料为空", file=sys.stderr)
+            sys.exit(1)
+
+        include = [field.strip() for field in args.include.split(",")] if args.include else None
+        report = asyncio.run(run(paths, args.concurrency, include, args.rounds))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    from app.config import settings
+    report["config"] = {
+        "backend": args.backend,
+        "latency": settings.LLM_REPLAY_LATENCY,
+        "miss": args.miss,
+        "seed": args.seed,
+        "concurrency": args.concurrency,
+        "rounds": args.rounds,
+        "corpus": args.corpus or f"synthetic:{args.papers}x{args.pages}",
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    sys.exit(1 if report["failed"] else 0)
+
+
+if __name__ == "__main__":
+    main()
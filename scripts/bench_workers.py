@@ -0,0 +1,260 @@
+"""
+多worker吞吐基准测试 - 比较不同worker数下的分析吞吐与延迟
+Multi-Worker Throughput Benchmark
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 确保app模块可以被导入
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+# 只请求不调用LLM的字段，测得的是解析、调度与服务本身的开销
+DEFAULT_INCLUDE = "reproducibility_score"
+
+# 每轮测试前清理的共享状态（见 TaskStore / RAGService）
+SHARED_KEYS = ("task-metrics", "rag:papers")
+
+
+def make_paper(index: int, pages: int) -> bytes:
+    """生成内容互不相同的测试PDF，避免命中文档存储"""
+    import fitz
+
+    doc = fitz.open()
+    for number in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 72), f"Benchmark Paper {index} - Page {number + 1}", fontsize=14)
+        body = (
+            f"Section {number + 1}. We study workload {index} with the method proposed by "
+            f"Alan Turing et al. (Alan Turing, 1950) and compare against baselines from 2021. "
+        )
+        page.insert_textbox(fitz.Rect(72, 100, 540, 760), body * 12, fontsize=10)
+    data = doc.tobytes(no_new_id=True)
+    doc.close()
+    return data
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def check_redis(host: str, port: int, db: int) -> Optional[str]:
+    """多worker需要Redis共享任务状态；可用时清理上一轮的共享键"""
+    import redis
+
+    try:
+        client = redis.Redis(host=host, port=port, db=db)
+        client.ping()
+        client.delete(*SHARED_KEYS)
+        client.close()
+    except Exception as e:
+        return str(e)
+    return None
+
+
+def start_server(workers: int, port: int, server: str, data_dir: str, redis_db: int,
+                 verbose: bool = False) -> subprocess.Popen:
+    """启动服务子进程，数据目录指向临时目录"""
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(project_root),
+        HOST="127.0.0.1",
+        PORT=str(port),
+        WORKERS=str(workers),
+        REDIS_DB=str(redis_db),
+        LOG_LEVEL="WARNING",
+        UPLOAD_DIR=os.path.join(data_dir, "uploads"),
+        GRAPH_DB_DIR=os.path.join(data_dir, "graph"),
+        PARSE_CACHE_DIR=os.path.join(data_dir, "parse_cache"),
+        DOCUMENT_STORE_DIR=os.path.join(data_dir, "documents"),
+        PDF_CACHE_DIR=os.path.join(data_dir, "pdf_cache"),
+        AUTHOR_CACHE_PATH=os.path.join(data_dir, "author_cache.sqlite3"),
+        ENABLE_SCHOLAR_ENRICHMENT="false",
+    )
+    if server == "gunicorn":
+        command = [sys.executable, "-m", "gunicorn", "-c", "docker/gunicorn.conf.py", "app.main:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                   "--port", str(port), "--workers", str(workers), "--log-level", "warning"]
+    output = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen(command, cwd=project_root, env=env, stdout=output, stderr=output,
+                            start_new_session=True)
+
+
+def stop_server(proc: subprocess.Popen):
+    if proc.poll() is None:
+        os.killpg(proc.pid, signal.SIGTERM)
+        try:
+            proc.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            os.killpg(proc.pid, signal.SIGKILL)
+            proc.wait()
+
+
+async def wait_ready(client, proc: subprocess.Popen, timeout: float):
+    """等待所有worker预热完成（/ready 连续多次返回200）"""
+    deadline = time.monotonic() + timeout
+    consecutive = 0
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"服务进程退出，返回码 {proc.returncode}")
+        try:
+            response = await client.get("/ready")
+            consecutive = consecutive + 1 if response.status_code == 200 else 0
+            if consecutive >= 10:
+                return
+        except Exception:
+            consecutive = 0
+        await asyncio.sleep(0.2)
+    raise TimeoutError("服务未在规定时间内就绪")
+
+
+async def run_load(client, papers: List[bytes], concurrency: int, include: str, poll_interval: float) -> Dict:
+    """并发提交并轮询至完成，返回每篇论文的端到端延迟"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    failures: List[str] = []
+
+    async def analyze(index: int, pdf: bytes):
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.post(
+                    "/api/v1/analyze", params={"include": include},
+                    files={"file": (f"bench-{index}.pdf", pdf, "application/pdf")},
+                )
+                response.raise_for_status()
+                task_id = response.json()["task_id"]
+                while True:
+                    await asyncio.sleep(poll_interval)
+                    status = (await client.get(f"/api/v1/status/{task_id}")).json()
+                    if status["status"] in ("completed", "failed"):
+                        break
+                if status["status"] == "failed":
+                    failures.append(status.get("error") or "failed")
+                    return
+                latencies.append(time.perf_counter() - started)
+            except Exception as e:
+                failures.append(str(e))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(analyze(i, pdf) for i, pdf in enumerate(papers)))
+    return {"wall_seconds": time.perf_counter() - started, "latencies": latencies, "failures": failures}
+
+
+def percentile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+async def bench(workers: int, args, offset: int) -> Dict:
+    """启动 workers 个worker的服务并施加负载"""
+    import httpx
+
+    port = free_port()
+    data_dir = tempfile.mkdtemp(prefix="bench-workers-")
+    papers = [make_paper(offset + i, args.pages) for i in range(args.requests)]
+    proc = start_server(workers, port, args.server, data_dir, args.redis_db, args.verbose)
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+            await wait_ready(client, proc, args.startup_timeout)
+            # 预热连接与各worker的首个请求
+            await run_load(client, [make_paper(-1 - offset - i, 1) for i in range(workers)],
+                           workers, args.include, args.poll_interval)
+            result = await run_load(client, papers, args.concurrency, args.include, args.poll_interval)
+    finally:
+        stop_server(proc)
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    latencies = result["latencies"]
+    report = {
+        "workers": workers,
+        "requests": args.requests,
+        "concurrency": args.concurrency,
+        "completed": len(latencies),
+        "failed": len(result["failures"]),
+        "wall_seconds": round(result["wall_seconds"], 3),
+        "throughput_per_second": round(len(latencies) / result["wall_seconds"], 2),
+    }
+    if latencies:
+        report.update(
+            latency_p50_ms=round(statistics.median(latencies) * 1000, 1),
+            latency_p95_ms=round(percentile(latencies, 0.95) * 1000, 1),
+            latency_p99_ms=round(percentile(latencies, 0.99) * 1000, 1),
+        )
+    if result["failures"]:
+        report["sample_errors"] = result["failures"][:3]
+    return report
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="学术助手系统 - 多worker吞吐基准测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python scripts/bench_workers.py --workers 1,4
+  python scripts/bench_workers.py --workers 1,2,4 --requests 200 --concurrency 32 --pages 8
+  python scripts/bench_workers.py --workers 1,4 --server uvicorn --output workers.json
+
+多worker测试需要本地Redis（任务状态经Redis共享），默认使用第15号库。
+        """
+    )
+    parser.add_argument("--workers", default="1,4", help="逗号分隔的worker数（默认: 1,4）")
+    parser.add_argument("--requests", type=int, default=100, help="每轮提交的论文数（默认: 100）")
+    parser.add_argument("--concurrency", type=int, default=16, help="客户端并发数（默认: 16）")
+    parser.add_argument("--pages", type=int, default=4, help="每篇测试论文的页数（默认: 4）")
+    parser.add_argument("--include", default=DEFAULT_INCLUDE, help=f"请求的分析字段（默认: {DEFAULT_INCLUDE}）")
+    parser.add_argument("--server", choices=("gunicorn", "uvicorn"), default="gunicorn",
+                        help="gunicorn使用 docker/gunicorn.conf.py 预加载后fork；uvicorn为对照（默认: gunicorn）")
+    parser.add_argument("--redis-db", type=int, default=15, help="测试使用的Redis库（默认: 15）")
+    parser.add_argument("--poll-interval", type=float, default=0.05, help="状态轮询间隔秒数（默认: 0.05）")
+    parser.add_argument("--startup-timeout", type=float, default=120, help="等待服务就绪的秒数（默认: 120）")
+    parser.add_argument("--output", help="报告写入的JSON文件")
+    parser.add_argument("--verbose", action="store_true", help="显示服务日志")
+    args = parser.parse_args()
+
+    from app.config import settings
+
+    worker_counts = [int(n) for n in args.workers.split(",")]
+    reports = []
+    for round_index, workers in enumerate(worker_counts):
+        error = check_redis(settings.REDIS_HOST, settings.REDIS_PORT, args.redis_db)
+        if error and workers > 1:
+            print(f"❌ 多worker测试需要Redis: {error}", file=sys.stderr)
+            sys.exit(1)
+        report = asyncio.run(bench(workers, args, offset=round_index * args.requests))
+        reports.append(report)
+        print(json.dumps(report, ensure_ascii=False))
+
+    baseline = reports[0]["throughput_per_second"]
+    for report in reports:
+        report["speedup"] = round(report["throughput_per_second"] / baseline, 2) if baseline else None
+    summary = {"server": args.server, "pages": args.pages, "cpus": os.cpu_count(), "runs": reports}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+    sys.exit(1 if any(report["failed"] for report in reports) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,350 @@
+"""
+批量导入脚本 - 流式解析大规模论文库并写入知识库与缓存
+Streaming Bulk Corpus Ingestion
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+# 确保app模块可以被导入
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from app.config import settings
+from app.models.schemas import ANALYSIS_FIELDS
+from app.services.cache_service import CacheService, analysis_cache_key, split_analysis
+from app.utils.rate_limiter import AsyncRateLimiter
+
+logger = logging.getLogger("bulk_ingest")
+
+# 每个解析进程内复用的解析Agent
+_worker_parser = None
+
+
+def _parse_job(pdf_path: str) -> Tuple[Dict[str, Any], str, float]:
+    """进程池任务：计算内容哈希并解析PDF"""
+    global _worker_parser
+    if _worker_parser is None:
+        from app.agents.paper_parser import PaperParserAgent
+        _worker_parser = PaperParserAgent()
+
+    start = time.perf_counter()
+    digest = hashlib.sha256()
+    with open(pdf_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    parsed = _worker_parser.parse_pdf(pdf_path)
+    return parsed, digest.hexdigest(), time.perf_counter() - start
+
+
+class StageStats:
+    """分阶段耗时统计"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.durations: Dict[str, List[float]] = {}
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def record(self, stage: str, seconds: float):
+        self.durations.setdefault(stage, []).append(seconds)
+
+    def papers_per_minute(self) -> float:
+        elapsed = max(time.monotonic() - self.started, 1e-9)
+        return self.completed * 60.0 / elapsed
+
+    def summary(self) -> Dict[str, Any]:
+        stages = {}
+        for stage, values in self.durations.items():
+            ordered = sorted(values)
+            stages[stage] = {
+                "count": len(ordered),
+                "mean": round(sum(ordered) / len(ordered), 4),
+                "p50": round(ordered[len(ordered) // 2], 4),
+                "p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 4),
+            }
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_seconds": round(time.monotonic() - self.started, 2),
+            "papers_per_minute": round(self.papers_per_minute(), 2),
+            "stages": stages,
+        }
+
+
+class BulkIngestor:
+    """批量导入管理器"""
+
+    def __init__(self,
+                 source: str,
+                 checkpoint: str,
+                 workers: int,
+                 concurrency: int,
+                 rate_per_minute: float,
+                 batch_size: int,
+                 report_interval: float = 30.0,
+                 retry_failed: bool = False):
+        self.source = Path(source)
+        self.checkpoint = Path(checkpoint)
+        self.workers = workers or os.cpu_count() or 1
+        self.batch_size = max(1, batch_size)
+        self.report_interval = report_interval
+        self.retry_failed = retry_failed
+
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.rate_limiter = AsyncRateLimiter.per_minute(rate_per_minute) if rate_per_minute > 0 \
+            else AsyncRateLimiter(0)
+        self.stats = StageStats()
+
+        self._buffer: List[Tuple[str, str, Dict[str, Any]]] = []
+        self._flush_lock = asyncio.Lock()
+        self._checkpoint_file = None
+
+        # 延迟导入，避免解析进程加载LLM依赖
+        from app.agents.orchestrator import AcademicAnalysisOrchestrator
+        from app.services.rag_service import RAGService
+        self.orchestrator = AcademicAnalysisOrchestrator()
+        self.cache_service = CacheService()
+        self.rag_service = RAGService()
+
+    def _load_checkpoint(self) -> Set[str]:
+        """读取已处理的路径"""
+        done: Set[str] = set()
+        if not self.checkpoint.exists():
+            return done
+        with open(self.checkpoint, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # 中断时可能写了半行
+                if entry.get("status") == "done" or not self.retry_failed:
+                    done.add(entry["path"])
+        return done
+
+    def _write_checkpoint(self, entries: List[Dict[str, Any]]):
+        for entry in entries:
+            self._checkpoint_file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._checkpoint_file.flush()
+        os.fsync(self._checkpoint_file.fileno())
+
+    def _iter_inputs(self) -> Iterator[str]:
+        """流式遍历目录或清单文件，不预先加载全部路径"""
+        if self.source.is_dir():
+            stack = [self.source]
+            while stack:
+                directory = stack.pop()
+                with os.scandir(directory) as entries:
+                    for entry in sorted(entries, key=lambda e: e.name):
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(Path(entry.path))
+                        elif entry.name.lower().endswith(".pdf"):
+                            yield str(Path(entry.path).resolve())
+        else:
+            with open(self.source, "r", encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith("#"):
+                        path = Path(line)
+                        if not path.is_absolute():
+                            path = self.source.parent / path
+                        yield str(path.resolve())
+
+    async def run(self) -> Dict[str, Any]:
+        """执行导入，返回统计信息"""
+        done = self._load_checkpoint()
+        self.checkpoint.parent.mkdir(parents=True, exist_ok=True)
+        self._checkpoint_file = open(self.checkpoint, "a", encoding="utf-8")
+
+        await self.cache_service.connect()
+        await self.rag_service.initialize()
+        self._attach_shared_index()
+        reporter = asyncio.create_task(self._report_loop())
+
+        loop = asyncio.get_running_loop()
+        max_in_flight = self.workers * 2 + self.batch_size
+        pending: Set[asyncio.Task] = set()
+
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                for path in self._iter_inputs():
+                    if path in done:
+                        self.stats.skipped += 1
+                        continue
+                    if len(pending) >= max_in_flight:
+                        _, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    pending.add(asyncio.create_task(self._process(loop, pool, path)))
+
+                if pending:
+                    await asyncio.gather(*pending)
+            await self._flush()
+        finally:
+            reporter.cancel()
+            self._checkpoint_file.close()
+            await self.cache_service.disconnect()
+
+        return self.stats.summary()
+
+    def _attach_shared_index(self):
+        """知识库写入服务读取的共享日志 rag:papers，导入的论文对所有worker可检索"""
+        if not settings.ENABLE_RAG:
+            return
+        if self.cache_service.redis_client is None:
+            logger.warning("Redis不可用，导入的论文不会进入服务的知识库")
+            return
+        self.rag_service.attach(self.cache_service.redis_client)
+        if not settings.SHARED_STATE:
+            logger.warning("服务未启用 SHARED_STATE，不会读取 rag:papers 中导入的论文")
+
+    async def _process(self, loop, pool, path: str):
+        """单篇论文：解析 -> 分析 -> 缓冲写入"""
+        try:
+            parsed, content_hash, parse_seconds = await loop.run_in_executor(pool, _parse_job, path)
+            self.stats.record("parse", parse_seconds)
+            if not parsed.get("success"):
+                raise RuntimeError(parsed.get("error"))
+
+            async with self.semaphore:
+                await self.rate_limiter.acquire()
+                start = time.perf_counter()
+                result = await self.orchestrator.analyze_parsed(parsed, content_hash=content_hash)
+                self.stats.record("analyze", time.perf_counter() - start)
+
+            self._buffer.append((path, content_hash, result.dict()))
+            if len(self._buffer) >= self.batch_size:
+                await self._flush()
+
+        except Exception as e:
+            logger.warning(f"导入失败 {path}: {e}")
+            self.stats.failed += 1
+            self._write_checkpoint([{"path": path, "status": "failed", "error": str(e)}])
+
+    async def _flush(self):
+        """批量写入知识库与缓存，成功后再记录检查点"""
+        async with self._flush_lock:
+            if not self._buffer:
+                return
+            batch, self._buffer = self._buffer, []
+
+            start = time.perf_counter()
+            papers = [analysis for _, _, analysis in batch]
+            if settings.ENABLE_RAG and self.cache_service.redis_client is not None:
+                if not await self.rag_service.publish_papers(papers):
+                    logger.warning(f"共享知识库写入失败: {len(papers)} 篇")
+            if settings.ENABLE_REDIS_CACHE:
+                # 与上传接口相同的缓存键，服务收到同一PDF时直接命中
+                await self.cache_service.set_hash_many({
+                    analysis_cache_key(content_hash=content_hash): split_analysis(analysis, ANALYSIS_FIELDS)
+                    for _, content_hash, analysis in batch
+                })
+            self.stats.record("write", time.perf_counter() - start)
+
+            self._write_checkpoint([
+                {"path": path, "status": "done", "sha256": content_hash}
+                for path, content_hash, _ in batch
+            ])
+            self.stats.completed += len(batch)
+
+    async def _report_loop(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            logger.info(
+                f"进度: 完成 {self.stats.completed}, 失败 {self.stats.failed}, "
+                f"跳过 {self.stats.skipped}, {self.stats.papers_per_minute():.1f} 篇/分钟"
+            )
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="学术助手系统 - 批量论文导入",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  # 导入目录下所有PDF（递归）
+  python scripts/bulk_ingest.py ./corpus --checkpoint ./data/ingest.ckpt
+
+  # 从清单文件导入（每行一个路径），中断后以相同参数重新运行即可续传
+  python scripts/bulk_ingest.py manifest.txt --workers 8 --rate 120
+        """
+    )
+
+    parser.add_argument("source", help="PDF目录或清单文件")
+    parser.add_argument(
+        "--checkpoint",
+        default="./data/ingest_checkpoint.jsonl",
+        help="检查点文件（默认: ./data/ingest_checkpoint.jsonl）"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=settings.INGEST_WORKERS,
+        help="解析进程数（默认: CPU核数）"
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.INGEST_AGENT_CONCURRENCY,
+        help="同时分析的论文数上限"
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=settings.INGEST_RATE_PER_MINUTE,
+        help="分析速率上限（篇/分钟，0表示不限）"
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=settings.INGEST_BATCH_SIZE,
+        help="知识库与缓存写入批大小"
+    )
+    parser.add_argument(
+        "--report-interval",
+        type=float,
+        default=30.0,
+        help="进度日志间隔（秒）"
+    )
+    parser.add_argument(
+        "--retry-failed",
+        action="store_true",
+        help="重新处理检查点中标记为失败的论文"
+    )
+
+    args = parser.parse_args()
+
+    logging.basicConfig(level=settings.LOG_LEVEL, format=settings.LOG_FORMAT)
+
+    async def _run():
+        ingestor = BulkIngestor(
+            source=args.source,
+            checkpoint=args.checkpoint,
+            workers=args.workers,
+            concurrency=args.concurrency,
+            rate_per_minute=args.rate,
+            batch_size=args.batch_size,
+            report_interval=args.report_interval,
+            retry_failed=args.retry_failed
+        )
+        return await ingestor.run()
+
+    summary = asyncio.run(_run())
+    print(json.dumps(summary, ensure_ascii=False, indent=2))
+
+    sys.exit(0 if summary["failed"] == 0 else 1)
+
+
+if __name__ == "__main__":
+    main()
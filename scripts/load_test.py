@@ -0,0 +1,378 @@
+"""
+HTTP负载测试 - 离线压测分析、状态查询与检索接口
+HTTP Load Test for the API Endpoints
+
+服务以子进程启动，外部依赖全部在本地模拟：
+- LLM: 回放后端，未命中时返回空响应并按分布注入延迟（见 app.services.llm）
+- Redis: fakeredis 的TCP服务（未安装时不使用Redis）
+- arXiv / DOI / Semantic Scholar: scripts/stub_paper_server.py
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+# 确保app模块可以被导入
+project_root = Path(__file__).parent.parent
+if str(project_root) not in sys.path:
+    sys.path.insert(0, str(project_root))
+
+from scripts.bench_workers import free_port, make_paper, stop_server
+from scripts.stub_paper_server import start_stub_server
+
+# 直方图桶上界（毫秒），最后一桶为溢出
+HISTOGRAM_BOUNDS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, 30000)
+
+DEFAULT_MIX = "upload=2,arxiv=2,doi=1,search=5"
+
+SEARCH_TERMS = ("neural network", "graph optimization", "transformer", "stub papers", "benchmark",
+                "reinforcement learning", "diffusion model", "Alan Turing", "novel method", "computer vision")
+
+
+class EndpointStats:
+    """单个接口的耗时样本与状态码计数"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.status_codes: Dict[str, int] = {}
+        self.errors = 0
+
+    def record(self, seconds: float, status: Optional[int]):
+        if status is None or status >= 400:
+            self.errors += 1
+        else:
+            self.latencies.append(seconds)
+        key = str(status) if status is not None else "error"
+        self.status_codes[key] = self.status_codes.get(key, 0) + 1
+
+    def histogram(self) -> Dict[str, int]:
+        counts = {f"<={bound}ms": 0 for bound in HISTOGRAM_BOUNDS_MS}
+        counts[f">{HISTOGRAM_BOUNDS_MS[-1]}ms"] = 0
+        for seconds in self.latencies:
+            ms = seconds * 1000
+            label = next((f"<={b}ms" for b in HISTOGRAM_BOUNDS_MS if ms <= b), f">{HISTOGRAM_BOUNDS_MS[-1]}ms")
+            counts[label] += 1
+        return counts
+
+    def summary(self, duration: float) -> Dict:
+        ordered = sorted(self.latencies)
+
+        def pct(q: float) -> Optional[float]:
+            if not ordered:
+                return None
+            return round(ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000, 2)
+
+        return {
+            "requests": len(ordered) + self.errors,
+            "errors": self.errors,
+            "throughput_per_second": round(len(ordered) / duration, 2) if duration else None,
+            "p50_ms": round(statistics.median(ordered) * 1000, 2) if ordered else None,
+            "p90_ms": pct(0.90),
+            "p99_ms": pct(0.99),
+            "max_ms": round(ordered[-1] * 1000, 2) if ordered else None,
+            "status_codes": self.status_codes,
+            "histogram": self.histogram(),
+        }
+
+
+def start_fake_redis() -> Optional[int]:
+    """在后台线程启动 fakeredis TCP服务，返回端口；未安装 fakeredis 时返回 None"""
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        return None
+    server = TcpFakeServer(("127.0.0.1", 0), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_address[1]
+
+
+def start_app(args, port: int, data_dir: str, stub_url: str, redis_port: Optional[int]) -> subprocess.Popen:
+    """启动被测服务（本地桩替代所有外部依赖）"""
+    env = dict(
+        os.environ,
+        PYTHONPATH=str(project_root),
+        HOST="127.0.0.1",
+        PORT=str(port),
+        WORKERS=str(args.workers),
+        LOG_LEVEL="WARNING",
+        LLM_BACKEND="replay",
+        LLM_REPLAY_MISS="stub",
+        LLM_REPLAY_LATENCY=args.llm_latency,
+        LLM_RECORD_DIR=args.records or os.path.join(data_dir, "llm_records"),
+        ARXIV_BASE_URL=f"{stub_url}/api/query",
+        ARXIV_PDF_URL=f"{stub_url}/pdf",
+        DOI_RESOLVER_URL=f"{stub_url}/doi",
+        SEMANTIC_SCHOLAR_BASE_URL=stub_url,
+        ARXIV_MIN_INTERVAL="0.001",
+        SEMANTIC_SCHOLAR_RATE_PER_SECOND="1000",
+        UPLOAD_DIR=os.path.join(data_dir, "uploads"),
+        GRAPH_DB_DIR=os.path.join(data_dir, "graph"),
+        PARSE_CACHE_DIR=os.path.join(data_dir, "parse_cache"),
+        DOCUMENT_STORE_DIR=os.path.join(data_dir, "documents"),
+        PDF_CACHE_DIR=os.path.join(data_dir, "pdf_cache"),
+        AUTHOR_CACHE_PATH=os.path.join(data_dir, "author_cache.sqlite3"),
+    )
+    if redis_port is not None:
+        env.update(REDIS_HOST="127.0.0.1", REDIS_PORT=str(redis_port), REDIS_DB="0")
+    else:
+        # 指向不存在的端口，服务按无Redis模式运行
+        env.update(REDIS_HOST="127.0.0.1", REDIS_PORT=str(free_port()), ENABLE_REDIS_CACHE="false")
+
+    if args.workers > 1:
+        command = [sys.executable, "-m", "gunicorn", "-c", "docker/gunicorn.conf.py", "app.main:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1",
+                   "--port", str(port), "--log-level", "warning"]
+    output = None if args.verbose else subprocess.DEVNULL
+    return subprocess.Popen(command, cwd=project_root, env=env, stdout=output, stderr=output,
+                            start_new_session=True)
+
+
+def parse_mix(mix: str) -> Dict[str, float]:
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("upload", "arxiv", "doi", "search"):
+            raise ValueError(f"未知的场景: {name}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+class LoadGenerator:
+    """按场景权重驱动虚拟用户，统计各接口耗时"""
+
+    def __init__(self, client, args):
+        self.client = client
+        self.args = args
+        self.weights = parse_mix(args.mix)
+        self.stats: Dict[str, EndpointStats] = {}
+        self.rng = random.Random(args.seed)
+        # 上传的论文从固定池中选取：池小于请求数时会命中去重与文档存储
+        self.papers = [make_paper(i, args.pages) for i in range(args.paper_pool)]
+
+    def _stats(self, name: str) -> EndpointStats:
+        if name not in self.stats:
+            self.stats[name] = EndpointStats()
+        return self.stats[name]
+
+    async def _request(self, name: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception:
+            self._stats(name).record(time.perf_counter() - started, None)
+            return None
+        self._stats(name).record(time.perf_counter() - started, response.status_code)
+        return response
+
+    async def _analyze(self, scenario: str):
+        started = time.perf_counter()
+        if scenario == "upload":
+            index = self.rng.randrange(len(self.papers))
+            response = await self._request("analyze_upload", "POST", "/api/v1/analyze", files={
+                "file": (f"paper-{index}.pdf", self.papers[index], "application/pdf")})
+        else:
+            paper_id = f"2301.{self.rng.randrange(self.args.id_pool):05d}"
+            params = {"arxiv_id": paper_id} if scenario == "arxiv" else {"doi": f"10.48550/{paper_id}"}
+            response = await self._request(f"analyze_{scenario}", "POST", "/api/v1/analyze", params=params)
+        if response is None or response.status_code != 200:
+            return
+
+        task = response.json()
+        # 缓存命中时直接返回结果，无需轮询
+        while task["status"] not in ("completed", "failed"):
+            await asyncio.sleep(self.args.poll_interval)
+            status = await self._request("status", "GET", f"/api/v1/status/{task['task_id']}")
+            if status is None or status.status_code != 200:
+                return
+            task = status.json()
+        self._stats(f"{scenario}_end_to_end").record(
+            time.perf_counter() - started, 200 if task["status"] == "completed" else 500)
+
+    async def _search(self):
+        query = self.rng.choice(SEARCH_TERMS)
+        await self._request("search", "GET", "/api/v1/search", params={"query": query, "limit": 10})
+
+    async def user(self, deadline: float, remaining: List[int]):
+        scenarios, weights = zip(*self.weights.items())
+        while time.monotonic() < deadline and remaining[0] > 0:
+            remaining[0] -= 1
+            scenario = self.rng.choices(scenarios, weights)[0]
+            if scenario == "search":
+                await self._search()
+            else:
+                await self._analyze(scenario)
+
+    async def run(self) -> float:
+        deadline = time.monotonic() + self.args.duration
+        remaining = [self.args.requests or sys.maxsize]
+        started = time.perf_counter()
+        await asyncio.gather(*(self.user(deadline, remaining) for _ in range(self.args.concurrency)))
+        return time.perf_counter() - started
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=project_root,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(report: Dict, baseline_path: str, tolerance: float) -> List[str]:
+    """与基线报告逐接口比较 p50 / p99 与吞吐，超出容差的列为回归"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = []
+    for name, current in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(name)
+        if not previous:
+            continue
+        for metric in ("p50_ms", "p99_ms"):
+            if current[metric] and previous[metric] and current[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{name} {metric}: {previous[metric]} -> {current[metric]}")
+        if (current["throughput_per_second"] and previous["throughput_per_second"]
+                and current["throughput_per_second"] < previous["throughput_per_second"] * (1 - tolerance)):
+            regressions.append(f"{name} 吞吐: {previous['throughput_per_second']} -> {current['throughput_per_second']}/s")
+    return regressions
+
+
+def print_histograms(report: Dict):
+    for name, stats in report["endpoints"].items():
+        print(f"\n{name}  (n={stats['requests']}, 错误 {stats['errors']}, "
+              f"p50 {stats['p50_ms']}ms, p99 {stats['p99_ms']}ms)", file=sys.stderr)
+        peak = max(stats["histogram"].values()) or 1
+        for label, count in stats["histogram"].items():
+            if count:
+                print(f"  {label:>10} {'#' * max(1, round(40 * count / peak))} {count}", file=sys.stderr)
+
+
+async def wait_ready(client, proc: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"服务进程退出，返回码 {proc.returncode}")
+        try:
+            if (await client.get("/ready")).status_code == 200:
+                return
+        except Exception:
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError("服务未在规定时间内就绪")
+
+
+async def load_test(args) -> Dict:
+    import httpx
+
+    redis_port = start_fake_redis() if args.redis == "fake" else None
+    if args.redis == "fake" and redis_port is None:
+        print("⚠️ 未安装 fakeredis，按无Redis模式测试", file=sys.stderr)
+    stub = start_stub_server()
+    port = free_port()
+    data_dir = tempfile.mkdtemp(prefix="load-test-")
+    proc = start_app(args, port, data_dir, f"http://127.0.0.1:{stub.server_port}", redis_port)
+    try:
+        limits = httpx.Limits(max_connections=args.concurrency * 2)
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=args.timeout,
+                                     limits=limits) as client:
+            await wait_ready(client, proc, args.startup_timeout)
+            generator = LoadGenerator(client, args)
+            duration = await generator.run()
+    finally:
+        stop_server(proc)
+        stub.shutdown()
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    return {
+        "commit": git_commit(),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "requests": args.requests,
+            "mix": args.mix,
+            "workers": args.workers,
+            "redis": "fake" if redis_port is not None else "none",
+            "llm_latency": args.llm_latency,
+            "pages": args.pages,
+            "paper_pool": args.paper_pool,
+            "id_pool": args.id_pool,
+            "seed": args.seed,
+        },
+        "duration_seconds": round(duration, 3),
+        "endpoints": {name: stats.summary(duration) for name, stats in sorted(generator.stats.items())},
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="学术助手系统 - 离线HTTP负载测试",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=f"""
+示例:
+  python scripts/load_test.py --duration 30 --concurrency 16
+  python scripts/load_test.py --mix search=1 --duration 10 --concurrency 64
+  python scripts/load_test.py --output load/{{commit}}.json
+  python scripts/load_test.py --baseline load/main.json --tolerance 0.2
+
+场景（--mix 权重，默认 {DEFAULT_MIX}）:
+  upload  上传PDF并轮询状态    arxiv / doi  按ID分析并轮询状态    search  知识库检索
+报告中的 *_end_to_end 为提交到完成的整体耗时，status 为单次轮询请求耗时。
+        """
+    )
+    parser.add_argument("--concurrency", type=int, default=8, help="虚拟用户数（默认: 8）")
+    parser.add_argument("--duration", type=float, default=20, help="持续时间秒数（默认: 20）")
+    parser.add_argument("--requests", type=int, default=0, help="场景总数上限，0表示只按时间（默认: 0）")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"场景权重（默认: {DEFAULT_MIX}）")
+    parser.add_argument("--workers", type=int, default=1, help="服务worker数，大于1时使用gunicorn（默认: 1）")
+    parser.add_argument("--redis", choices=("fake", "none"), default="fake", help="Redis模式（默认: fake）")
+    parser.add_argument("--llm-latency", default="lognormal:0.3,0.5",
+                        help="模拟LLM的延迟分布（默认: lognormal:0.3,0.5）")
+    parser.add_argument("--records", help="LLM录制目录，提供时命中的提示词返回录制结果")
+    parser.add_argument("--pages", type=int, default=4, help="上传论文的页数（默认: 4）")
+    parser.add_argument("--paper-pool", type=int, default=50, help="上传论文池大小（默认: 50）")
+    parser.add_argument("--id-pool", type=int, default=200, help="arXiv/DOI 编号池大小（默认: 200）")
+    parser.add_argument("--poll-interval", type=float, default=0.2, help="状态轮询间隔秒数（默认: 0.2）")
+    parser.add_argument("--timeout", type=float, default=60, help="单个请求超时秒数（默认: 60）")
+    parser.add_argument("--startup-timeout", type=float, default=120, help="等待服务就绪的秒数（默认: 120）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子（默认: 0）")
+    parser.add_argument("--output", help="报告写入的JSON文件，{commit} 替换为当前提交")
+    parser.add_argument("--baseline", help="基线报告，p50/p99或吞吐超出容差时返回非零")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="相对基线允许的变化（默认: 0.2）")
+    parser.add_argument("--verbose", action="store_true", help="显示服务日志")
+    args = parser.parse_args()
+
+    report = asyncio.run(load_test(args))
+
+    failures = [f"{name}: {stats['errors']} 个请求失败"
+                for name, stats in report["endpoints"].items() if stats["errors"]]
+    if args.baseline:
+        failures += [f"回归 {r}" for r in compare(report, args.baseline, args.tolerance)]
+
+    if args.output:
+        output = args.output.replace("{commit}", report["commit"] or "unknown")
+        Path(output).parent.mkdir(parents=True, exist_ok=True)
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    print_histograms(report)
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+本地论文源桩服务器 - 离线测试论文下载
+Local Stub Server for arXiv/DOI Fetching
+"""
+
+import argparse
+import hashlib
+import json
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+
+def make_pdf(paper_id: str) -> bytes:
+    """为给定ID生成确定性的测试PDF"""
+    import fitz
+
+    doc = fitz.open()
+    page = doc.new_page()
+    page.insert_text((72, 72), f"Stub Paper {paper_id}", fontsize=16)
+    page.insert_text((72, 110), "Abstract", fontsize=12)
+    page.insert_text((72, 130), "We propose a novel method for stub papers.", fontsize=10)
+    page.insert_text((72, 160), "1 Introduction", fontsize=12)
+    page.insert_text((72, 180), "Prior work by Alan Turing et al. (Alan Turing, 1950).", fontsize=10)
+    data = doc.tobytes(no_new_id=True)
+    doc.close()
+    return data
+
+
+def make_atom_entry(arxiv_id: str) -> str:
+    """arXiv导出API格式的单条记录"""
+    return (
+        "<entry>"
+        f"<id>http://arxiv.org/abs/{escape(arxiv_id)}v1</id>"
+        "<published>2023-05-01T00:00:00Z</published>"
+        f"<title>Stub Paper {escape(arxiv_id)}</title>"
+        "<summary>We propose a novel method for stub papers.</summary>"
+        "<author><name>Alan Turing</name></author>"
+        "<author><name>Ada Lovelace</name></author>"
+        "</entry>"
+    )
+
+
+def author_id_for(name: str) -> str:
+    return str(int(hashlib.sha1(name.lower().encode("utf-8")).hexdigest()[:8], 16))
+
+
+def make_author(author_id: str, name: str) -> dict:
+    """Semantic Scholar 格式的学者档案"""
+    return {
+        "authorId": author_id,
+        "name": name,
+        "affiliations": ["Stub University"],
+        "hIndex": 10 + int(author_id) % 50,
+        "citationCount": 1000 + int(author_id) % 10000,
+        "paperCount": 20,
+    }
+
+
+class StubPaperHandler(BaseHTTPRequestHandler):
+    """
+    路由:
+      GET  /pdf/<arxiv_id>          返回PDF，支持 ETag / If-None-Match
+      GET  /doi/<doi>               302 重定向到 /pdf/<doi>
+      GET  /api/query?id_list=...   arXiv导出API（Atom）
+      POST /paper/batch             Semantic Scholar 批量查询
+      GET  /author/search?query=... Semantic Scholar 学者搜索（姓名含 Unknown 时查无结果）
+      POST /author/batch            Semantic Scholar 学者批量查询
+    """
+
+    # 按路径统计请求次数，测试用来断言没有重复下载
+    request_counts: Dict[str, int] = {}
+    _pdf_cache: Dict[str, Tuple[bytes, str]] = {}
+    _lock = threading.Lock()
+
+    def do_GET(self):
+        with self._lock:
+            self.request_counts[self.path] = self.request_counts.get(self.path, 0) + 1
+
+        if self.path.startswith("/pdf/"):
+            self._serve_pdf(unquote(self.path[len("/pdf/"):]))
+        elif self.path.startswith("/doi/"):
+            self.send_response(302)
+            self.send_header("Location", "/pdf/" + self.path[len("/doi/"):])
+            self.end_headers()
+        elif self.path.startswith("/api/query"):
+            query = parse_qs(urlsplit(self.path).query)
+            ids = [i for i in query.get("id_list", [""])[0].split(",") if i]
+            body = (
+                '<feed xmlns="http://www.w3.org/2005/Atom">'
+                + "".join(make_atom_entry(i) for i in ids)
+                + "</feed>"
+            ).encode("utf-8")
+            self._send_body(body, "application/atom+xml")
+        elif self.path.startswith("/author/search"):
+            name = parse_qs(urlsplit(self.path).query).get("query", [""])[0]
+            data = [] if "unknown" in name.lower() else [make_author(author_id_for(name), name)]
+            self._send_body(json.dumps({"total": len(data), "data": data}).encode("utf-8"), "application/json")
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        path = urlsplit(self.path).path
+        with self._lock:
+            self.request_counts[path] = self.request_counts.get(path, 0) + 1
+
+        if path not in ("/paper/batch", "/author/batch"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length") or 0)
+        ids = json.loads(self.rfile.read(length) or b"{}").get("ids", [])
+        if path == "/author/batch":
+            authors = [make_author(i, f"Author {i}") for i in ids]
+            self._send_body(json.dumps(authors).encode("utf-8"), "application/json")
+            return
+        papers = [
+            {
+                "paperId": hashlib.sha1(i.encode("utf-8")).hexdigest(),
+                "title": f"Stub Paper {i.split(':', 1)[-1]}",
+                "year": 2023,
+                "authors": [{"name": "Alan Turing"}],
+                "citationCount": 42,
+                "referenceCount": 7,
+            }
+            for i in ids
+        ]
+        self._send_body(json.dumps(papers).encode("utf-8"), "application/json")
+
+    def _send_body(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _serve_pdf(self, paper_id: str):
+        with self._lock:
+            if paper_id not in self._pdf_cache:
+                data = make_pdf(paper_id)
+                self._pdf_cache[paper_id] = (data, '"%s"' % hashlib.sha256(data).hexdigest()[:16])
+            data, etag = self._pdf_cache[paper_id]
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_server(host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """在后台线程启动桩服务器，port=0 时自动分配端口（见 server.server_port）"""
+    server = ThreadingHTTPServer((host, port), StubPaperHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description="学术助手系统 - 本地论文源桩服务器",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+示例:
+  python scripts/stub_paper_server.py --port 8765
+
+  # 让应用从桩服务器下载论文
+  ARXIV_PDF_URL=http://127.0.0.1:8765/pdf DOI_RESOLVER_URL=http://127.0.0.1:8765/doi \\
+  ARXIV_BASE_URL=http://127.0.0.1:8765/api/query SEMANTIC_SCHOLAR_BASE_URL=http://127.0.0.1:8765 \\
+      python -m uvicorn app.main:app
+        """
+    )
+    parser.add_argument("--host", default="127.0.0.1", help="监听地址")
+    parser.add_argument("--port", type=int, default=8765, help="监听端口（默认: 8765）")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer((args.host, args.port), StubPaperHandler)
+    print(f"桩服务器已启动: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
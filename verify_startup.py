@@ -22,6 +22,7 @@ def verify_startup():
     checks = {
         "Configuration": False,
         "Models": False,
+        "Lazy Imports": False,
         "Paper Parser Agent": False,
         "Math Model Agent": False,
         "Domain Analyzer Agent": False,
@@ -42,7 +43,15 @@ def verify_startup():
         checks["Models"] = True
         print("   - PaperInput model loaded successfully")
         
-        print("\n3. Loading agents...")
+        print("\n3. Checking startup imports...")
+        # The server imports only the orchestrator; langchain / PyMuPDF load on first agent use
+        from app.agents.orchestrator import AcademicAnalysisOrchestrator
+        deferred = ("langchain", "langchain_openai", "openai", "fitz", "pymupdf", "httpx")
+        loaded = [name for name in deferred if name in sys.modules]
+        checks["Lazy Imports"] = not loaded
+        print(f"   - Heavy modules loaded at startup: {', '.join(loaded) if loaded else 'none'}")
+        
+        print("\n4. Loading agents...")
         from app.agents.paper_parser import PaperParserAgent
         checks["Paper Parser Agent"] = True
         print("   - PaperParserAgent imported")
@@ -63,12 +72,14 @@ def verify_startup():
         checks["Tech Roadmap Agent"] = True
         print("   - TechRoadmapAgent imported")
         
-        print("\n4. Initializing main orchestrator...")
-        from app.agents.orchestrator import AcademicAnalysisOrchestrator
+        print("\n5. Initializing main orchestrator...")
         orchestrator = AcademicAnalysisOrchestrator()
-        checks["Main Orchestrator"] = True
-        print("   - AcademicAnalysisOrchestrator initialized successfully")
-        print("   - Note: Individual agents use lazy initialization")
+        warm_up_errors = orchestrator.warm_up()
+        checks["Main Orchestrator"] = not warm_up_errors
+        for name, error in warm_up_errors.items():
+            print(f"   - {name} failed to initialize: {error}")
+        print("   - AcademicAnalysisOrchestrator initialized, agents warmed up")
+        print("   - Note: the server warms agents up in the background; poll /ready")
         
         print("\n" + "=" * 60)
         print("VERIFICATION RESULTS")